@@ -0,0 +1,197 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """
+    Cache of answers for repeated and near-duplicate questions. A question is first looked up by its normalized
+    text, then by the cosine similarity of its embedding against the embeddings of the cached questions.
+    Entries expire after `ttl` seconds, the least recently used ones are evicted over `max_entries`, and the whole
+    cache is dropped when the version of the vector store changes.
+
+    Args:
+        embedding_function (Embeddings): The embedding function used to vectorize the questions.
+        similarity_threshold (float): Minimum cosine similarity to reuse the answer of another question.
+        ttl (float): Seconds an answer stays valid.
+        max_entries (int): Maximum amount of cached answers.
+    """
+
+    _CONTRACTIONS = [
+        (re.compile(r"\b(what|who|where|when|how|that|there|it)'s\b"), r"\1 is"),
+        (re.compile(r"\bcan't\b"), "cannot"),
+        (re.compile(r"n't\b"), " not"),
+        (re.compile(r"'re\b"), " are"),
+        (re.compile(r"'ve\b"), " have"),
+        (re.compile(r"'ll\b"), " will"),
+        (re.compile(r"'d\b"), " would"),
+    ]
+
+    def __init__(self, embedding_function: Embeddings, similarity_threshold: float = 0.95, ttl: float = 3600.0,
+                 max_entries: int = 1024):
+        """
+        Initialize the SemanticAnswerCache.
+
+        Args:
+            embedding_function (Embeddings): The embedding function used to vectorize the questions.
+            similarity_threshold (float): Minimum cosine similarity to reuse the answer of another question.
+            Default is 0.95.
+            ttl (float): Seconds an answer stays valid. Default is an hour.
+            max_entries (int): Maximum amount of cached answers. Default is 1024.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        self.embedding_function = embedding_function
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def normalize(cls, question: str) -> str:
+        """
+        Normalize a question so trivially different wordings share the same key.
+
+        Args:
+            question (str): The question.
+
+        Returns:
+            str: The lowercase question with expanded contractions and without punctuation.
+        """
+        question = question.lower().replace("’", "'")
+        for pattern, replacement in cls._CONTRACTIONS:
+            question = pattern.sub(replacement, question)
+        return " ".join(re.sub(r"[^\w\s]", " ", question).split())
+
+    def _check_version(self, version: int):
+        """
+        Drop every entry if the vector store got newer data. The lock must be held by the caller.
+        """
+        if self._version is None or version > self._version:
+            if self._entries:
+                logger.info("The vector store changed, invalidating %d cached answers.", len(self._entries))
+            self._entries.clear()
+            self._matrix = None
+            self._version = version
+
+    def _expire(self):
+        """
+        Drop the expired entries. The lock must be held by the caller.
+        """
+        deadline = time.monotonic() - self.ttl
+        expired = [key for key, (_, _, created) in self._entries.items() if created < deadline]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _semantic_match(self, embedding: np.ndarray) -> Optional[str]:
+        """
+        Find the cached question most similar to the embedding. The lock must be held by the caller.
+        """
+        if not self._entries:
+            return None
+        if self._matrix is None:
+            self._matrix = (list(self._entries), np.stack([entry[0] for entry in self._entries.values()]))
+        keys, matrix = self._matrix
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        return keys[best] if similarities[best] >= self.similarity_threshold else None
+
+    def _embed(self, key: str) -> np.ndarray:
+        embedding = np.asarray(self.embedding_function.embed_query(key), dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def get(self, question: str, version: int) -> Tuple[Optional[dict], Optional[np.ndarray]]:
+        """
+        Look up the answer of a question.
+
+        Args:
+            question (str): The question.
+            version (int): The current version of the vector store.
+
+        Returns:
+            tuple: The cached response (or None) and the embedding of the question, computed only when the
+            question wasn't found by its normalized text, so it can be reused by `put`.
+        """
+        key = self.normalize(question)
+        with self._lock:
+            self._check_version(version)
+            self._expire()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return dict(self._entries[key][1], cache="exact"), None
+
+        embedding = self._embed(key)
+        with self._lock:
+            self._check_version(version)
+            match = self._semantic_match(embedding)
+            if match is None:
+                self.misses += 1
+                return None, embedding
+            self._entries.move_to_end(match)
+            self.semantic_hits += 1
+            logger.debug("%r answered with the cached answer of %r.", question, match)
+            return dict(self._entries[match][1], cache="semantic"), embedding
+
+    def put(self, question: str, response: dict, version: int, embedding: Optional[np.ndarray] = None):
+        """
+        Store the answer of a question.
+
+        Args:
+            question (str): The question.
+            response (dict): The response to cache.
+            version (int): The version of the vector store the response was computed with.
+            embedding (Optional[np.ndarray]): The embedding returned by `get`. Default is None, which computes it.
+        """
+        key = self.normalize(question)
+        if embedding is None:
+            embedding = self._embed(key)
+        with self._lock:
+            if version != self._version:
+                logger.debug("Not caching an answer computed with an outdated vector store.")
+                return
+            self._entries[key] = (embedding, response, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def invalidate(self):
+        """
+        Drop every cached answer.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: The hit and miss counters and the amount of cached answers.
+        """
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+        }
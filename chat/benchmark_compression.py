@@ -0,0 +1,80 @@
+import logging
+import os
+from typing import List
+import numpy as np
+from langchain.callbacks import get_openai_callback
+from context_aware_qa import ContextAwareQA
+from context_compressor import ContextCompressor
+from load_test import QUESTIONS
+from offline import HashingEmbeddings, OfflineLLM
+from vectorizer_db_factory import VectorStoreDBCreator
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def benchmark(qa: ContextAwareQA, questions: List[str]) -> dict:
+    """
+    Answer every question and measure the prompts and the latency.
+
+    Returns:
+        dict: The mean prompt tokens counted by OpenAI (0 for the offline LLM), the mean tokens of the context
+        before and after the compression, and the p50 and mean end-to-end latency in milliseconds.
+    """
+    prompt_tokens, before, after, latencies = [], [], [], []
+    for question in questions:
+        with get_openai_callback() as callback:
+            response = qa.query_with_sources(question)
+        prompt_tokens.append(callback.prompt_tokens)
+        latencies.append(response["latency"]["total_ms"])
+        if "context_tokens" in response:
+            before.append(response["context_tokens"]["before"])
+            after.append(response["context_tokens"]["after"])
+    result = {
+        "prompt_tokens": float(np.mean(prompt_tokens)),
+        "total_ms_p50": float(np.percentile(latencies, 50)),
+        "total_ms_mean": float(np.mean(latencies)),
+    }
+    if before:
+        result.update({"context_tokens_before": float(np.mean(before)), "context_tokens_after": float(np.mean(after))})
+    return result
+
+
+if __name__ == '__main__':
+    DOWNLOAD_FOLDER = os.getenv("DOWNLOAD_FOLDER", default="downloads")
+    VECTOR_DB_DIRECTORY = os.getenv("CHROMADB_FOLDER", default="chromadb")
+    BENCHMARK_QUESTIONS_FILE = os.getenv("BENCHMARK_QUESTIONS_FILE", default="")
+    RETRIEVER_K = int(os.getenv("RETRIEVER_K", default="3"))
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", default="600"))
+    CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", default="10"))
+    OFFLINE = os.getenv("OFFLINE", default="") == "1"
+
+    questions = QUESTIONS
+    if BENCHMARK_QUESTIONS_FILE:
+        with open(BENCHMARK_QUESTIONS_FILE) as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    vdb_factory = VectorStoreDBCreator(corpora_folder=DOWNLOAD_FOLDER,
+                                       persistent_directory=None if OFFLINE else VECTOR_DB_DIRECTORY,
+                                       embedding_function=HashingEmbeddings if OFFLINE else None)
+    llm = OfflineLLM(latency=0) if OFFLINE else None
+    compressor = ContextCompressor(token_budget=CONTEXT_TOKEN_BUDGET, candidates=CONTEXT_CANDIDATES)
+    results = {
+        "uncompressed": benchmark(ContextAwareQA(vdb_factory, llm=llm, k=RETRIEVER_K), questions),
+        "compressed": benchmark(ContextAwareQA(vdb_factory, llm=llm, k=RETRIEVER_K, compressor=compressor), questions),
+    }
+    # The uncompressed context is the first k of the documents the compressor starts from.
+    uncompressed_tokens = results["compressed"]["context_tokens_before"]
+    results["uncompressed"].update({"context_tokens_before": uncompressed_tokens,
+                                    "context_tokens_after": uncompressed_tokens})
+
+    for mode, result in results.items():
+        print(f"{mode:>12}: " + ", ".join(f"{name} {value:.1f}" for name, value in result.items()))
+
+
+"""
+To Run (with the articles already downloaded)
+CONTEXT_TOKEN_BUDGET=600 CONTEXT_CANDIDATES=10 OPENAI_API_KEY=$(cat openai_secret_key) python benchmark_compression.py
+"""
@@ -0,0 +1,118 @@
+import logging
+import os
+import random
+import re
+import time
+from typing import List
+import numpy as np
+from langchain.embeddings import OpenAIEmbeddings
+from ingestion_pipeline import load_and_split
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def corpus_sample(folder: str, size: int, seed: int = 0) -> List[str]:
+    """
+    Split the articles of a folder and take a fixed random sample of the chunks.
+
+    Args:
+        folder (str): The folder with the articles.
+        size (int): Amount of chunks in the sample.
+        seed (int): The seed of the sample, so every backend and every run uses the same chunks.
+
+    Returns:
+        List[str]: The content of the sampled chunks.
+    """
+    chunks = []
+    for filename in sorted(os.listdir(folder)):
+        if not filename.startswith("."):
+            chunks += [doc.page_content for doc in load_and_split(os.path.join(folder, filename))[1]]
+    return random.Random(seed).sample(chunks, min(size, len(chunks)))
+
+
+def self_retrieval_queries(chunks: List[str]):
+    """
+    Use the first sentence of every chunk with more than one sentence as a query whose answer is that chunk.
+
+    Returns:
+        list: The (query, index of the relevant chunk) pairs.
+    """
+    queries = []
+    for index, chunk in enumerate(chunks):
+        sentences = re.split(r"(?<=[.!?])\s+", chunk.strip())
+        if len(sentences) > 1 and len(sentences[0].split()) >= 5:
+            queries.append((sentences[0], index))
+    return queries
+
+
+def benchmark(embeddings, chunks: List[str], queries: list, k: int = 5) -> dict:
+    """
+    Measure the throughput of a backend and its retrieval quality on the sample.
+
+    Returns:
+        dict: The throughput, recall@1, recall@k, MRR and the top k chunks of every query.
+    """
+    started = time.perf_counter()
+    corpus = np.asarray(embeddings.embed_documents(chunks), dtype=np.float32)
+    elapsed = time.perf_counter() - started
+    query_started = time.perf_counter()
+    query_vectors = np.asarray([embeddings.embed_query(query) for query, _ in queries], dtype=np.float32)
+    query_elapsed = time.perf_counter() - query_started
+
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    ranking = np.argsort(-(query_vectors @ corpus.T), axis=1)
+    ranks = [int(np.where(ranking[row] == relevant)[0][0]) for row, (_, relevant) in enumerate(queries)]
+    return {
+        "chunks_per_second": len(chunks) / elapsed,
+        "query_ms": query_elapsed / len(queries) * 1000,
+        "recall@1": sum(rank < 1 for rank in ranks) / len(ranks),
+        f"recall@{k}": sum(rank < k for rank in ranks) / len(ranks),
+        "mrr": sum(1 / (rank + 1) for rank in ranks) / len(ranks),
+        "top_k": ranking[:, :k],
+    }
+
+
+if __name__ == '__main__':
+
+    DOWNLOAD_FOLDER = os.getenv("DOWNLOAD_FOLDER", default="downloads")
+    BENCHMARK_SAMPLE = int(os.getenv("BENCHMARK_SAMPLE", default="1000"))
+    BENCHMARK_BACKENDS = os.getenv("BENCHMARK_BACKENDS", default="local,openai").split(",")
+    LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", default="32"))
+    LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", default="0")) or None
+
+    chunks = corpus_sample(DOWNLOAD_FOLDER, BENCHMARK_SAMPLE)
+    queries = self_retrieval_queries(chunks)
+    logger.info("Benchmarking on %d chunks and %d queries.", len(chunks), len(queries))
+
+    results = {}
+    for backend in BENCHMARK_BACKENDS:
+        if backend == "local":
+            from local_embeddings import LocalEmbeddings
+            embeddings = LocalEmbeddings(batch_size=LOCAL_EMBEDDING_BATCH_SIZE, num_threads=LOCAL_EMBEDDING_THREADS)
+        else:
+            embeddings = OpenAIEmbeddings()
+        results[backend] = benchmark(embeddings, chunks, queries)
+
+    for backend, result in results.items():
+        print(f"{backend:>8}: " + ", ".join(
+            f"{name} {value:.3f}" for name, value in result.items() if name != "top_k"
+        ))
+    if len(results) > 1:
+        # How often the backends agree on the top results, taking the first backend as the reference.
+        reference, *others = results
+        for backend in others:
+            overlap = np.mean([
+                len(set(a) & set(b)) / len(a)
+                for a, b in zip(results[reference]["top_k"], results[backend]["top_k"])
+            ])
+            print(f"top-5 overlap between {reference} and {backend}: {overlap:.3f}")
+
+
+"""
+To Run (with the articles already downloaded)
+BENCHMARK_SAMPLE=1000 LOCAL_EMBEDDING_THREADS=4 OPENAI_API_KEY=$(cat openai_secret_key) python benchmark_embeddings.py
+"""
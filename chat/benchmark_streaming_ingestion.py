@@ -0,0 +1,97 @@
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+from langchain.document_loaders import JSONLoader
+from langchain.text_splitter import CharacterTextSplitter
+from streaming_loader import StreamingTokenSplitter, stream_and_split
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+WORDS = ("the", "product", "review", "customer", "support", "pricing", "team", "integration", "report", "data",
+         "users", "feature", "update", "market", "growth", "platform", "security", "workflow", "sales", "cloud")
+
+
+def synthetic_export(file: str, size_mb: int, seed: int = 0):
+    """
+    Write a JSON array of articles of about `size_mb` megabytes, like a large export of the corpus.
+    """
+    rng = random.Random(seed)
+    target = size_mb * 2 ** 20
+    with open(file, "w") as f:
+        f.write("[")
+        written, index = 1, 0
+        while written < target:
+            sentences = [" ".join(rng.choices(WORDS, k=rng.randint(6, 24))).capitalize() + "."
+                         for _ in range(rng.randint(20, 200))]
+            record = ("," if index else "") + json.dumps({"title": f"Article {index}", "body": " ".join(sentences)})
+            written += f.write(record)
+            index += 1
+        f.write("]")
+
+
+def _loader(file: str) -> int:
+    splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
+    return len(splitter.split_documents(JSONLoader(file, ".[].body").load()))
+
+
+def _streaming(file: str) -> int:
+    return sum(1 for _ in stream_and_split(file, StreamingTokenSplitter()))
+
+
+MODES = {"loader": _loader, "streaming": _streaming}
+
+
+def _measure(mode: str, file: str, results):
+    started = time.perf_counter()
+    chunks = MODES[mode](file)
+    # ru_maxrss is in kilobytes on Linux.
+    results.put({"chunks": chunks, "seconds": time.perf_counter() - started,
+                 "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024})
+
+
+def benchmark(mode: str, file: str) -> dict:
+    """
+    Split the file in a fresh process, so the peak memory measured is the one of that mode alone.
+
+    Returns:
+        dict: The amount of chunks, the seconds taken and the peak resident memory in megabytes.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_measure, args=(mode, file, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        # Usually killed by the OOM killer.
+        return {"exitcode": process.exitcode}
+    return results.get()
+
+
+if __name__ == '__main__':
+    BENCHMARK_FILE_MB = int(os.getenv("BENCHMARK_FILE_MB", default="2048"))
+    BENCHMARK_MODES = os.getenv("BENCHMARK_MODES", default="streaming,loader").split(",")
+    BENCHMARK_FILE = os.getenv("BENCHMARK_FILE", default="")
+
+    file = BENCHMARK_FILE or os.path.join(tempfile.mkdtemp(prefix="ingestion-benchmark-"), "export.json")
+    if not os.path.exists(file):
+        logger.info("Writing a %d MB synthetic export to %s...", BENCHMARK_FILE_MB, file)
+        synthetic_export(file, BENCHMARK_FILE_MB)
+
+    results = {mode: benchmark(mode, file) for mode in BENCHMARK_MODES}
+    print(f"{'file':>10}: {os.path.getsize(file) / 2 ** 20:.0f} MB")
+    for mode, result in results.items():
+        print(f"{mode:>10}: " + ", ".join(f"{name} {value:.1f}" for name, value in result.items()))
+
+
+"""
+To Run (the loader mode needs several times the size of the file in memory)
+BENCHMARK_FILE_MB=4096 BENCHMARK_MODES=streaming,loader python benchmark_streaming_ingestion.py
+"""
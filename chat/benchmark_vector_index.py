@@ -0,0 +1,125 @@
+import logging
+import os
+import tempfile
+import time
+import numpy as np
+from langchain.vectorstores import Chroma
+from quantized_index import QuantizedVectorStore
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def synthetic_corpus(size: int, dimension: int, clusters: int = 1000, seed: int = 0) -> np.ndarray:
+    """
+    Normalized vectors drawn around random topics, so neighbourhoods look like the ones of real embeddings instead
+    of being uniformly spread.
+
+    Returns:
+        np.ndarray: The corpus vectors.
+    """
+    random = np.random.default_rng(seed)
+    topics = random.normal(size=(clusters, dimension)).astype(np.float32)
+    corpus = np.empty((size, dimension), dtype=np.float32)
+    for start in range(0, size, 100000):
+        end = min(start + 100000, size)
+        corpus[start:end] = topics[random.integers(0, clusters, end - start)]
+        corpus[start:end] += 0.6 * random.normal(size=(end - start, dimension))
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    return corpus
+
+
+def ground_truth(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """
+    Returns:
+        np.ndarray: The exact top k rows of every query by cosine similarity.
+    """
+    normalized = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.stack([np.argsort(-(corpus @ query))[:k] for query in normalized])
+
+
+def fill(db, corpus: np.ndarray, batch_size: int = 5000):
+    """
+    Add the corpus to a store with the same bulk writes as the ingestion, the content of every chunk is its row.
+    """
+    for start in range(0, len(corpus), batch_size):
+        rows = [str(row) for row in range(start, min(start + batch_size, len(corpus)))]
+        batch = corpus[start:start + batch_size].tolist()
+        if isinstance(db, QuantizedVectorStore):
+            db.upsert(rows, rows, batch, [{} for _ in rows])
+        else:
+            db._collection.upsert(ids=rows, embeddings=batch, documents=rows, metadatas=[{"row": row} for row in rows])
+    db.persist()
+
+
+def benchmark(db, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    """
+    Returns:
+        dict: The recall@k against the exact search, and the p50 and p99 query latency in milliseconds.
+    """
+    latencies, recalls = [], []
+    for query, relevant in zip(queries, truth):
+        started = time.perf_counter()
+        docs = db.similarity_search_by_vector(query.tolist(), k=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len({int(doc.page_content) for doc in docs} & set(relevant.tolist())) / k)
+    return {
+        f"recall@{k}": float(np.mean(recalls)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def folder_size(folder: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(folder) for name in names)
+
+
+if __name__ == '__main__':
+    BENCHMARK_VECTORS = int(os.getenv("BENCHMARK_VECTORS", default="200000"))
+    BENCHMARK_DIMENSION = int(os.getenv("BENCHMARK_DIMENSION", default="384"))
+    BENCHMARK_QUERIES = int(os.getenv("BENCHMARK_QUERIES", default="500"))
+    BENCHMARK_K = int(os.getenv("BENCHMARK_K", default="10"))
+    BENCHMARK_BACKENDS = os.getenv("BENCHMARK_BACKENDS", default="chroma,quantized").split(",")
+    QUANTIZED_NPROBE = int(os.getenv("QUANTIZED_NPROBE", default="16"))
+    QUANTIZED_RERANK = int(os.getenv("QUANTIZED_RERANK", default="100"))
+    BENCHMARK_DIRECTORY = os.getenv("BENCHMARK_DIRECTORY", default="") or tempfile.mkdtemp(prefix="vector-benchmark-")
+
+    corpus = synthetic_corpus(BENCHMARK_VECTORS, BENCHMARK_DIMENSION)
+    random = np.random.default_rng(1)
+    # Queries are perturbed corpus vectors, so every one of them has a real neighbourhood.
+    queries = corpus[random.integers(0, len(corpus), BENCHMARK_QUERIES)]
+    queries = queries + 0.3 * random.normal(size=queries.shape).astype(np.float32) / np.sqrt(BENCHMARK_DIMENSION)
+    truth = ground_truth(corpus, queries, BENCHMARK_K)
+    logger.info("Benchmarking on %d vectors of %d dimensions and %d queries.", *corpus.shape, len(queries))
+
+    def open_store(backend: str, directory: str):
+        if backend == "quantized":
+            return QuantizedVectorStore(None, directory, nprobe=QUANTIZED_NPROBE, rerank=QUANTIZED_RERANK)
+        return Chroma(collection_name="benchmark", embedding_function=None, persist_directory=directory)
+
+    results = {}
+    for backend in BENCHMARK_BACKENDS:
+        directory = os.path.join(BENCHMARK_DIRECTORY, backend)
+        started = time.perf_counter()
+        fill(open_store(backend, directory), corpus)
+        build_s = time.perf_counter() - started
+        # Open the store again from disk, as a new QA process would.
+        started = time.perf_counter()
+        db = open_store(backend, directory)
+        db.similarity_search_by_vector(queries[0].tolist(), k=BENCHMARK_K)
+        open_s = time.perf_counter() - started
+        results[backend] = {
+            **benchmark(db, queries, truth, BENCHMARK_K),
+            "build_s": build_s, "open_s": open_s, "disk_mb": folder_size(directory) / 2 ** 20,
+        }
+
+    for backend, result in results.items():
+        print(f"{backend:>10}: " + ", ".join(f"{name} {value:.3f}" for name, value in result.items()))
+
+
+"""
+To Run
+BENCHMARK_VECTORS=1000000 BENCHMARK_DIMENSION=384 python benchmark_vector_index.py
+"""
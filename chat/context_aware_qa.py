@@ -1,8 +1,14 @@
 import logging
-from typing import Any, Optional
-from langchain.chains.qa_with_sources.retrieval import RetrievalQAWithSourcesChain
+import queue
+import threading
+import time
+from typing import Any, Iterator, List, Optional, Tuple
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.chains.qa_with_sources.base import QAWithSourcesChain
 from langchain.chat_models import ChatOpenAI
 from langchain.chat_models.base import BaseChatModel
+from answer_cache import SemanticAnswerCache
+from context_compressor import ContextCompressor
 from vectorizer_db_factory import VectorStoreDBCreator
 
 
@@ -11,6 +17,48 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
+class _TokenQueueHandler(BaseCallbackHandler):
+    """
+    Callback handler that puts the tokens generated by the LLM in a queue.
+    """
+
+    def __init__(self, tokens: queue.Queue):
+        self.tokens = tokens
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.tokens.put(token)
+
+
+class _AnswerStreamFilter:
+    """
+    Stops a stream of tokens at the "SOURCES:" trailer the model appends to its answers. Tokens that could be the
+    beginning of the trailer are held back until it is clear they aren't.
+    """
+
+    MARKER = "SOURCES:"
+
+    def __init__(self):
+        self._buffer = ""
+        self._done = False
+
+    def feed(self, token: str) -> str:
+        if self._done:
+            return ""
+        self._buffer += token
+        index = self._buffer.find(self.MARKER)
+        if index >= 0:
+            self._done = True
+            return self._buffer[:index]
+        keep = next((size for size in range(min(len(self.MARKER) - 1, len(self._buffer)), 0, -1)
+                     if self.MARKER.startswith(self._buffer[-size:])), 0)
+        text, self._buffer = self._buffer[:len(self._buffer) - keep], self._buffer[len(self._buffer) - keep:]
+        return text
+
+    def flush(self) -> str:
+        text, self._buffer = ("" if self._done else self._buffer), ""
+        return text
+
+
 class ContextAwareQA:
     """
     Model that answers a query with the most relevant context.
@@ -18,39 +66,230 @@ class ContextAwareQA:
     Args:
         vectorstore_creator (VectorStoreDBCreator): A factory class that provides access to the vector database.
         llm (Optional[BaseChatModel]): A factory class that provides access to the language model (LLM).
+        k (int): Amount of documents retrieved as context.
+        search_type (str): The search type of the retriever, "similarity" or "mmr".
+        answer_cache (Optional[SemanticAnswerCache]): A cache of answers for repeated and near-duplicate questions.
+        compressor (Optional[ContextCompressor]): Packs the most relevant sentences of a larger set of retrieved
+            documents into a token budget.
     """
 
-    def __init__(self, vectorstore_creator: VectorStoreDBCreator, llm: Optional[BaseChatModel] = None) -> None:
+    def __init__(self, vectorstore_creator: VectorStoreDBCreator, llm: Optional[BaseChatModel] = None, k: int = 3,
+                 search_type: str = "similarity", answer_cache: Optional[SemanticAnswerCache] = None,
+                 compressor: Optional[ContextCompressor] = None) -> None:
         """
         Initialize the ContextAwareQA model.
 
         Args:
             vectorstore_creator (VectorStoreDBCreator): A factory class that provides access to the vector database.
             llm (Optional[BaseChatModel]): A factory class that provides access to the language model (LLM).
+            k (int): Amount of documents retrieved as context. Default is 3.
+            search_type (str): The search type of the retriever, "similarity" or "mmr". Default is "similarity".
+            answer_cache (Optional[SemanticAnswerCache]): A cache of answers for repeated and near-duplicate
+            questions. Default is None, which answers every question.
+            compressor (Optional[ContextCompressor]): Packs the most relevant sentences of `compressor.candidates`
+            retrieved documents into a token budget. Default is None, which sends the k documents as they are.
         """
 
-        self.llm = llm or ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0, max_tokens=500)
+        self.llm = llm or ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0, max_tokens=500, streaming=True)
         self.vectorstore_creator = vectorstore_creator
+        self.k = k
+        self.search_type = search_type
+        self.answer_cache = answer_cache
+        self.compressor = compressor
+        self._retriever = None
+        self._chains = {}
+
+    @property
+    def retriever(self):
+        """
+        Get the retriever over the vector store. It is built once and reused by every query.
+
+        Returns:
+            VectorStoreRetriever: The retriever.
+        """
+        if self._retriever is None:
+            k = self.compressor.candidates if self.compressor is not None else self.k
+            self._retriever = self.vectorstore_creator.vectorstore.as_retriever(
+                search_type=self.search_type, search_kwargs={"k": k}
+            )
+        return self._retriever
+
+    def _context(self, question: str) -> Tuple[List, dict]:
+        """
+        Retrieve the documents of a question, compressing them if there is a compressor.
+
+        Args:
+            question (str): The query question.
+
+        Returns:
+            tuple: The documents, and the retrieval_ms, and with a compressor the compression_ms and the tokens of
+            the context before (the k documents as they are) and after the compression.
+        """
+        started = time.perf_counter()
+        docs = self.retriever.get_relevant_documents(question)
+        retrieved = time.perf_counter()
+        report = {"retrieval_ms": (retrieved - started) * 1000}
+        if self.compressor is not None:
+            before = sum(self.compressor.count_tokens(doc.page_content) for doc in docs[:self.k])
+            docs = self.compressor.compress(question, docs)
+            report["compression_ms"] = (time.perf_counter() - retrieved) * 1000
+            report["context_tokens"] = {
+                "before": before, "after": sum(self.compressor.count_tokens(doc.page_content) for doc in docs)
+            }
+        return docs, report
+
+    def _chain(self, **kwargs: Any) -> QAWithSourcesChain:
+        """
+        Get the QA chain built with the given kwargs, building it only the first time they are seen.
+
+        Returns:
+            QAWithSourcesChain: The chain answering from already retrieved documents.
+        """
+        key = repr(sorted(kwargs.items()))
+        if key not in self._chains:
+            logger.debug("Building a chain for %s.", key)
+            self._chains[key] = QAWithSourcesChain.from_chain_type(self.llm, **kwargs)
+        return self._chains[key]
 
     def query_with_sources(
         self, question: str, **kwargs: Any
     ) -> dict:
         """
         Query the vector store and retrieve sources relevant to the question.
+        If there is an answer cache, questions asked with the default chain are looked up there first.
 
         Args:
             question (str): The query question.
 
         Returns:
-            dict: A dictionary containing the retrieved sources.
+            dict: A dictionary containing the answer, the retrieved sources and the latency breakdown of the query
+            (retrieval_ms, llm_ms and total_ms). Cached answers also have the kind of hit ("exact" or "semantic").
+            With a compressor, the latency also has the compression_ms, and the context_tokens are the tokens of
+            the context before and after the compression.
 
         Raises:
             Any exceptions raised by the underlying retrieval process.
         """
         logger.debug("Processing question: %s.", question)
-        vectorstore = self.vectorstore_creator.vectorstore
-        """Query the vectorstore and get back sources."""
-        chain = RetrievalQAWithSourcesChain.from_chain_type(
-            self.llm, retriever=vectorstore.as_retriever(search_kwargs={"k": 3}), **kwargs
-        )
-        return chain({chain.question_key: question})
+        chain = self._chain(**kwargs)
+        started = time.perf_counter()
+        use_cache = self.answer_cache is not None and not kwargs
+        if use_cache:
+            version = self.vectorstore_creator.version
+            cached, embedding = self.answer_cache.get(question, version)
+            if cached is not None:
+                cached[chain.question_key] = question
+                total_ms = (time.perf_counter() - started) * 1000
+                cached["latency"] = {"retrieval_ms": 0.0, "llm_ms": 0.0, "total_ms": total_ms}
+                logger.info("Query answered from the cache (%s) in %.1f ms.", cached["cache"], total_ms)
+                return cached
+
+        docs, context = self._context(question)
+        retrieved = time.perf_counter()
+        response = chain({chain.input_docs_key: docs, chain.question_key: question}, return_only_outputs=True)
+        answered = time.perf_counter()
+
+        response[chain.question_key] = question
+        if use_cache:
+            self.answer_cache.put(question, dict(response), version, embedding)
+        response["latency"] = {
+            **{name: value for name, value in context.items() if name.endswith("_ms")},
+            "llm_ms": (answered - retrieved) * 1000,
+            "total_ms": (answered - started) * 1000,
+        }
+        if "context_tokens" in context:
+            response["context_tokens"] = context["context_tokens"]
+            logger.info("Context tokens: %s", context["context_tokens"])
+        logger.info("Query latency: %s", response["latency"])
+        return response
+
+    @staticmethod
+    def _sources(docs: List) -> List[str]:
+        return list(dict.fromkeys(doc.metadata.get("source", "") for doc in docs))
+
+    def stream_query(self, question: str, **kwargs: Any) -> Iterator[dict]:
+        """
+        Query the vector store and stream the answer as it is generated.
+
+        Args:
+            question (str): The query question.
+
+        Yields:
+            dict: First {"sources": [...]} with the sources of the retrieved documents, then {"token": "..."} for
+            every piece of the answer, and finally the same response `query_with_sources` returns, including the
+            time to first token (ttft_ms) in the latency breakdown.
+
+        Raises:
+            Any exceptions raised by the underlying retrieval process.
+        """
+        logger.debug("Streaming question: %s.", question)
+        chain = self._chain(**kwargs)
+        started = time.perf_counter()
+        use_cache = self.answer_cache is not None and not kwargs
+        if use_cache:
+            version = self.vectorstore_creator.version
+            cached, embedding = self.answer_cache.get(question, version)
+            if cached is not None:
+                cached[chain.question_key] = question
+                yield {"sources": [source.strip() for source in cached["sources"].split(",") if source.strip()]}
+                yield {"token": cached["answer"]}
+                total_ms = (time.perf_counter() - started) * 1000
+                cached["latency"] = {"retrieval_ms": 0.0, "ttft_ms": total_ms, "llm_ms": 0.0, "total_ms": total_ms}
+                logger.info("Query answered from the cache (%s) in %.1f ms.", cached["cache"], total_ms)
+                yield cached
+                return
+
+        docs, context = self._context(question)
+        retrieved = time.perf_counter()
+        yield {"sources": self._sources(docs)}
+
+        tokens = queue.Queue()
+        done = object()
+        result = {}
+
+        def answer():
+            try:
+                result.update(chain({chain.input_docs_key: docs, chain.question_key: question},
+                                    return_only_outputs=True, callbacks=[_TokenQueueHandler(tokens)]))
+            except Exception as error:
+                result["error"] = error
+            finally:
+                tokens.put(done)
+
+        thread = threading.Thread(target=answer, daemon=True)
+        thread.start()
+        answer_filter = _AnswerStreamFilter()
+        first_token = None
+        while (token := tokens.get()) is not done:
+            first_token = first_token or time.perf_counter()
+            text = answer_filter.feed(token)
+            if text:
+                yield {"token": text}
+        thread.join()
+        if "error" in result:
+            raise result["error"]
+        answered = time.perf_counter()
+
+        if first_token is None:
+            # The LLM doesn't stream, the whole answer is its first token.
+            first_token = answered
+            yield {"token": result["answer"]}
+        else:
+            text = answer_filter.flush()
+            if text:
+                yield {"token": text}
+
+        result[chain.question_key] = question
+        if use_cache:
+            self.answer_cache.put(question, dict(result), version, embedding)
+        result["latency"] = {
+            **{name: value for name, value in context.items() if name.endswith("_ms")},
+            "ttft_ms": (first_token - started) * 1000,
+            "llm_ms": (answered - retrieved) * 1000,
+            "total_ms": (answered - started) * 1000,
+        }
+        if "context_tokens" in context:
+            result["context_tokens"] = context["context_tokens"]
+            logger.info("Context tokens: %s", context["context_tokens"])
+        logger.info("Time to first token: %.1f ms, query latency: %s", result["latency"]["ttft_ms"], result["latency"])
+        yield result
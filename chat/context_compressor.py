@@ -0,0 +1,135 @@
+import logging
+import math
+import re
+from collections import Counter
+from typing import List
+from langchain.docstore.document import Document
+from streaming_loader import load_encoding
+from tiktoken.model import encoding_name_for_model
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class ContextCompressor:
+    """
+    Compresses the documents retrieved for a question into a token budget before they are sent to the LLM, so the
+    prompt grows with the relevant content instead of with the size of the chunks.
+
+    The documents are split into sentences, which are scored against the question with BM25, the inverse document
+    frequencies taken from the sentences themselves, so nothing else is embedded on the path of the query. Ties, such
+    as sentences sharing no word with the question, keep the order of the retrieval. The best sentences are packed
+    into `token_budget` tokens, skipping near-duplicates of the sentences already packed, and then regrouped by
+    document in their original order, keeping the metadata, and so the source, of every document.
+
+    Args:
+        token_budget (int): Maximum amount of tokens of the compressed context.
+        candidates (int): Amount of documents retrieved to pick the sentences from.
+        duplicate_threshold (float): Share of words in common (Jaccard similarity) above which a sentence
+            duplicates a packed one.
+        model_name (str): The model whose tokenizer counts the tokens.
+    """
+
+    SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+    WORD = re.compile(r"\w+")
+    # Words of the questions that tell nothing about the answer. The inverse document frequencies come from a few
+    # sentences, so they can't be relied upon to discount them.
+    STOP_WORDS = frozenset(
+        "a an and are as at be by can did do does for from had has have how i in is it its me my of on or than that "
+        "the their there these they this to was were what when where which who whom why will with you your".split()
+    )
+    # BM25 parameters, the usual ones.
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, token_budget: int = 600, candidates: int = 10, duplicate_threshold: float = 0.8,
+                 model_name: str = "gpt-3.5-turbo"):
+        """
+        Initialize the ContextCompressor.
+
+        Args:
+            token_budget (int): Maximum amount of tokens of the compressed context. Default is 600.
+            candidates (int): Amount of documents retrieved to pick the sentences from. Default is 10.
+            duplicate_threshold (float): Share of words in common (Jaccard similarity) above which a sentence
+            duplicates a packed one. Default is 0.8.
+            model_name (str): The model whose tokenizer counts the tokens. Default is "gpt-3.5-turbo".
+        """
+        self.token_budget = token_budget
+        self.candidates = candidates
+        self.duplicate_threshold = duplicate_threshold
+        try:
+            encoding_name = encoding_name_for_model(model_name)
+        except KeyError:
+            encoding_name = "cl100k_base"
+        # Counts words if the encoding can't be downloaded.
+        self.encoding = load_encoding(encoding_name)
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def _scores(self, question: str, sentences: List[str]) -> List[float]:
+        """
+        Returns:
+            List[float]: The BM25 score of every sentence for the words of the question.
+        """
+        words = [Counter(self.WORD.findall(sentence.lower())) for sentence in sentences]
+        average_length = sum(sum(counts.values()) for counts in words) / len(words) or 1
+        frequencies = Counter(word for counts in words for word in counts)
+        terms = set(self.WORD.findall(question.lower())) - self.STOP_WORDS
+        idf = {
+            term: math.log(1 + (len(words) - frequencies[term] + 0.5) / (frequencies[term] + 0.5))
+            for term in terms if frequencies[term]
+        }
+        scores = []
+        for counts in words:
+            length = sum(counts.values())
+            scores.append(sum(
+                weight * counts[term] * (self.K1 + 1)
+                / (counts[term] + self.K1 * (1 - self.B + self.B * length / average_length))
+                for term, weight in idf.items() if counts[term]
+            ))
+        return scores
+
+    def compress(self, question: str, docs: List[Document]) -> List[Document]:
+        """
+        Keep the sentences of the documents most relevant to the question that fit in the token budget.
+
+        Args:
+            question (str): The question.
+            docs (List[Document]): The retrieved documents, the most relevant first.
+
+        Returns:
+            List[Document]: A document per source document with packed sentences, the most relevant first.
+        """
+        sentences = [
+            (doc_index, sentence.strip())
+            for doc_index, doc in enumerate(docs)
+            for sentence in self.SENTENCE_END.split(doc.page_content) if sentence.strip()
+        ]
+        if not sentences:
+            return []
+        scores = self._scores(question, [sentence for _, sentence in sentences])
+        words = [set(self.WORD.findall(sentence.lower())) for _, sentence in sentences]
+
+        packed, used = [], 0
+        for index in sorted(range(len(sentences)), key=lambda index: -scores[index]):
+            if any(len(words[index] & words[other]) >= self.duplicate_threshold * len(words[index] | words[other])
+                   for other in packed):
+                continue
+            tokens = self.count_tokens(sentences[index][1]) + 1
+            if used + tokens > self.token_budget:
+                # A shorter sentence further down may still fit.
+                continue
+            packed.append(index)
+            used += tokens
+
+        by_doc = {}
+        for index in packed:
+            by_doc.setdefault(sentences[index][0], []).append(index)
+        return [
+            Document(page_content=" ".join(sentences[index][1] for index in sorted(indexes)),
+                     metadata=dict(docs[doc_index].metadata))
+            for doc_index, indexes in by_doc.items()
+        ]
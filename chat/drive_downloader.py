@@ -1,10 +1,13 @@
+import hashlib
+import json
 import logging
 import os
-from uuid import uuid4
-from typing import Optional
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
 from googleapiclient.errors import HttpError
 
 
@@ -13,17 +16,54 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
+class DriveChanges:
+    """
+    The local files affected by a sync with Google Drive.
+
+    Attributes:
+        updated (List[str]): Paths of the added or modified files.
+        removed (List[str]): Paths of the deleted files.
+        token (Optional[str]): The Drive changes token to store with `GoogleDriveDownloader.commit_token` once the
+            changes are applied, None if some files couldn't be downloaded and must be listed again.
+    """
+
+    def __init__(self, updated: List[str], removed: List[str], token: Optional[str] = None):
+        self.updated = updated
+        self.removed = removed
+        self.token = token
+
+    def __bool__(self):
+        return bool(self.updated or self.removed)
+
+    def __repr__(self):
+        return f"DriveChanges({len(self.updated)} updated, {len(self.removed)} removed)"
+
+
 class GoogleDriveDownloader:
     """
     A helper class to download files from Google Drive.
+    Files are named after their Drive id, and a manifest in the destination folder maps every Drive id to its
+    local copy and checksum, so re-runs only download new or modified files and resume interrupted downloads.
 
     Args:
         credentials_fileno (str): The Google Cloud credential file path.
         destination_folder (Optional[str]): The destination folder where the documents will be stored.
         Default is current directory.
+        max_workers (int): Amount of files downloaded concurrently.
+        chunk_size (int): Amount of bytes requested per download request.
+        drive_service (optional): A Drive service to use instead of building one from the credentials.
     """
 
-    def __init__(self, credentials_fileno: str, destination_folder: Optional[str] = '.'):
+    MANIFEST_FILENAME = ".drive_manifest.json"
+    PARTIAL_SUFFIX = ".part"
+    QUERY = "mimeType='application/octet-stream' and trashed=false"
+    FIELDS = "nextPageToken, files(id, name, md5Checksum, size)"
+    MIME_TYPE = "application/octet-stream"
+    CHANGES_FIELDS = "nextPageToken, newStartPageToken, " \
+                     "changes(fileId, removed, file(id, name, mimeType, md5Checksum, size, trashed))"
+
+    def __init__(self, credentials_fileno: str, destination_folder: Optional[str] = '.', max_workers: int = 8,
+                 chunk_size: int = 16 * 1024 * 1024, drive_service=None):
         """
         Initialize the GoogleDriveDownloader.
 
@@ -31,14 +71,79 @@ class GoogleDriveDownloader:
             credentials_fileno (str): The Google Cloud credential file path.
             destination_folder (Optional[str]): The destination folder where the documents will be stored.
             Default is current directory.
+            max_workers (int): Amount of files downloaded concurrently. Default is 8.
+            chunk_size (int): Amount of bytes requested per download request. Default is 16MB.
+            drive_service (optional): A Drive service to use instead of building one from the credentials.
+            Default is None.
         """
         self._credentials_fileno = credentials_fileno
-        self._drive_service = None
+        self._drive_service = drive_service
+        self._local = threading.local()
+        self._manifest_lock = threading.Lock()
+        self._manifest = None
         self.destination_folder = destination_folder
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.destination_folder, self.MANIFEST_FILENAME)
+
+    @property
+    def manifest(self) -> dict:
+        """
+        Get the download manifest: {"files": {drive id: {"path", "name", "md5Checksum"}}, "changes_token": ...,
+        "pending_changes": {"updated": [...], "removed": [...]}}, the pending changes being the ones synced but not
+        committed yet.
+
+        Returns:
+            dict: The manifest.
+        """
+        if self._manifest is None:
+            self._manifest = {"files": {}}
+            if os.path.exists(self.manifest_path):
+                with open(self.manifest_path) as f:
+                    self._manifest = json.load(f)
+        return self._manifest
+
+    def _save_manifest(self):
+        """
+        Write the manifest atomically. The manifest lock must be held by the caller.
+        """
+        temporary_path = f"{self.manifest_path}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(temporary_path, self.manifest_path)
+
+    def _local_path(self, file_metadata: dict) -> str:
+        """
+        Returns:
+            str: The path of the local copy of a Drive file, stable across runs.
+        """
+        name = re.sub(r"[^\w.-]", "_", file_metadata["name"])
+        return os.path.join(self.destination_folder, f'{file_metadata["id"]}-{name}')
+
+    @staticmethod
+    def _md5(path: str) -> str:
+        digest = hashlib.md5()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _is_up_to_date(self, file_metadata: dict) -> bool:
+        """
+        Check whether the local copy of a Drive file matches its checksum.
+        """
+        entry = self.manifest["files"].get(file_metadata["id"])
+        if not entry or not os.path.exists(entry["path"]):
+            return False
+        checksum = file_metadata.get("md5Checksum")
+        return checksum is not None and entry.get("md5Checksum") == checksum
 
     def get_document_content(self, file_metadata: dict):
         """
-        Download a file from Google Drive.
+        Download a file from Google Drive, resuming a previous partial download of the same file version.
 
         Args:
             file_metadata (dict): Metadata of the file to be downloaded.
@@ -49,28 +154,59 @@ class GoogleDriveDownloader:
         Raises:
             HttpError: If an error occurs during the download process.
         """
-        new_file_name = None
+        new_file_name = self._local_path(file_metadata)
+        # Partial downloads are hidden and tied to the file version, so they are only resumed for the same content.
+        partial_file_name = os.path.join(
+            self.destination_folder,
+            f".{os.path.basename(new_file_name)}.{file_metadata.get('md5Checksum')}{self.PARTIAL_SUFFIX}"
+        )
         try:
-            request = self.drive_service.files().get_media(
-                fileId=file_metadata["id"])
-            new_file_name = os.path.join(self.destination_folder, f'{str(uuid4())}-{file_metadata["name"]}') 
-            with open(new_file_name, "wb") as f:
-                downloader = MediaIoBaseDownload(f, request)
-                done = False
-                while done is False:
-                    status, done = downloader.next_chunk()
-                    logger.info(F'Download {int(status.progress() * 100)}.')
+            size = int(file_metadata.get("size") or 0)
+            offset = os.path.getsize(partial_file_name) if size and os.path.exists(partial_file_name) else 0
+            if offset:
+                logger.info("Resuming %s at byte %d.", file_metadata["name"], offset)
+            with open(partial_file_name, "ab" if offset else "wb") as f:
+                while offset < size:
+                    request = self.drive_service.files().get_media(fileId=file_metadata["id"])
+                    request.headers["Range"] = f"bytes={offset}-{min(offset + self.chunk_size, size) - 1}"
+                    content = request.execute()
+                    if not content:
+                        break
+                    f.write(content)
+                    f.flush()
+                    offset += len(content)
+                    logger.debug("Download %s %d%%.", file_metadata["name"], offset * 100 // size)
+                if not size:
+                    f.write(self.drive_service.files().get_media(fileId=file_metadata["id"]).execute())
+
+            checksum = file_metadata.get("md5Checksum")
+            if checksum and self._md5(partial_file_name) != checksum:
+                os.remove(partial_file_name)
+                logger.error("Checksum mismatch downloading %s.", file_metadata["name"])
+                return None
+            os.replace(partial_file_name, new_file_name)
 
         except HttpError as error:
             logger.error(F'An error occurred: {error}')
-            new_file_name = None
+            return None
 
+        with self._manifest_lock:
+            previous = self.manifest["files"].get(file_metadata["id"])
+            if previous and previous["path"] != new_file_name and os.path.exists(previous["path"]):
+                # The file was renamed in Drive, so its old copy is outdated.
+                os.remove(previous["path"])
+            self.manifest["files"][file_metadata["id"]] = {
+                "path": new_file_name, "name": file_metadata["name"], "md5Checksum": file_metadata.get("md5Checksum")
+            }
+            self._save_manifest()
+        logger.info("Downloaded %s.", new_file_name)
         return new_file_name
 
     @property
     def drive_service(self):
         """
-        Get the Google Drive service instance.
+        Get the Google Drive service instance. The HTTP client of the service isn't thread safe, so every thread
+        builds its own one.
 
         Returns:
             Resource: The Google Drive service instance.
@@ -78,26 +214,164 @@ class GoogleDriveDownloader:
         Raises:
             FileNotFoundError: If the credentials file is not found.
         """
-        if not self._drive_service:
+        if self._drive_service:
+            return self._drive_service
+        if not getattr(self._local, "drive_service", None):
             credentials = service_account.Credentials.from_service_account_file(self._credentials_fileno)
-            self._drive_service = build('drive', 'v3', credentials=credentials)
-        return self._drive_service
+            self._local.drive_service = build('drive', 'v3', credentials=credentials)
+        return self._local.drive_service
+
+    def list_files(self) -> Iterator[dict]:
+        """
+        List every file of the Drive, page by page.
+
+        Yields:
+            dict: The metadata of every file.
+        """
+        page_token = None
+        while True:
+            response = self.drive_service.files().list(
+                q=self.QUERY, fields=self.FIELDS, pageSize=1000, pageToken=page_token
+            ).execute()
+            yield from response.get('files', [])
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+    def _download(self, files: List[dict]) -> List[str]:
+        """
+        Download the files that don't have an up to date local copy in a thread pool.
+
+        Returns:
+            List[Optional[str]]: The path of every downloaded file, or None for the ones that failed.
+        """
+        pending = [file for file in files if not self._is_up_to_date(file)]
+        logger.info("%d files to download, %d already up to date.", len(pending), len(files) - len(pending))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self.get_document_content, pending))
 
     def download_files(self):
         """
         Download all the files from Google Drive.
 
         Returns:
-            None
+            List[str]: The paths of the downloaded files.
 
         Raises:
             Any exceptions raised during the file download process.
         """
-        files = self.drive_service.files().list(
-            q="mimeType='application/octet-stream'").execute().get('files', [])
-        for file in files:
-            content = self.get_document_content(file)
-            logger.info(content)
+        return [path for path in self._download(list(self.list_files())) if path]
+
+    def _remove_local_copy(self, file_id: str) -> Optional[str]:
+        """
+        Delete the local copy of a file removed from Drive.
+
+        Returns:
+            Optional[str]: The path of the deleted copy, or None if there wasn't one.
+        """
+        with self._manifest_lock:
+            entry = self.manifest["files"].pop(file_id, None)
+            self._save_manifest()
+        if entry is None:
+            return None
+        if os.path.exists(entry["path"]):
+            os.remove(entry["path"])
+        logger.info("Removed %s.", entry["path"])
+        return entry["path"]
+
+    def _list_changes(self, page_token: str):
+        """
+        List the changes since a page token, keeping only the last change of every file.
+
+        Returns:
+            tuple: The last change of every file and the token to request the next changes.
+        """
+        changes = {}
+        while True:
+            response = self.drive_service.changes().list(
+                pageToken=page_token, fields=self.CHANGES_FIELDS, pageSize=1000
+            ).execute()
+            for change in response.get("changes", []):
+                changes[change["fileId"]] = change
+            if "newStartPageToken" in response:
+                return changes, response["newStartPageToken"]
+            page_token = response["nextPageToken"]
+
+    def _download_tracking_renames(self, files: List[dict], removed: List[Optional[str]]) -> List[Optional[str]]:
+        """
+        Download the files, adding to `removed` the old local copies deleted because their file was renamed.
+
+        Returns:
+            List[Optional[str]]: The path of every downloaded file, or None for the ones that failed.
+        """
+        previous = {file["id"]: self.manifest["files"][file["id"]]["path"]
+                    for file in files if file["id"] in self.manifest["files"]}
+        updated = self._download(files)
+        removed.extend(path for file_id, path in previous.items()
+                       if self.manifest["files"].get(file_id, {}).get("path", path) != path)
+        return updated
+
+    def sync(self) -> DriveChanges:
+        """
+        Bring the destination folder up to date with Google Drive.
+        The first sync downloads every file, following syncs only ask Drive for the files added, modified or removed
+        since the changes token stored by `commit_token`. Until the changes are committed, every sync reports them
+        again along with the new ones, so changes that couldn't be applied are retried.
+
+        Returns:
+            DriveChanges: The local files that were added, modified or removed, and the token to commit.
+        """
+        token = self.manifest.get("changes_token")
+        if token is None:
+            # The token is taken before listing, so changes made while downloading are seen by the next sync.
+            new_token = self.drive_service.changes().getStartPageToken().execute()["startPageToken"]
+            files = list(self.list_files())
+            listed = {file["id"] for file in files}
+            removed = [self._remove_local_copy(file_id) for file_id in list(self.manifest["files"])
+                       if file_id not in listed]
+            updated = self._download_tracking_renames(files, removed)
+        else:
+            changes, new_token = self._list_changes(token)
+            removed, files = [], []
+            for file_id, change in changes.items():
+                file = change.get("file") or {}
+                if change.get("removed") or file.get("trashed") or file.get("mimeType") != self.MIME_TYPE:
+                    removed.append(self._remove_local_copy(file_id))
+                else:
+                    files.append(file)
+            updated = self._download_tracking_renames(files, removed)
+
+        if None in updated:
+            logger.warning("Some files couldn't be downloaded, they will be retried by the next sync.")
+            new_token = None
+        updated = [path for path in updated if path]
+        removed = [path for path in removed if path]
+        with self._manifest_lock:
+            pending = self.manifest.get("pending_changes", {"updated": [], "removed": []})
+            # The last change of a path wins.
+            updated = [path for path in pending["updated"] if path not in removed] + \
+                [path for path in updated if path not in pending["updated"]]
+            removed = [path for path in pending["removed"] if path not in updated] + \
+                [path for path in removed if path not in pending["removed"]]
+            self.manifest["pending_changes"] = {"updated": updated, "removed": removed}
+            self._save_manifest()
+        result = DriveChanges(updated, removed, new_token)
+        logger.info("Drive sync: %s", result)
+        return result
+
+    def commit_token(self, changes: DriveChanges):
+        """
+        Store the changes token of a sync once its changes are applied, so the next sync starts from there.
+
+        Args:
+            changes (DriveChanges): The applied changes.
+        """
+        if changes.token is None:
+            return
+        with self._manifest_lock:
+            self.manifest["changes_token"] = changes.token
+            self.manifest.pop("pending_changes", None)
+            self._save_manifest()
 
     def __delete__(self):
         """
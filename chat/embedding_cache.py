@@ -0,0 +1,214 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+from langchain.embeddings.base import Embeddings
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by the model name and the hash of the embedded text.
+    The vectors are stored as float32 blobs in a SQLite database and the least recently used entries are evicted
+    once the cache grows over `max_entries`.
+
+    Args:
+        path (str): The SQLite file path. Use ":memory:" for a non persistent cache.
+        max_entries (int): Maximum amount of vectors kept in the cache.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1_000_000):
+        """
+        Initialize the EmbeddingCache.
+
+        Args:
+            path (str): The SQLite file path. Use ":memory:" for a non persistent cache.
+            max_entries (int): Maximum amount of vectors kept in the cache.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash BLOB NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (model, text_hash)) WITHOUT ROWID"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._connection.commit()
+        self._size = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def _hash(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    @staticmethod
+    def _encode(vector: List[float]) -> bytes:
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes) -> List[float]:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up the embeddings of several texts.
+
+        Args:
+            model (str): The name of the embedding model.
+            texts (List[str]): The texts to look up.
+
+        Returns:
+            list: The cached embedding of each text, or None when it isn't cached.
+        """
+        hashes = [self._hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            # Query in slices to stay under the SQLite bound parameters limit.
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN "
+                    f"({','.join('?' * len(chunk))})",
+                    [model, *chunk]
+                )
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found]
+                )
+                self._connection.commit()
+            hits = sum(1 for text_hash in hashes if text_hash in found)
+            self.hits += hits
+            self.misses += len(hashes) - hits
+
+        return [self._decode(found[text_hash]) if text_hash in found else None for text_hash in hashes]
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[List[float]]):
+        """
+        Store the embeddings of several texts, evicting the least recently used ones if the cache is full.
+
+        Args:
+            model (str): The name of the embedding model.
+            texts (List[str]): The embedded texts.
+            embeddings (List[List[float]]): The embedding of each text.
+        """
+        now = time.time()
+        rows = [(model, self._hash(text), self._encode(vector), now) for text, vector in zip(texts, embeddings)]
+        with self._lock:
+            before = self._connection.total_changes
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)", rows
+            )
+            self._size += self._connection.total_changes - before
+            if self._size > self.max_entries:
+                self._evict(self._size - self.max_entries)
+            self._connection.commit()
+
+    def _evict(self, amount: int):
+        """
+        Remove the `amount` least recently used vectors. The lock must be held by the caller.
+        """
+        self._connection.execute(
+            "DELETE FROM embeddings WHERE (model, text_hash) IN "
+            "(SELECT model, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+            (amount,)
+        )
+        self._size -= amount
+        logger.debug("Evicted %d embeddings from the cache.", amount)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            dict: The hit and miss counters and the amount of cached vectors.
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": self._size}
+
+    def close(self):
+        """
+        Close the SQLite connection.
+        """
+        with self._lock:
+            self._connection.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embedding function that checks an EmbeddingCache before calling the wrapped one, so duplicated and previously
+    seen texts are not embedded again.
+
+    Args:
+        embeddings (Embeddings): The wrapped embedding function.
+        cache (EmbeddingCache): The cache of vectors.
+        model_name (Optional[str]): The name used to key the vectors. Default is the model of the wrapped function.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: Optional[str] = None):
+        """
+        Initialize the CachedEmbeddings.
+
+        Args:
+            embeddings (Embeddings): The wrapped embedding function.
+            cache (EmbeddingCache): The cache of vectors.
+            model_name (Optional[str]): The name used to key the vectors. Default is the model of the wrapped
+            function.
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name or getattr(embeddings, "model", None) or type(embeddings).__name__
+
+    def _embed(self, model: str, texts: List[str], embed) -> List[List[float]]:
+        """
+        Resolve the texts from the cache and embed only the distinct missing ones.
+        """
+        vectors = self.cache.get_many(model, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            computed = dict(zip(missing, embed(missing)))
+            self.cache.put_many(model, missing, [computed[text] for text in missing])
+            vectors = [computed[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a list of documents.
+
+        Args:
+            texts (List[str]): The documents to embed.
+
+        Returns:
+            List[List[float]]: The embedding of each document.
+        """
+        return self._embed(self.model_name, texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query. Queries are keyed apart from documents because some models embed them differently.
+
+        Args:
+            text (str): The query to embed.
+
+        Returns:
+            List[float]: The embedding of the query.
+        """
+        return self._embed(f"{self.model_name}:query", [text], lambda texts: [self.embeddings.embed_query(texts[0])])[0]
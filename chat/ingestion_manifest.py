@@ -0,0 +1,206 @@
+import hashlib
+import logging
+import os
+import sqlite3
+from typing import Dict, List, Optional, Set, Tuple
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Hash a file without loading it whole in memory.
+
+    Args:
+        path (str): The file path.
+        block_size (int): Amount of bytes read at a time.
+
+    Returns:
+        str: The hexadecimal SHA-256 of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestionPlan:
+    """
+    The work needed to bring the vector store up to date with the source files.
+
+    Attributes:
+        to_index (Dict[str, str]): Content hash -> path of the contents that must be split and embedded.
+        stale_chunk_ids (List[str]): Ids of the chunks whose content is no longer referenced by any file.
+        upserted (Dict[str, Tuple[str, float, int]]): Path -> (content hash, mtime, size) of new or modified files.
+        removed (List[str]): Paths of deleted files.
+    """
+
+    def __init__(self):
+        self.to_index = {}
+        self.stale_chunk_ids = []
+        self.upserted = {}
+        self.removed = []
+        self._stale_hashes = []
+
+    def __bool__(self):
+        return bool(self.upserted or self.removed)
+
+
+class IngestionManifest:
+    """
+    Records the fingerprint (content hash, mtime and size) of every ingested file and the ids of the chunks its
+    content produced, so only new, modified or deleted files have to be processed on every start.
+    Files with the same content share their chunks, therefore renamed or re-downloaded copies aren't indexed twice.
+    Contents are keyed by their hash and the chunking settings, so every file is split again when the settings
+    change.
+
+    Args:
+        path (str): The SQLite file path. Use ":memory:" for a non persistent manifest.
+        chunking (str): Describes how the contents are split into chunks, e.g. the repr of the splitter.
+    """
+
+    def __init__(self, path: str, chunking: str = ""):
+        """
+        Initialize the IngestionManifest.
+
+        Args:
+            path (str): The SQLite file path. Use ":memory:" for a non persistent manifest.
+            chunking (str): Describes how the contents are split into chunks, e.g. the repr of the splitter.
+            Default is "", which keys the contents by their hash alone.
+        """
+        self.path = path
+        self.chunking = chunking
+        self.created = path == ":memory:" or not os.path.exists(path)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, sha256 TEXT NOT NULL, mtime REAL NOT NULL, size INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256);"
+            "CREATE TABLE IF NOT EXISTS contents (sha256 TEXT PRIMARY KEY, chunk_count INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS chunks (chunk_id TEXT PRIMARY KEY, sha256 TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS chunks_sha256 ON chunks (sha256);"
+            "CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL);"
+        )
+        with self._connection:
+            stored = self._connection.execute("SELECT value FROM settings WHERE name = 'chunking'").fetchone()
+            if (stored[0] if stored else "") != chunking:
+                if self.paths():
+                    logger.info("The chunking changed to %s, every file will be split again.", chunking)
+                # Every file is hashed again, and its content gets a new key and new chunks.
+                self._connection.execute("UPDATE files SET mtime = -1")
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO settings (name, value) VALUES ('chunking', ?)", (chunking,)
+                )
+
+    def _content_key(self, path: str) -> str:
+        sha256 = file_sha256(path)
+        return hashlib.sha256(f"{self.chunking}\n{sha256}".encode()).hexdigest() if self.chunking else sha256
+
+    def _fingerprint(self, path: str) -> Optional[Tuple[str, float, int]]:
+        return self._connection.execute("SELECT sha256, mtime, size FROM files WHERE path = ?", (path,)).fetchone()
+
+    def _is_indexed(self, sha256: str) -> bool:
+        return self._connection.execute("SELECT 1 FROM contents WHERE sha256 = ?", (sha256,)).fetchone() is not None
+
+    def _references(self, sha256: str, excluded: Set[str]) -> int:
+        paths = self._connection.execute("SELECT path FROM files WHERE sha256 = ?", (sha256,))
+        return sum(1 for path, in paths if path not in excluded)
+
+    def paths(self) -> List[str]:
+        """
+        Returns:
+            List[str]: The paths of every recorded file.
+        """
+        return [path for path, in self._connection.execute("SELECT path FROM files")]
+
+    def plan(self, paths: List[str], removed: Optional[List[str]] = None) -> IngestionPlan:
+        """
+        Compare the given files against the manifest. Files whose mtime and size didn't change are not read.
+
+        Args:
+            paths (List[str]): The current source files.
+            removed (Optional[List[str]]): Files known to be deleted. Default is None, which treats every recorded
+            file missing from `paths` as deleted.
+
+        Returns:
+            IngestionPlan: The contents to index and the chunks to remove.
+        """
+        plan = IngestionPlan()
+        touched = []
+        for path in paths:
+            stat = os.stat(path)
+            fingerprint = self._fingerprint(path)
+            if fingerprint and fingerprint[1:] == (stat.st_mtime, stat.st_size):
+                continue
+            sha256 = self._content_key(path)
+            if fingerprint and fingerprint[0] == sha256:
+                touched.append((stat.st_mtime, stat.st_size, path))
+            else:
+                plan.upserted[path] = (sha256, stat.st_mtime, stat.st_size)
+
+        if removed is None:
+            current = set(paths)
+            removed = [path for path in self.paths() if path not in current]
+        plan.removed = [path for path in removed if path not in plan.upserted and self._fingerprint(path)]
+
+        if touched:
+            self._connection.executemany("UPDATE files SET mtime = ?, size = ? WHERE path = ?", touched)
+            self._connection.commit()
+
+        new_hashes = {sha256 for sha256, _, _ in plan.upserted.values()}
+        replaced = set(plan.upserted).union(plan.removed)
+        old_hashes = {fingerprint[0] for fingerprint in map(self._fingerprint, replaced) if fingerprint}
+        for sha256 in old_hashes - new_hashes:
+            if not self._references(sha256, replaced):
+                plan._stale_hashes.append(sha256)
+                plan.stale_chunk_ids += [
+                    chunk_id for chunk_id, in
+                    self._connection.execute("SELECT chunk_id FROM chunks WHERE sha256 = ?", (sha256,))
+                ]
+
+        for path, (sha256, _, _) in plan.upserted.items():
+            if sha256 not in plan.to_index and not self._is_indexed(sha256):
+                plan.to_index[sha256] = path
+
+        logger.info(
+            "%d new or modified files, %d deleted files, %d contents to index, %d stale chunks.",
+            len(plan.upserted), len(plan.removed), len(plan.to_index), len(plan.stale_chunk_ids)
+        )
+        return plan
+
+    def commit(self, plan: IngestionPlan, chunk_ids: Dict[str, List[str]]):
+        """
+        Record a plan once its chunks have been written to and removed from the vector store.
+
+        Args:
+            plan (IngestionPlan): The applied plan.
+            chunk_ids (Dict[str, List[str]]): Content hash -> ids of the chunks produced for every indexed content.
+        """
+        with self._connection:
+            for sha256 in plan._stale_hashes:
+                self._connection.execute("DELETE FROM chunks WHERE sha256 = ?", (sha256,))
+                self._connection.execute("DELETE FROM contents WHERE sha256 = ?", (sha256,))
+            self._connection.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in plan.removed])
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO files (path, sha256, mtime, size) VALUES (?, ?, ?, ?)",
+                [(path, *fingerprint) for path, fingerprint in plan.upserted.items()]
+            )
+            for sha256 in plan.to_index:
+                ids = chunk_ids.get(sha256, [])
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO contents (sha256, chunk_count) VALUES (?, ?)", (sha256, len(ids))
+                )
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO chunks (chunk_id, sha256) VALUES (?, ?)",
+                    [(chunk_id, sha256) for chunk_id in ids]
+                )
+
+    def close(self):
+        """
+        Close the SQLite connection.
+        """
+        self._connection.close()
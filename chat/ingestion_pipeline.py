@@ -0,0 +1,233 @@
+import logging
+import os
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from uuid import uuid4
+from langchain.docstore.document import Document
+from langchain.embeddings.base import Embeddings
+from streaming_loader import StreamingTokenSplitter, stream_and_split
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def load_and_split(file: str, splitter: Optional[StreamingTokenSplitter] = None) -> Tuple[str, List[Document]]:
+    """
+    Parse a JSON article and split it in chunks. It runs inside a worker process, so it must stay picklable.
+
+    Args:
+        file (str): The path of the JSON file.
+        splitter (Optional[StreamingTokenSplitter]): The splitter. Default is None, which uses the default one.
+
+    Returns:
+        tuple: The file path and the list of chunks produced from it.
+    """
+    return file, list(stream_and_split(file, splitter))
+
+
+class IngestionStats:
+    """
+    Counters and timings collected by the ingestion pipeline.
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.chunks = 0
+        self.embeddings = 0
+        self.batches = 0
+        self.parse_seconds = 0.0
+        self.embed_seconds = 0.0
+        self.write_seconds = 0.0
+        self.total_seconds = 0.0
+
+    @staticmethod
+    def _rate(count: int, seconds: float) -> float:
+        return count / seconds if seconds else 0.0
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: The counters and the throughput of every stage.
+        """
+        return {
+            "files": self.files,
+            "chunks": self.chunks,
+            "embeddings": self.embeddings,
+            "batches": self.batches,
+            "files_per_second": self._rate(self.files, self.parse_seconds),
+            "chunks_per_second": self._rate(self.chunks, self.total_seconds),
+            "embeddings_per_second": self._rate(self.embeddings, self.embed_seconds),
+            "write_seconds": self.write_seconds,
+            "total_seconds": self.total_seconds,
+        }
+
+    def log(self):
+        """
+        Log the throughput of every stage.
+        """
+        stats = self.as_dict()
+        logger.info(
+            "Ingested %d files (%.1f files/s), %d chunks (%.1f chunks/s), %d embeddings (%.1f embeddings/s) "
+            "in %.1fs, %.1fs writing to the DB.",
+            stats["files"], stats["files_per_second"], stats["chunks"], stats["chunks_per_second"],
+            stats["embeddings"], stats["embeddings_per_second"], stats["total_seconds"], stats["write_seconds"]
+        )
+
+
+class IngestionPipeline:
+    """
+    Parses and splits files in a process pool, embeds the chunks in batches keeping a bounded number of
+    embedding requests in flight, and hands every embedded batch to a writer in bulk. Files larger than
+    `stream_threshold` are streamed instead: their chunks are read, split and batched lazily in the main process,
+    so the memory used doesn't grow with the size of the file.
+
+    Args:
+        embedding_function (Embeddings): The embedding function used to vectorize the chunks.
+        writer (Callable): Called with (ids, texts, embeddings, metadatas) for every embedded batch.
+        batch_size (int): Amount of chunks sent to the embedding function per request.
+        max_workers (Optional[int]): Size of the parsing process pool. Default is the amount of CPUs.
+        max_in_flight (int): Maximum amount of concurrent embedding requests.
+        id_factory (Optional[Callable]): Called with (file, chunk index) to build the id of every chunk.
+        Default is None, which uses random ids.
+        splitter (Optional[StreamingTokenSplitter]): Splits the documents in chunks of tokens.
+        stream_threshold (int): Size in bytes above which a file is streamed instead of parsed in the pool.
+    """
+
+    def __init__(self, embedding_function: Embeddings, writer: Callable, batch_size: int = 64,
+                 max_workers: Optional[int] = None, max_in_flight: int = 4,
+                 id_factory: Optional[Callable[[str, int], str]] = None,
+                 splitter: Optional[StreamingTokenSplitter] = None, stream_threshold: int = 64 * 2 ** 20):
+        """
+        Initialize the IngestionPipeline.
+
+        Args:
+            embedding_function (Embeddings): The embedding function used to vectorize the chunks.
+            writer (Callable): Called with (ids, texts, embeddings, metadatas) for every embedded batch.
+            batch_size (int): Amount of chunks sent to the embedding function per request.
+            max_workers (Optional[int]): Size of the parsing process pool. Default is the amount of CPUs.
+            max_in_flight (int): Maximum amount of concurrent embedding requests.
+            id_factory (Optional[Callable]): Called with (file, chunk index) to build the id of every chunk.
+            Default is None, which uses random ids.
+            splitter (Optional[StreamingTokenSplitter]): Splits the documents in chunks of tokens. Default is None,
+            which uses chunks of 256 tokens overlapping by 32.
+            stream_threshold (int): Size in bytes above which a file is streamed instead of parsed in the pool.
+            Default is 64 MiB.
+        """
+        if batch_size < 1 or max_in_flight < 1:
+            raise ValueError("batch_size and max_in_flight must be positive")
+        self.embedding_function = embedding_function
+        self.writer = writer
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        self.id_factory = id_factory or (lambda file, index: str(uuid4()))
+        self.splitter = splitter or StreamingTokenSplitter()
+        self.stream_threshold = stream_threshold
+
+    def _parse(self, files: List[str], stats: IngestionStats) -> Iterator[Tuple[str, Iterable[Document]]]:
+        """
+        Parse the files in a process pool, yielding them as soon as they are ready. Only a bounded window of
+        files is submitted at a time so parsed chunks don't pile up while the embedding stage catches up.
+        Large files are yielded right away with a generator of their chunks.
+        """
+        started = time.monotonic()
+        max_workers = self.max_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            window = 2 * max_workers
+            pending_files = iter(files)
+            pending = set()
+            while True:
+                for file in pending_files:
+                    if os.path.getsize(file) > self.stream_threshold:
+                        stats.files += 1
+                        yield file, stream_and_split(file, self.splitter)
+                        continue
+                    pending.add(executor.submit(load_and_split, file, self.splitter))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stats.files += 1
+                    stats.parse_seconds = time.monotonic() - started
+                    yield future.result()
+
+    def _batches(self, parsed: Iterable[Tuple[str, Iterable[Document]]], stats: IngestionStats,
+                 on_file: Optional[Callable[[str, List[str]], None]]) -> Iterator[List[Tuple[str, Document]]]:
+        """
+        Assign an id to every chunk and group the chunks of the parsed files in batches of `batch_size`.
+        The chunks are consumed one at a time, so a streamed file is never fully in memory.
+        """
+        batch = []
+        for file, docs in parsed:
+            ids = []
+            for index, doc in enumerate(docs):
+                ids.append(self.id_factory(file, index))
+                batch.append((ids[-1], doc))
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+            logger.debug("%s produced %d chunks.", file, len(ids))
+            stats.chunks += len(ids)
+            if on_file:
+                on_file(file, ids)
+        if batch:
+            yield batch
+
+    def _embed(self, batch: List[Tuple[str, Document]]) -> Tuple[List[Tuple[str, Document]], List[List[float]]]:
+        return batch, self.embedding_function.embed_documents([doc.page_content for _, doc in batch])
+
+    def _write(self, batch: List[Tuple[str, Document]], embeddings: List[List[float]], stats: IngestionStats):
+        started = time.monotonic()
+        self.writer(
+            [chunk_id for chunk_id, _ in batch],
+            [doc.page_content for _, doc in batch],
+            embeddings,
+            [doc.metadata for _, doc in batch],
+        )
+        stats.write_seconds += time.monotonic() - started
+        stats.embeddings += len(embeddings)
+        stats.batches += 1
+
+    def run(self, files: List[str], on_file: Optional[Callable[[str, List[str]], None]] = None) -> IngestionStats:
+        """
+        Ingest the given files.
+
+        Args:
+            files (List[str]): The files to ingest.
+            on_file (Optional[Callable]): Called with (file, chunk ids) once all the chunks of a file have been
+            batched.
+
+        Returns:
+            IngestionStats: The counters and timings of the run.
+        """
+        stats = IngestionStats()
+        started = time.monotonic()
+        embed_started = None
+        in_flight = set()
+
+        def drain(return_when):
+            nonlocal in_flight
+            done, in_flight = wait(in_flight, return_when=return_when)
+            for future in done:
+                batch, embeddings = future.result()
+                self._write(batch, embeddings, stats)
+            stats.embed_seconds = time.monotonic() - embed_started
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            for batch in self._batches(self._parse(files, stats), stats, on_file):
+                if embed_started is None:
+                    embed_started = time.monotonic()
+                if len(in_flight) >= self.max_in_flight:
+                    drain(FIRST_COMPLETED)
+                in_flight.add(executor.submit(self._embed, batch))
+            if in_flight:
+                drain(ALL_COMPLETED)
+
+        stats.total_seconds = time.monotonic() - started
+        stats.log()
+        return stats
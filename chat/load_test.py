@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+import aiohttp
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+QUESTIONS = [
+    "What was Jim Abdo looking for?",
+    "What is Northrop Grumman?",
+    "Who is Joe Biden?",
+]
+
+
+async def _ask(session: aiohttp.ClientSession, url: str, question: str, latencies: list, statuses: Counter):
+    started = time.perf_counter()
+    try:
+        async with session.post(url, json={"question": question}) as response:
+            await response.read()
+            statuses[response.status] += 1
+    except aiohttp.ClientError as error:
+        statuses[type(error).__name__] += 1
+    latencies.append(time.perf_counter() - started)
+
+
+def _percentile(values: list, percentile: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * percentile), len(values) - 1)] if values else 0.0
+
+
+async def load_test(url: str, requests: int, concurrency: int) -> dict:
+    """
+    Send questions to a running QA server keeping `concurrency` requests in flight.
+
+    Args:
+        url (str): The URL of the query endpoint.
+        requests (int): Amount of questions to send.
+        concurrency (int): Amount of concurrent clients.
+
+    Returns:
+        dict: The status codes, the throughput and the latency percentiles.
+    """
+    latencies, statuses = [], Counter()
+    queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(QUESTIONS[index % len(QUESTIONS)])
+
+    async def client(session):
+        while not queue.empty():
+            await _ask(session, url, queue.get_nowait(), latencies, statuses)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "statuses": dict(statuses),
+        "requests_per_second": requests / elapsed,
+        "p50_ms": _percentile(latencies, 0.5) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+    }
+
+
+if __name__ == '__main__':
+
+    QA_URL = os.getenv("QA_URL", default="http://localhost:8080/query")
+    LOAD_TEST_REQUESTS = int(os.getenv("LOAD_TEST_REQUESTS", default="200"))
+    LOAD_TEST_CONCURRENCY = int(os.getenv("LOAD_TEST_CONCURRENCY", default="32"))
+
+    logger.info("Load test result: %s", asyncio.run(load_test(QA_URL, LOAD_TEST_REQUESTS, LOAD_TEST_CONCURRENCY)))
+
+
+"""
+To load-test the serving path without network access, start the server in offline mode:
+
+CHAT_MODE=serve OFFLINE=1 python main.py
+python load_test.py
+"""
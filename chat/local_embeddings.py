@@ -0,0 +1,76 @@
+import logging
+import threading
+from typing import List, Optional
+import torch
+from langchain.embeddings.base import Embeddings
+from sentence_transformers import SentenceTransformer
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Embedding function running a sentence-transformers model on the CPU, so ingesting and querying don't pay
+    network latency nor per-token costs. It can be given to VectorStoreDBCreator as `embedding_function`, for
+    example `functools.partial(LocalEmbeddings, batch_size=64)`.
+
+    Batches are encoded one at a time: every batch already uses `num_threads` threads, and running several batches
+    concurrently would only oversubscribe the CPU.
+
+    Args:
+        model_name (str): The sentence-transformers model.
+        batch_size (int): Amount of texts encoded per forward pass.
+        num_threads (Optional[int]): Amount of CPU threads used by the inference. Default is the torch default.
+    """
+
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", batch_size: int = 32,
+                 num_threads: Optional[int] = None):
+        """
+        Initialize the LocalEmbeddings.
+
+        Args:
+            model_name (str): The sentence-transformers model. Default is all-MiniLM-L6-v2.
+            batch_size (int): Amount of texts encoded per forward pass. Default is 32.
+            num_threads (Optional[int]): Amount of CPU threads used by the inference. Default is the torch default.
+        """
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        logger.info("Loading %s on the CPU with %d threads.", model_name, torch.get_num_threads())
+        self.model = model_name
+        self.batch_size = batch_size
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self._lock = threading.Lock()
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        with self._lock, torch.inference_mode():
+            return self._model.encode(
+                texts, batch_size=self.batch_size, convert_to_numpy=True, normalize_embeddings=True,
+                show_progress_bar=False
+            ).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a list of documents.
+
+        Args:
+            texts (List[str]): The documents to embed.
+
+        Returns:
+            List[List[float]]: The embedding of each document.
+        """
+        return self._encode(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query.
+
+        Args:
+            text (str): The query to embed.
+
+        Returns:
+            List[float]: The embedding of the query.
+        """
+        return self._encode([text])[0]
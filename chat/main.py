@@ -1,7 +1,15 @@
 import logging
 import os
+import threading
+from functools import partial
 from drive_downloader import GoogleDriveDownloader
+from answer_cache import SemanticAnswerCache
 from context_aware_qa import ContextAwareQA
+from context_compressor import ContextCompressor
+from embedding_cache import EmbeddingCache
+from offline import HashingEmbeddings, OfflineLLM
+from server import QAServer
+from streaming_loader import StreamingTokenSplitter
 from vectorizer_db_factory import VectorStoreDBCreator
 
 # Configure the logging settings
@@ -14,32 +22,124 @@ if __name__ == '__main__':
     DOWNLOAD_FOLDER = os.getenv("DOWNLOAD_FOLDER", default="downloads")
     VECTOR_DB_DIRECTORY = os.getenv("CHROMADB_FOLDER", default="chromadb")
     DRIVE_CREDENTIAL_FILE = "telescope-391101-0d419a69f595.json"
+    DOWNLOAD_MAX_WORKERS = int(os.getenv("DOWNLOAD_MAX_WORKERS", default="8"))
+    DRIVE_SYNC_INTERVAL = float(os.getenv("DRIVE_SYNC_INTERVAL", default="0"))
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", default="64"))
+    INGEST_MAX_IN_FLIGHT = int(os.getenv("INGEST_MAX_IN_FLIGHT", default="4"))
+    INGEST_CHUNK_TOKENS = int(os.getenv("INGEST_CHUNK_TOKENS", default="256"))
+    INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", default="32"))
+    EMBEDDING_CACHE_FILE = os.getenv("EMBEDDING_CACHE_FILE", default="embedding_cache.sqlite3")
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", default="1000000"))
+    RETRIEVER_K = int(os.getenv("RETRIEVER_K", default="3"))
+    RETRIEVER_SEARCH_TYPE = os.getenv("RETRIEVER_SEARCH_TYPE", default="similarity")
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", default="0.95"))
+    ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", default="3600"))
+    ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", default="1024"))
+    CHAT_MODE = os.getenv("CHAT_MODE", default="cli")
+    SERVER_PORT = int(os.getenv("SERVER_PORT", default="8080"))
+    SERVER_MAX_CONCURRENCY = int(os.getenv("SERVER_MAX_CONCURRENCY", default="8"))
+    SERVER_MAX_QUEUE = int(os.getenv("SERVER_MAX_QUEUE", default="64"))
+    SERVER_REQUEST_TIMEOUT = float(os.getenv("SERVER_REQUEST_TIMEOUT", default="30"))
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", default="openai")
+    LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", default="sentence-transformers/all-MiniLM-L6-v2")
+    LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", default="32"))
+    LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", default="0")) or None
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", default="chroma")
+    # 0 sends the retrieved documents as they are.
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", default="0"))
+    CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", default="10"))
+    # Offline mode uses local fake embeddings and LLM, so the bot can be load-tested without network access.
+    OFFLINE = os.getenv("OFFLINE", default="") == "1"
+    OFFLINE_LLM_LATENCY = float(os.getenv("OFFLINE_LLM_LATENCY", default="0.5"))
 
     if not os.path.exists(DOWNLOAD_FOLDER):
         os.mkdir(DOWNLOAD_FOLDER)
 
-    if not os.listdir(DOWNLOAD_FOLDER):
-        gdd = GoogleDriveDownloader(DRIVE_CREDENTIAL_FILE, DOWNLOAD_FOLDER)
-        gdd.download_files()
+    if not OFFLINE:
+        gdd = GoogleDriveDownloader(DRIVE_CREDENTIAL_FILE, DOWNLOAD_FOLDER, max_workers=DOWNLOAD_MAX_WORKERS)
+        initial_changes = gdd.sync()
 
     corpora_folder = DOWNLOAD_FOLDER
 
-    vdb_factory = VectorStoreDBCreator(corpora_folder=corpora_folder, persistent_directory=VECTOR_DB_DIRECTORY)
+    embedding_function = None
+    if OFFLINE:
+        embedding_function = HashingEmbeddings
+    elif EMBEDDING_BACKEND == "local":
+        try:
+            from local_embeddings import LocalEmbeddings
+        except ImportError as error:
+            raise ImportError("EMBEDDING_BACKEND=local needs the packages of requirements-local.txt, build the image "
+                              "with --build-arg LOCAL_EMBEDDINGS=1") from error
+        embedding_function = partial(LocalEmbeddings, model_name=LOCAL_EMBEDDING_MODEL,
+                                     batch_size=LOCAL_EMBEDDING_BATCH_SIZE, num_threads=LOCAL_EMBEDDING_THREADS)
+        # Vectors of different models can't share a collection.
+        VECTOR_DB_DIRECTORY = os.path.join(VECTOR_DB_DIRECTORY, f"local-{os.path.basename(LOCAL_EMBEDDING_MODEL)}")
+    if VECTOR_BACKEND == "quantized":
+        # The ingestion manifest of each backend tells what is in its own store.
+        VECTOR_DB_DIRECTORY = os.path.join(VECTOR_DB_DIRECTORY, "quantized")
+
+    vdb_factory = VectorStoreDBCreator(corpora_folder=corpora_folder,
+                                       persistent_directory=None if OFFLINE else VECTOR_DB_DIRECTORY,
+                                       embedding_function=embedding_function,
+                                       batch_size=INGEST_BATCH_SIZE, max_in_flight=INGEST_MAX_IN_FLIGHT,
+                                       embedding_cache=EmbeddingCache(EMBEDDING_CACHE_FILE, EMBEDDING_CACHE_SIZE),
+                                       vector_backend=VECTOR_BACKEND,
+                                       splitter=StreamingTokenSplitter(INGEST_CHUNK_TOKENS, INGEST_CHUNK_OVERLAP))
     db = vdb_factory.vectorstore
-    qa = ContextAwareQA(vdb_factory)
+    if not OFFLINE:
+        # Loading the vector store ingested the whole download folder, the startup sync included.
+        gdd.commit_token(initial_changes)
+    answer_cache = SemanticAnswerCache(vdb_factory.embedding_function, similarity_threshold=ANSWER_CACHE_THRESHOLD,
+                                       ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_SIZE)
+    compressor = ContextCompressor(token_budget=CONTEXT_TOKEN_BUDGET,
+                                   candidates=CONTEXT_CANDIDATES) if CONTEXT_TOKEN_BUDGET > 0 else None
+    qa = ContextAwareQA(vdb_factory, llm=OfflineLLM(latency=OFFLINE_LLM_LATENCY) if OFFLINE else None,
+                        k=RETRIEVER_K, search_type=RETRIEVER_SEARCH_TYPE, answer_cache=answer_cache,
+                        compressor=compressor)
+
+    def refresh_periodically(stop: threading.Event):
+        """
+        Fetch the Drive changes every DRIVE_SYNC_INTERVAL seconds and apply exactly those to the vector store.
+        """
+        while not stop.wait(DRIVE_SYNC_INTERVAL):
+            try:
+                changes = gdd.sync()
+                if changes:
+                    vdb_factory.apply_changes(changes.updated, changes.removed)
+                # Only once they are applied, a failed sync reports the same changes again.
+                gdd.commit_token(changes)
+            except Exception:
+                logger.exception("Drive sync failed, retrying in %s seconds.", DRIVE_SYNC_INTERVAL)
+
+    if DRIVE_SYNC_INTERVAL > 0 and not OFFLINE:
+        threading.Thread(target=refresh_periodically, args=(threading.Event(),), daemon=True).start()
 
-    while True:
+    if CHAT_MODE == "serve":
+        QAServer(qa, max_concurrency=SERVER_MAX_CONCURRENCY, max_queue=SERVER_MAX_QUEUE,
+                 request_timeout=SERVER_REQUEST_TIMEOUT).run(port=SERVER_PORT)
+
+    while CHAT_MODE == "cli":
         try:
             question = input('Ask me anything(ctrl + D to close):\n')
         except EOFError:
             logger.info("Exiting")
             break
-        response = qa.query_with_sources(question)
         print("="*20)
-        print(f'Answer: {response["answer"]}')
+        print("Answer: ", end="", flush=True)
+        for event in qa.stream_query(question):
+            if "token" in event:
+                print(event["token"], end="", flush=True)
+            elif "answer" in event:
+                response = event
+        print()
         print("="*20)
         print(f'Sources: {response["sources"]}')
         print("="*20)
+        print("Latency: retrieval {retrieval_ms:.0f} ms, first token {ttft_ms:.0f} ms, LLM {llm_ms:.0f} ms, "
+              "total {total_ms:.0f} ms".format(**response["latency"]))
+        if "context_tokens" in response:
+            print("Context tokens: {before} before compression, {after} after".format(**response["context_tokens"]))
+        print("="*20)
 
 
 """
@@ -50,4 +150,8 @@ examples:
 
 To Run
 docker run -it -v $(pwd)/downloads:/downloads -v $(pwd)/chromadb:/chromadb -e "OPENAI_API_KEY=$(cat openai_secret_key)" chat-bot
+
+To Serve
+docker run -p 8080:8080 -v $(pwd)/downloads:/downloads -v $(pwd)/chromadb:/chromadb -e "CHAT_MODE=serve" -e "OPENAI_API_KEY=$(cat openai_secret_key)" chat-bot
+curl -X POST localhost:8080/query -d '{"question": "What is Northrop Grumman?"}'
 """
@@ -0,0 +1,194 @@
+import hashlib
+import math
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from langchain.embeddings.base import Embeddings
+from langchain.llms.base import LLM
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings computed locally with the hashing trick. They need no network access,
+    so the QA bot can be run and load-tested offline, while similar texts still get similar vectors.
+
+    Args:
+        size (int): The dimension of the vectors.
+    """
+
+    def __init__(self, size: int = 256):
+        """
+        Initialize the HashingEmbeddings.
+
+        Args:
+            size (int): The dimension of the vectors. Default is 256.
+        """
+        self.size = size
+        self.model = f"hashing-{size}"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for word in re.findall(r"\w+", text.lower()):
+            digest = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:8], "little")
+            vector[digest % self.size] += 1.0 if digest >> 63 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector] if norm else vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a list of documents.
+
+        Args:
+            texts (List[str]): The documents to embed.
+
+        Returns:
+            List[List[float]]: The embedding of each document.
+        """
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query.
+
+        Args:
+            text (str): The query to embed.
+
+        Returns:
+            List[float]: The embedding of the query.
+        """
+        return self._embed(text)
+
+
+class OfflineLLM(LLM):
+    """
+    Fake language model that answers after a fixed latency, citing the sources found in the prompt.
+    It simulates the LLM calls when load-testing without network access. The answer is streamed word by word,
+    `latency` is spent before the first token and `token_latency` between tokens.
+    """
+
+    latency: float = 0.5
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "offline"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        time.sleep(self.latency)
+        sources = dict.fromkeys(re.findall(r"^Source: (.+)$", prompt, flags=re.MULTILINE))
+        answer = f"This is an offline answer.\nSOURCES: {', '.join(sources)}"
+        if run_manager:
+            for index, token in enumerate(re.findall(r"\s*\S+", answer)):
+                if index:
+                    time.sleep(self.token_latency)
+                run_manager.on_llm_new_token(token)
+        return answer
+
+
+class _FakeRequest:
+    """
+    A Drive API request whose response is computed when executed.
+    """
+
+    def __init__(self, execute):
+        self._execute = execute
+        self.headers = {}
+
+    def execute(self):
+        return self._execute(self.headers)
+
+
+class FakeDriveService:
+    """
+    In-memory stand-in for the Google Drive v3 service, covering the calls made by GoogleDriveDownloader:
+    files().list, files().get_media (with Range headers), changes().getStartPageToken and changes().list.
+    Files are added, modified and removed with `put_file` and `delete_file`, which record the changes.
+
+    Args:
+        files (Optional[Dict[str, tuple]]): Drive id -> (name, content) of the initial files.
+    """
+
+    MIME_TYPE = "application/octet-stream"
+
+    def __init__(self, files: Optional[Dict[str, tuple]] = None):
+        self._files = {}
+        self._changes = []
+        self._lock = threading.Lock()
+        for file_id, (name, content) in (files or {}).items():
+            self.put_file(file_id, name, content)
+
+    def _metadata(self, file_id: str) -> dict:
+        name, content = self._files[file_id]
+        return {
+            "id": file_id, "name": name, "mimeType": self.MIME_TYPE, "trashed": False,
+            "md5Checksum": hashlib.md5(content).hexdigest(), "size": str(len(content)),
+        }
+
+    def put_file(self, file_id: str, name: str, content: bytes):
+        """
+        Add or modify a file.
+        """
+        with self._lock:
+            self._files[file_id] = (name, content)
+            self._changes.append({"fileId": file_id, "removed": False, "file": self._metadata(file_id)})
+
+    def delete_file(self, file_id: str):
+        """
+        Remove a file.
+        """
+        with self._lock:
+            del self._files[file_id]
+            self._changes.append({"fileId": file_id, "removed": True})
+
+    def files(self):
+        return self
+
+    def changes(self):
+        return _FakeChanges(self)
+
+    def list(self, pageSize: int = 100, pageToken: Optional[str] = None, **kwargs: Any) -> _FakeRequest:
+        def execute(headers):
+            with self._lock:
+                ids = sorted(self._files)
+                start = int(pageToken or 0)
+                response = {"files": [self._metadata(file_id) for file_id in ids[start:start + pageSize]]}
+                if start + pageSize < len(ids):
+                    response["nextPageToken"] = str(start + pageSize)
+                return response
+        return _FakeRequest(execute)
+
+    def get_media(self, fileId: str) -> _FakeRequest:
+        def execute(headers):
+            with self._lock:
+                content = self._files[fileId][1]
+            match = re.match(r"bytes=(\d+)-(\d+)", headers.get("Range", ""))
+            return content[int(match.group(1)):int(match.group(2)) + 1] if match else content
+        return _FakeRequest(execute)
+
+    def close(self):
+        pass
+
+
+class _FakeChanges:
+    """
+    The changes() resource of FakeDriveService.
+    """
+
+    def __init__(self, service: FakeDriveService):
+        self._service = service
+
+    def getStartPageToken(self) -> _FakeRequest:
+        return _FakeRequest(lambda headers: {"startPageToken": str(len(self._service._changes))})
+
+    def list(self, pageToken: str, pageSize: int = 100, **kwargs: Any) -> _FakeRequest:
+        def execute(headers):
+            with self._service._lock:
+                start, end = int(pageToken), len(self._service._changes)
+                response = {"changes": self._service._changes[start:start + pageSize]}
+            if start + pageSize < end:
+                response["nextPageToken"] = str(start + pageSize)
+            else:
+                response["newStartPageToken"] = str(end)
+            return response
+        return _FakeRequest(execute)
@@ -0,0 +1,535 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Iterable, List, Optional, Tuple
+import numpy as np
+from langchain.docstore.document import Document
+from langchain.embeddings.base import Embeddings
+from langchain.vectorstores.base import VectorStore
+from langchain.vectorstores.utils import maximal_marginal_relevance
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def train_centroids(sample: np.ndarray, count: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means, the centroids of the inverted lists.
+
+    Args:
+        sample (np.ndarray): Normalized training vectors.
+        count (int): Amount of centroids.
+        iterations (int): Rounds of Lloyd's algorithm. Default is 10.
+        seed (int): Seed of the initial centroids. Default is 0.
+
+    Returns:
+        np.ndarray: The normalized centroids.
+    """
+    random = np.random.default_rng(seed)
+    centroids = sample[random.choice(len(sample), count, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sizes = np.bincount(assignments, minlength=count)
+        empty = sizes == 0
+        grouped, ends = sample[np.argsort(assignments, kind="stable")], np.cumsum(sizes)
+        sums = np.stack([grouped[end - size:end].sum(axis=0) for end, size in zip(ends, sizes)])
+        # Empty lists are restarted on random vectors instead of being lost.
+        sums[empty] = sample[random.choice(len(sample), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids.astype(np.float32)
+
+
+class _Generation:
+    """
+    An immutable build of the index, memory-mapped from its folder. Vectors are sorted by inverted list, so the
+    lists probed by a query are contiguous slices of the files.
+    """
+
+    FILES = ("vectors", "codes", "scales", "keys", "centroids", "offsets")
+
+    def __init__(self, path: str):
+        self.path = path
+        for name in self.FILES:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.offsets = np.asarray(self.offsets)
+        self.centroids = np.asarray(self.centroids)
+
+
+class IVFInt8Index:
+    """
+    Inverted-file index of normalized vectors for cosine similarity. Vectors are clustered in about 4 * sqrt(N)
+    lists with k-means and stored as int8 codes with a scale per vector. A query scans the codes of the `nprobe`
+    lists closest to it and re-ranks the best `rerank` candidates with the full precision vectors.
+
+    The index is written to `directory` as .npy files opened with mmap, so processes serving the same index share
+    a single copy through the page cache and open it without reading it. Added vectors are searched exhaustively
+    until `build` writes a new generation of the files. In between, `flush` writes them as a delta next to the
+    current generation, which costs as much as the delta itself instead of the whole index. A single process should
+    write an index, the other ones pick up every new generation and delta on their next query.
+
+    Args:
+        directory (str): The folder of the index.
+        nprobe (int): Amount of lists scanned per query.
+        rerank (int): Amount of candidates re-ranked in full precision.
+    """
+
+    RETRAIN_GROWTH = 4
+    TRAINING_POINTS_PER_LIST = 40
+    BUILD_CHUNK = 65536
+
+    def __init__(self, directory: str, nprobe: int = 16, rerank: int = 100):
+        """
+        Initialize the IVFInt8Index.
+
+        Args:
+            directory (str): The folder of the index.
+            nprobe (int): Amount of lists scanned per query. Default is 16.
+            rerank (int): Amount of candidates re-ranked in full precision. Default is 100.
+        """
+        self.directory = directory
+        self.nprobe = nprobe
+        self.rerank = rerank
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._generation = None
+        # The lines of the CURRENT file: the name of the generation, "" if there is none, and of its deltas.
+        self._current = ()
+        self._current_mtime = None
+        # Vectors not in the generation, the first `_flushed` ones are in the deltas.
+        self._pending_keys = np.empty(0, dtype=np.int64)
+        self._pending_vectors = None
+        self._flushed = 0
+        self._reload()
+
+    @property
+    def _current_path(self) -> str:
+        return os.path.join(self.directory, "CURRENT")
+
+    def _reload(self):
+        """
+        Open the latest generation and deltas if another process wrote new ones.
+        """
+        try:
+            mtime = os.stat(self._current_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._current_mtime:
+            return
+        with self._lock:
+            self._current_mtime = mtime
+            try:
+                with open(self._current_path) as f:
+                    current = tuple(f.read().split("\n"))
+            except FileNotFoundError:
+                current = ()
+            if current == self._current:
+                return
+            name = current[0] if current else ""
+            if name != (self._current[0] if self._current else ""):
+                self._generation = _Generation(os.path.join(self.directory, name)) if name else None
+                logger.info("Opened the index generation %s.", name or None)
+            deltas = [os.path.join(self.directory, name) for name in current[1:]]
+            keys = [np.load(os.path.join(path, "keys.npy")) for path in deltas]
+            vectors = [np.load(os.path.join(path, "vectors.npy")) for path in deltas]
+            # Vectors this process added and didn't flush yet stay pending after the deltas.
+            keys.append(self._pending_keys[self._flushed:])
+            if self._pending_vectors is not None:
+                vectors.append(self._pending_vectors[self._flushed:])
+            self._pending_keys = np.concatenate(keys)
+            self._pending_vectors = np.concatenate(vectors) if vectors else None
+            self._flushed = len(self._pending_keys) - len(keys[-1])
+            self._current = current
+
+    def _write_current(self, current: Tuple[str, ...]):
+        """
+        Point the CURRENT file to a generation and its deltas, atomically. Must be called holding the lock.
+        """
+        if any(current):
+            temporary_path = f"{self._current_path}.tmp"
+            with open(temporary_path, "w") as f:
+                f.write("\n".join(current))
+            os.replace(temporary_path, self._current_path)
+        elif os.path.exists(self._current_path):
+            os.remove(self._current_path)
+            current = ()
+        self._current = current
+
+    def __len__(self) -> int:
+        return (len(self._generation.keys) if self._generation is not None else 0) + len(self._pending_keys)
+
+    @property
+    def pending_count(self) -> int:
+        """
+        Amount of vectors added since the last build, flushed to a delta or not.
+        """
+        return len(self._pending_keys)
+
+    def add(self, keys: np.ndarray, vectors: np.ndarray):
+        """
+        Add vectors, searchable right away and written to disk by the next `build`.
+
+        Args:
+            keys (np.ndarray): An int64 key per vector.
+            vectors (np.ndarray): The vectors.
+        """
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            self._pending_keys = np.concatenate([self._pending_keys, np.asarray(keys, dtype=np.int64)])
+            self._pending_vectors = vectors if self._pending_vectors is None else np.concatenate(
+                [self._pending_vectors, vectors]
+            )
+
+    def search(self, query: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find the vectors most similar to a query.
+
+        Args:
+            query (np.ndarray): The query vector.
+            count (int): Amount of results.
+
+        Returns:
+            tuple: The keys, the cosine similarities and the vectors of the results, the most similar first.
+        """
+        self._reload()
+        query = _normalize(np.asarray(query, dtype=np.float32))
+        with self._lock:
+            generation, pending_keys, pending_vectors = self._generation, self._pending_keys, self._pending_vectors
+        keys, scores, vectors = [], [], []
+        if generation is not None and len(generation.keys):
+            lists = generation.centroids @ query
+            nprobe = min(self.nprobe, len(lists))
+            candidates, approximate = [], []
+            for inverted_list in np.argpartition(-lists, nprobe - 1)[:nprobe]:
+                start, end = generation.offsets[inverted_list], generation.offsets[inverted_list + 1]
+                if end > start:
+                    candidates.append(np.arange(start, end))
+                    approximate.append((generation.codes[start:end] @ query) * generation.scales[start:end])
+            if candidates:
+                candidates, approximate = np.concatenate(candidates), np.concatenate(approximate)
+                size = min(max(self.rerank, count), len(candidates))
+                rows = np.sort(candidates[np.argpartition(-approximate, size - 1)[:size]])
+                exact = generation.vectors[rows]
+                keys.append(generation.keys[rows])
+                scores.append(exact @ query)
+                vectors.append(exact)
+        if len(pending_keys):
+            keys.append(pending_keys)
+            scores.append(pending_vectors @ query)
+            vectors.append(pending_vectors)
+        if not keys:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), np.empty((0, len(query)))
+        keys, scores, vectors = np.concatenate(keys), np.concatenate(scores), np.concatenate(vectors)
+        best = np.argsort(-scores, kind="stable")[:count]
+        return keys[best], scores[best], vectors[best]
+
+    def flush(self):
+        """
+        Write the vectors added since the last build or flush as a new delta of the current generation, so they are
+        kept on disk and searched by the other processes without building a new generation.
+        """
+        with self._write_lock:
+            with self._lock:
+                keys, vectors, flushed = self._pending_keys, self._pending_vectors, self._flushed
+            if len(keys) == flushed:
+                return
+            name = f"delta-{time.time_ns()}"
+            path = os.path.join(self.directory, name)
+            os.makedirs(path)
+            np.save(os.path.join(path, "keys.npy"), keys[flushed:])
+            np.save(os.path.join(path, "vectors.npy"), vectors[flushed:])
+            with self._lock:
+                self._write_current((self._current or ("",)) + (name,))
+                self._flushed = len(keys)
+            logger.info("Wrote %d vectors to the delta %s.", len(keys) - flushed, name)
+
+    def build(self, live_keys: np.ndarray):
+        """
+        Write a new generation with the vectors of the live keys, dropping the other ones and the deltas. The
+        centroids are trained again only when the index has grown `RETRAIN_GROWTH` times since they were, otherwise
+        the vectors are just assigned to the existing lists.
+
+        Args:
+            live_keys (np.ndarray): The keys to keep.
+        """
+        with self._write_lock:
+            self._build(live_keys)
+
+    def _build(self, live_keys: np.ndarray):
+        started = time.perf_counter()
+        with self._lock:
+            generation, pending_keys, pending_vectors = self._generation, self._pending_keys, self._pending_vectors
+        built = len(pending_keys)
+        if not built and len(live_keys) == (len(generation.keys) if generation is not None else 0):
+            # Nothing was added nor removed since the last build.
+            return
+        old_rows = (np.flatnonzero(np.isin(generation.keys, live_keys)) if generation is not None
+                    else np.empty(0, dtype=np.int64))
+        new_rows = np.flatnonzero(np.isin(pending_keys, live_keys))
+        total = len(old_rows) + len(new_rows)
+
+        def gather(positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            is_old = positions < len(old_rows)
+            old, new = old_rows[positions[is_old]], new_rows[positions[~is_old] - len(old_rows)]
+            if not len(new):
+                return generation.keys[old], generation.vectors[old]
+            if not len(old):
+                return pending_keys[new], pending_vectors[new]
+            keys = np.empty(len(positions), dtype=np.int64)
+            vectors = np.empty((len(positions), pending_vectors.shape[1]), dtype=np.float32)
+            keys[is_old], vectors[is_old] = generation.keys[old], generation.vectors[old]
+            keys[~is_old], vectors[~is_old] = pending_keys[new], pending_vectors[new]
+            return keys, vectors
+
+        name = None
+        if total:
+            dimension = (generation.vectors if generation is not None else pending_vectors).shape[1]
+            centroids, trained_on = (generation.centroids, generation.meta["trained_on"]) if generation else (None, 0)
+            if centroids is None or total > self.RETRAIN_GROWTH * trained_on:
+                lists = max(1, min(int(4 * np.sqrt(total)), total))
+                sample = np.random.default_rng(0).choice(
+                    total, min(total, lists * self.TRAINING_POINTS_PER_LIST), replace=False
+                )
+                centroids, trained_on = train_centroids(gather(np.sort(sample))[1], lists), total
+            assignments = np.empty(total, dtype=np.int64)
+            for start in range(0, total, self.BUILD_CHUNK):
+                positions = np.arange(start, min(start + self.BUILD_CHUNK, total))
+                assignments[start:start + len(positions)] = np.argmax(gather(positions)[1] @ centroids.T, axis=1)
+            order = np.argsort(assignments, kind="stable")
+
+            name = f"gen-{time.time_ns()}"
+            path = os.path.join(self.directory, name)
+            os.makedirs(path)
+            files = {
+                "vectors": np.lib.format.open_memmap(os.path.join(path, "vectors.npy"), "w+", np.float32,
+                                                     (total, dimension)),
+                "codes": np.lib.format.open_memmap(os.path.join(path, "codes.npy"), "w+", np.int8, (total, dimension)),
+                "scales": np.lib.format.open_memmap(os.path.join(path, "scales.npy"), "w+", np.float32, (total,)),
+                "keys": np.lib.format.open_memmap(os.path.join(path, "keys.npy"), "w+", np.int64, (total,)),
+            }
+            for start in range(0, total, self.BUILD_CHUNK):
+                end = min(start + self.BUILD_CHUNK, total)
+                keys, vectors = gather(order[start:end])
+                scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+                files["vectors"][start:end] = vectors
+                files["codes"][start:end] = np.round(vectors / scales[:, None]).astype(np.int8)
+                files["scales"][start:end] = scales
+                files["keys"][start:end] = keys
+            for array in files.values():
+                array.flush()
+            np.save(os.path.join(path, "centroids.npy"), centroids)
+            np.save(os.path.join(path, "offsets.npy"),
+                    np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=len(centroids)))]))
+            with open(os.path.join(path, "meta.json"), "w") as f:
+                json.dump({"count": total, "dimension": dimension, "trained_on": trained_on}, f)
+
+        with self._lock:
+            self._write_current((name,) if name else ())
+            self._generation = _Generation(os.path.join(self.directory, name)) if name else None
+            # Vectors added while building stay pending for the next build, they aren't in any delta.
+            self._pending_keys = self._pending_keys[built:]
+            self._pending_vectors = (self._pending_vectors[built:]
+                                     if self._pending_vectors is not None and len(self._pending_keys) else None)
+            self._flushed = 0
+        # Processes still mapping an old generation keep reading it until they reload, the files are only unlinked.
+        for entry in os.listdir(self.directory):
+            if entry.startswith(("gen-", "delta-")) and entry != name:
+                shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+        logger.info("Built the index with %d vectors in %.1f s.", total, time.perf_counter() - started)
+
+
+class QuantizedVectorStore(VectorStore):
+    """
+    LangChain vector store backed by an IVFInt8Index, with the text and metadata of the chunks in a SQLite file
+    next to it. It replaces Chroma when the corpus grows too big to keep the full float embeddings in memory.
+
+    Chunks are added with `upsert`, and `persist` writes them to disk as a delta of the index, rebuilding the index
+    files from the chunks that are still alive once enough of them changed. Scores are cosine distances, like the
+    ones of Chroma.
+
+    Args:
+        embedding_function (Embeddings): Embeds the queries.
+        persist_directory (Optional[str]): The folder of the index. Default is a temporary folder.
+        nprobe (int): Amount of inverted lists scanned per query.
+        rerank (int): Amount of candidates re-ranked in full precision.
+        rebuild_fraction (float): Fraction of the index that must be added, replaced or deleted before `persist`
+            rebuilds it.
+    """
+
+    DATABASE_FILENAME = "quantized_chunks.sqlite3"
+    # Keys looked up per query, below the limit of parameters of SQLite (999 before 3.32).
+    QUERY_BATCH_SIZE = 500
+
+    def __init__(self, embedding_function: Embeddings, persist_directory: Optional[str] = None, nprobe: int = 16,
+                 rerank: int = 100, rebuild_fraction: float = 0.1):
+        """
+        Initialize the QuantizedVectorStore.
+
+        Args:
+            embedding_function (Embeddings): Embeds the queries.
+            persist_directory (Optional[str]): The folder of the index. Default is None, which uses a temporary
+            folder.
+            nprobe (int): Amount of inverted lists scanned per query. Default is 16.
+            rerank (int): Amount of candidates re-ranked in full precision. Default is 100.
+            rebuild_fraction (float): Fraction of the index that must be added, replaced or deleted before `persist`
+            rebuilds it. Default is 0.1.
+        """
+        self._embedding_function = embedding_function
+        self.rebuild_fraction = rebuild_fraction
+        self.persist_directory = persist_directory or tempfile.mkdtemp(prefix="quantized-index-")
+        self.index = IVFInt8Index(self.persist_directory, nprobe=nprobe, rerank=rerank)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            os.path.join(self.persist_directory, self.DATABASE_FILENAME), check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "key INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE NOT NULL, text TEXT NOT NULL, "
+            "metadata TEXT NOT NULL)"
+        )
+        self._connection.commit()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding_function
+
+    def upsert(self, ids: List[str], texts: List[str], embeddings: List[List[float]], metadatas: List[dict]):
+        """
+        Add already embedded chunks, replacing the ones with the same ids.
+        """
+        with self._lock, self._connection:
+            self._connection.executemany("DELETE FROM chunks WHERE id = ?", ((chunk_id,) for chunk_id in ids))
+            keys = [
+                self._connection.execute(
+                    "INSERT INTO chunks (id, text, metadata) VALUES (?, ?, ?)", (chunk_id, text, json.dumps(metadata))
+                ).lastrowid
+                for chunk_id, text, metadata in zip(ids, texts, metadatas)
+            ]
+        self.index.add(np.asarray(keys, dtype=np.int64), np.asarray(embeddings, dtype=np.float32))
+
+    def delete(self, ids: List[str]):
+        """
+        Remove chunks. Their vectors are ignored by the queries and dropped by the next `persist`.
+        """
+        with self._lock, self._connection:
+            self._connection.executemany("DELETE FROM chunks WHERE id = ?", ((chunk_id,) for chunk_id in ids))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def persist(self, rebuild: bool = False):
+        """
+        Write every chunk added so far to disk. Usually the new vectors are just appended to the index as a delta,
+        and the vectors of replaced or deleted chunks are skipped by the queries. The index is rebuilt from the
+        chunks that are still alive when those changes add up to `rebuild_fraction` of it.
+
+        Args:
+            rebuild (bool): Rebuild the index whatever the amount of changes. Default is False.
+        """
+        with self._lock:
+            live = self._connection.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        built = len(self.index) - self.index.pending_count
+        changed = self.index.pending_count + len(self.index) - live
+        if not rebuild and changed <= self.rebuild_fraction * built:
+            self.index.flush()
+            return
+        with self._lock:
+            live_keys = np.fromiter((key for key, in self._connection.execute("SELECT key FROM chunks")), np.int64)
+        self.index.build(live_keys)
+
+    def _rows(self, keys: List[int]) -> dict:
+        """
+        Returns:
+            dict: The text and metadata of the chunks of the keys that are still alive.
+        """
+        rows = {}
+        with self._lock:
+            for start in range(0, len(keys), self.QUERY_BATCH_SIZE):
+                batch = keys[start:start + self.QUERY_BATCH_SIZE]
+                rows.update(
+                    (key, (text, metadata)) for key, text, metadata in self._connection.execute(
+                        f"SELECT key, text, metadata FROM chunks WHERE key IN ({','.join('?' * len(batch))})", batch
+                    )
+                )
+        return rows
+
+    def _search(self, embedding: List[float], k: int) -> List[Tuple[Document, float, np.ndarray]]:
+        """
+        Returns:
+            list: The document, cosine similarity and vector of the k chunks closest to the embedding.
+        """
+        count = max(2 * k, k + 10)
+        while True:
+            keys, scores, vectors = self.index.search(np.asarray(embedding, dtype=np.float32), count)
+            rows = self._rows(keys.tolist())
+            # Keys of deleted or replaced chunks aren't in the database anymore.
+            found = [
+                (Document(page_content=rows[key][0], metadata=json.loads(rows[key][1])), float(score), vector)
+                for key, score, vector in zip(keys.tolist(), scores, vectors) if key in rows
+            ]
+            if len(found) >= k or len(keys) < count:
+                return found[:k]
+            count *= 4
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        self.upsert(ids, texts, self._embedding_function.embed_documents(texts), metadatas or [{} for _ in texts])
+        return ids
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   persist_directory: Optional[str] = None, ids: Optional[List[str]] = None,
+                   **kwargs: Any) -> "QuantizedVectorStore":
+        store = cls(embedding, persist_directory, **kwargs)
+        store.add_texts(texts, metadatas, ids)
+        store.persist()
+        return store
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return [(doc, 1 - score) for doc, score, _ in self._search(self._embedding_function.embed_query(query), k)]
+
+    def _similarity_search_with_relevance_scores(self, query: str, k: int = 4,
+                                                 **kwargs: Any) -> List[Tuple[Document, float]]:
+        return [(doc, score) for doc, score, _ in self._search(self._embedding_function.embed_query(query), k)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _, _ in self._search(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding_function.embed_query(query), k)
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        found = self._search(embedding, fetch_k)
+        selected = maximal_marginal_relevance(
+            np.asarray(embedding, dtype=np.float32), [vector for _, _, vector in found], lambda_mult=lambda_mult, k=k
+        )
+        return [found[index][0] for index in selected]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5,
+                                      **kwargs: Any) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self._embedding_function.embed_query(query), k, fetch_k, lambda_mult
+        )
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+from context_aware_qa import ContextAwareQA
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class QAServer:
+    """
+    Asynchronous HTTP/JSON server answering questions with a ContextAwareQA model.
+    At most `max_concurrency` questions are answered at the same time, up to `max_queue` more wait for a free slot,
+    and further questions are rejected with a 503 until the server catches up.
+
+    Endpoints:
+        POST /query: {"question": "..."} -> the response of `ContextAwareQA.query_with_sources`.
+        POST /query/stream: {"question": "..."} -> the events of `ContextAwareQA.stream_query`, one JSON per line.
+        GET /health: The counters of the server.
+
+    Args:
+        qa (ContextAwareQA): The model answering the questions.
+        max_concurrency (int): Maximum amount of questions answered concurrently.
+        max_queue (int): Maximum amount of questions waiting for a free slot.
+        request_timeout (float): Seconds a question may wait and run before answering with a 504.
+    """
+
+    def __init__(self, qa: ContextAwareQA, max_concurrency: int = 8, max_queue: int = 64,
+                 request_timeout: float = 30.0):
+        """
+        Initialize the QAServer.
+
+        Args:
+            qa (ContextAwareQA): The model answering the questions.
+            max_concurrency (int): Maximum amount of questions answered concurrently. Default is 8.
+            max_queue (int): Maximum amount of questions waiting for a free slot. Default is 64.
+            request_timeout (float): Seconds a question may wait and run before answering with a 504.
+            Default is 30.
+        """
+        self.qa = qa
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.request_timeout = request_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="qa")
+        self._slots = None
+        self._pending = 0
+        self.counters = {"answered": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+
+    def warm_up(self):
+        """
+        Load the vector store and build the retriever before accepting questions.
+        """
+        logger.info("Loading the vector store.")
+        self.qa.retriever
+
+    async def _acquire_slot(self, deadline: float):
+        """
+        Wait for a free slot until the deadline of the request. On Python 3.8, `wait_for` may give up right after
+        the slot was acquired, so the acquire runs in its own task, which gives the slot back if it got one after
+        the wait timed out or was cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        acquire = asyncio.ensure_future(self._slots.acquire())
+        try:
+            await asyncio.wait_for(asyncio.shield(acquire), timeout=max(deadline - loop.time(), 0))
+        except BaseException:
+            acquire.cancel()
+            acquire.add_done_callback(self._release_abandoned_slot)
+            raise
+
+    def _release_abandoned_slot(self, acquire: asyncio.Future):
+        if not acquire.cancelled() and acquire.exception() is None:
+            self._slots.release()
+
+    def _run_in_slot(self, function, *args) -> asyncio.Future:
+        """
+        Run a blocking call in the thread pool, holding the already acquired slot until it finishes, even if the
+        request timed out, so timed out questions still count against the concurrency limit.
+        """
+        future = asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+        def release(done):
+            self._slots.release()
+            if not done.cancelled():
+                done.exception()
+
+        future.add_done_callback(release)
+        return future
+
+    @staticmethod
+    async def _read_question(request: web.Request) -> str:
+        try:
+            return (await request.json())["question"]
+        except (ValueError, KeyError, TypeError):
+            raise web.HTTPBadRequest(text='Expected a JSON body like {"question": "..."}')
+
+    def _check_capacity(self):
+        if self._pending >= self.max_concurrency + self.max_queue:
+            self.counters["rejected"] += 1
+            raise web.HTTPServiceUnavailable(text="Too many pending questions", headers={"Retry-After": "1"})
+
+    async def handle_query(self, request: web.Request) -> web.Response:
+        """
+        Answer the question of a POST /query request.
+        """
+        question = await self._read_question(request)
+        self._check_capacity()
+        self._pending += 1
+        try:
+            deadline = asyncio.get_running_loop().time() + self.request_timeout
+            await self._acquire_slot(deadline)
+            future = self._run_in_slot(self.qa.query_with_sources, question)
+            response = await asyncio.wait_for(
+                asyncio.shield(future), timeout=max(deadline - asyncio.get_running_loop().time(), 0)
+            )
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            raise web.HTTPGatewayTimeout(text="The question took too long to answer")
+        except Exception:
+            logger.exception("Failed to answer %r", question)
+            self.counters["errors"] += 1
+            raise web.HTTPInternalServerError(text="The question couldn't be answered")
+        finally:
+            self._pending -= 1
+
+        self.counters["answered"] += 1
+        return web.json_response(response)
+
+    async def handle_stream(self, request: web.Request) -> web.StreamResponse:
+        """
+        Stream the answer of the question of a POST /query/stream request as newline delimited JSON events.
+        Errors happening once the stream started are sent as an {"error": "..."} event.
+        """
+        question = await self._read_question(request)
+        self._check_capacity()
+        self._pending += 1
+        loop = asyncio.get_running_loop()
+        try:
+            deadline = loop.time() + self.request_timeout
+            try:
+                await self._acquire_slot(deadline)
+            except asyncio.TimeoutError:
+                self.counters["timeouts"] += 1
+                raise web.HTTPGatewayTimeout(text="The question took too long to answer")
+
+            events = asyncio.Queue()
+
+            def produce():
+                try:
+                    for event in self.qa.stream_query(question):
+                        loop.call_soon_threadsafe(events.put_nowait, event)
+                except Exception as error:
+                    logger.exception("Failed to answer %r", question)
+                    loop.call_soon_threadsafe(events.put_nowait, {"error": str(error)})
+                finally:
+                    loop.call_soon_threadsafe(events.put_nowait, None)
+
+            self._run_in_slot(produce)
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+            outcome = "answered"
+            try:
+                while True:
+                    event = await asyncio.wait_for(events.get(), timeout=max(deadline - loop.time(), 0))
+                    if event is None:
+                        break
+                    if "error" in event:
+                        outcome = "errors"
+                    await response.write(json.dumps(event).encode() + b"\n")
+            except asyncio.TimeoutError:
+                outcome = "timeouts"
+                await response.write(json.dumps({"error": "The question took too long to answer"}).encode() + b"\n")
+            self.counters[outcome] += 1
+            await response.write_eof()
+            return response
+        finally:
+            self._pending -= 1
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        """
+        Report the counters of the server.
+        """
+        return web.json_response({"pending": self._pending, **self.counters})
+
+    async def _on_startup(self, app: web.Application):
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    async def _on_cleanup(self, app: web.Application):
+        self._executor.shutdown(wait=False)
+
+    def app(self) -> web.Application:
+        """
+        Returns:
+            web.Application: The aiohttp application serving the model.
+        """
+        app = web.Application()
+        app.add_routes([
+            web.post("/query", self.handle_query),
+            web.post("/query/stream", self.handle_stream),
+            web.get("/health", self.handle_health),
+        ])
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    def run(self, host: str = "0.0.0.0", port: int = 8080):
+        """
+        Load the vector store and serve until interrupted.
+
+        Args:
+            host (str): The interface to listen on.
+            port (int): The port to listen on.
+        """
+        self.warm_up()
+        web.run_app(self.app(), host=host, port=port)
@@ -0,0 +1,182 @@
+import json
+import logging
+import re
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+import ijson
+import tiktoken
+from langchain.docstore.document import Document
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def iter_json_documents(file: str, content_key: str = "body") -> Iterator[Document]:
+    """
+    Parse a JSON file incrementally, yielding a document per record as soon as it's read, so only one record is in
+    memory at a time. The file may hold a single object, an array of objects, or one object per line (JSONL). The
+    metadata is the same JSONLoader sets.
+
+    Args:
+        file (str): The path of the file.
+        content_key (str): The key of the content of every record. Default is "body".
+
+    Yields:
+        Document: A document per record with content.
+    """
+    source = str(Path(file).resolve())
+    with open(file, "rb") as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        prefix = f"item.{content_key}" if first == b"[" else content_key
+        for seq_num, content in enumerate(ijson.items(f, prefix, multiple_values=True), start=1):
+            if content is None:
+                continue
+            if not isinstance(content, str):
+                content = json.dumps(content, default=str)
+            yield Document(page_content=content, metadata={"source": source, "seq_num": seq_num})
+
+
+class WordEncoding:
+    """
+    Counts words and punctuation marks instead of the tokens of a model, used when a tiktoken encoding can't be
+    loaded. English text has about 1.3 tokens per word, so the chunks come out somewhat longer.
+    """
+
+    name = "words"
+    TOKEN = re.compile(r"\s*(?:\w+|[^\w\s])")
+
+    def encode(self, text: str, disallowed_special=()) -> List[str]:
+        return self.TOKEN.findall(text)
+
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens).strip()
+
+
+@lru_cache(maxsize=None)
+def load_encoding(name: str):
+    """
+    Load a tiktoken encoding. tiktoken downloads the encodings on first use, so offline with an empty cache (see
+    TIKTOKEN_CACHE_DIR) it falls back to counting words.
+
+    Args:
+        name (str): The name of the encoding, e.g. "cl100k_base".
+
+    Returns:
+        Union[tiktoken.Encoding, WordEncoding]: The encoding.
+    """
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as error:
+        logger.warning("Couldn't load the %s encoding (%r), counting words instead.", name, error)
+        return WordEncoding()
+
+
+class StreamingTokenSplitter:
+    """
+    Splits documents in chunks of at most `chunk_size` tokens of the embedding model, as a generator, so chunks are
+    produced while the documents are read. Chunks are made of whole sentences, and every chunk repeats the last
+    sentences of the previous one, up to `chunk_overlap` tokens. A sentence longer than a chunk is split by tokens.
+    Words are counted instead of tokens if the encoding can't be loaded, see `load_encoding`.
+
+    Args:
+        chunk_size (int): Maximum amount of tokens of a chunk.
+        chunk_overlap (int): Amount of tokens of the previous chunk repeated at the beginning of the next one.
+        encoding_name (str): The tiktoken encoding counting the tokens.
+    """
+
+    SENTENCE = re.compile(r"\S.*?(?:[.!?](?=\s)|\n|$)", re.DOTALL)
+
+    def __init__(self, chunk_size: int = 256, chunk_overlap: int = 32, encoding_name: str = "cl100k_base"):
+        """
+        Initialize the StreamingTokenSplitter.
+
+        Args:
+            chunk_size (int): Maximum amount of tokens of a chunk. Default is 256.
+            chunk_overlap (int): Amount of tokens of the previous chunk repeated at the beginning of the next one.
+            Default is 32.
+            encoding_name (str): The tiktoken encoding counting the tokens. Default is "cl100k_base", the one of
+            the OpenAI embeddings.
+        """
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.encoding_name = encoding_name
+        self._encoding = None
+
+    @property
+    def encoding(self):
+        # Loaded on first use, so the splitter can be pickled to the parsing processes.
+        if self._encoding is None:
+            self._encoding = load_encoding(self.encoding_name)
+        return self._encoding
+
+    def __getstate__(self) -> dict:
+        return dict(self.__dict__, _encoding=None)
+
+    def __repr__(self):
+        # Recorded in the ingestion manifest, the articles are split again when it changes. It names the encoding
+        # actually loaded, so the articles split by words offline are split by tokens once the encoding is there.
+        return (f"StreamingTokenSplitter(chunk_size={self.chunk_size}, chunk_overlap={self.chunk_overlap}, "
+                f"encoding_name={self.encoding.name!r})")
+
+    def _split_tokens(self, sentence: str) -> Iterator[str]:
+        tokens = self.encoding.encode(sentence, disallowed_special=())
+        step = self.chunk_size - self.chunk_overlap
+        for start in range(0, max(len(tokens) - self.chunk_overlap, 1), step):
+            yield self.encoding.decode(tokens[start:start + self.chunk_size])
+
+    def split_text(self, text: str) -> Iterator[str]:
+        """
+        Yields:
+            str: The chunks of the text.
+        """
+        window, tokens = deque(), 0
+        for match in self.SENTENCE.finditer(text):
+            sentence = match.group().strip()
+            count = len(self.encoding.encode(sentence, disallowed_special=())) + 1
+            if count > self.chunk_size:
+                if window:
+                    yield " ".join(part for part, _ in window)
+                    window.clear()
+                    tokens = 0
+                yield from self._split_tokens(sentence)
+                continue
+            if window and tokens + count > self.chunk_size:
+                yield " ".join(part for part, _ in window)
+                while window and (tokens > self.chunk_overlap or tokens + count > self.chunk_size):
+                    tokens -= window.popleft()[1]
+            window.append((sentence, count))
+            tokens += count
+        if window:
+            yield " ".join(part for part, _ in window)
+
+    def split_documents(self, docs: Iterable[Document]) -> Iterator[Document]:
+        """
+        Yields:
+            Document: The chunks of every document, with a copy of its metadata.
+        """
+        for doc in docs:
+            for chunk in self.split_text(doc.page_content):
+                yield Document(page_content=chunk, metadata=dict(doc.metadata))
+
+
+def stream_and_split(file: str, splitter: Optional[StreamingTokenSplitter] = None) -> Iterator[Document]:
+    """
+    Read and split a JSON file lazily.
+
+    Args:
+        file (str): The path of the file.
+        splitter (Optional[StreamingTokenSplitter]): The splitter. Default is None, which uses the default one.
+
+    Yields:
+        Document: The chunks of the records of the file.
+    """
+    yield from (splitter or StreamingTokenSplitter()).split_documents(iter_json_documents(file))
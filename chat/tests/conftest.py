@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The chat modules import each other by their flat names, as when they are run from this folder.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
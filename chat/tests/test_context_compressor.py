@@ -0,0 +1,33 @@
+from langchain.docstore.document import Document
+from context_compressor import ContextCompressor
+
+
+QUESTION = "Where are the headquarters of Northrop Grumman?"
+DOCS = [
+    Document(page_content="Northrop Grumman is an aerospace company. Northrop Grumman headquarters are in Falls "
+                          "Church, Virginia. It was formed in 1994.", metadata={"source": "northrop.json"}),
+    Document(page_content="Apple sells phones. The headquarters of Apple are in Cupertino. Northrop Grumman's "
+                          "headquarters are in Falls Church, Virginia.", metadata={"source": "apple.json"}),
+]
+
+
+def test_the_sentences_with_the_words_of_the_question_are_kept():
+    compressor = ContextCompressor()
+    sentence = "Northrop Grumman headquarters are in Falls Church, Virginia."
+    compressor.token_budget = compressor.count_tokens(sentence) + 1
+
+    docs = compressor.compress(QUESTION, DOCS)
+
+    assert [(doc.page_content, doc.metadata["source"]) for doc in docs] == [
+        (sentence, "northrop.json")
+    ]
+
+
+def test_near_duplicates_are_skipped():
+    docs = ContextCompressor(token_budget=1000).compress(QUESTION, DOCS)
+
+    assert [(doc.page_content, doc.metadata["source"]) for doc in docs] == [
+        (DOCS[0].page_content, "northrop.json"),
+        ("Apple sells phones. The headquarters of Apple are in Cupertino.", "apple.json"),
+    ]
+    assert ContextCompressor().compress(QUESTION, []) == []
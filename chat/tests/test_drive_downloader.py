@@ -0,0 +1,91 @@
+import os
+from drive_downloader import GoogleDriveDownloader
+from offline import FakeDriveService
+
+
+def make_downloader(folder, service: FakeDriveService) -> GoogleDriveDownloader:
+    return GoogleDriveDownloader(None, str(folder), max_workers=2, chunk_size=4, drive_service=service)
+
+
+def test_first_sync_downloads_every_file(tmp_path):
+    service = FakeDriveService({"a": ("a.json", b'{"body": "first"}'), "b": ("b.json", b'{"body": "second"}')})
+    changes = make_downloader(tmp_path, service).sync()
+
+    assert sorted(os.path.basename(path) for path in changes.updated) == ["a-a.json", "b-b.json"]
+    assert changes.removed == []
+    with open(tmp_path / "a-a.json", "rb") as f:
+        assert f.read() == b'{"body": "first"}'
+
+
+def test_sync_reports_modified_and_deleted_files(tmp_path):
+    service = FakeDriveService({"a": ("a.json", b'{"body": "first"}'), "b": ("b.json", b'{"body": "second"}')})
+    downloader = make_downloader(tmp_path, service)
+    downloader.commit_token(downloader.sync())
+
+    service.put_file("a", "a.json", b'{"body": "edited"}')
+    service.delete_file("b")
+    changes = downloader.sync()
+
+    assert changes.updated == [str(tmp_path / "a-a.json")]
+    assert changes.removed == [str(tmp_path / "b-b.json")]
+    assert not os.path.exists(tmp_path / "b-b.json")
+
+
+def test_sync_reports_the_old_copy_of_a_renamed_file_as_removed(tmp_path):
+    service = FakeDriveService({"a": ("a.json", b'{"body": "first"}')})
+    downloader = make_downloader(tmp_path, service)
+    downloader.commit_token(downloader.sync())
+
+    service.put_file("a", "renamed.json", b'{"body": "edited"}')
+    changes = downloader.sync()
+
+    assert changes.updated == [str(tmp_path / "a-renamed.json")]
+    assert changes.removed == [str(tmp_path / "a-a.json")]
+    assert not os.path.exists(tmp_path / "a-a.json")
+    assert downloader.manifest["files"]["a"]["path"] == str(tmp_path / "a-renamed.json")
+
+
+def test_failed_download_of_a_renamed_file_keeps_the_old_copy(tmp_path):
+    service = FakeDriveService({"a": ("a.json", b'{"body": "first"}')})
+    downloader = make_downloader(tmp_path, service)
+    downloader.commit_token(downloader.sync())
+
+    service.put_file("a", "renamed.json", b'{"body": "edited"}')
+    downloader.get_document_content = lambda file_metadata: None
+    changes = downloader.sync()
+
+    assert changes.updated == [] and changes.removed == []
+    assert os.path.exists(tmp_path / "a-a.json")
+
+
+def test_changes_are_reported_again_until_the_token_is_committed(tmp_path):
+    service = FakeDriveService({"a": ("a.json", b'{"body": "first"}'), "b": ("b.json", b'{"body": "second"}')})
+    downloader = make_downloader(tmp_path, service)
+    downloader.commit_token(downloader.sync())
+
+    service.put_file("a", "a.json", b'{"body": "edited"}')
+    service.delete_file("b")
+    downloader.sync()
+    # Applying the changes failed, so the token wasn't committed.
+    service.put_file("c", "c.json", b'{"body": "third"}')
+    changes = downloader.sync()
+
+    assert changes.updated == [str(tmp_path / "a-a.json"), str(tmp_path / "c-c.json")]
+    assert changes.removed == [str(tmp_path / "b-b.json")]
+    downloader.commit_token(changes)
+    assert not make_downloader(tmp_path, service).sync()
+
+
+def test_a_failed_download_leaves_no_token_to_commit(tmp_path):
+    service = FakeDriveService({"a": ("a.json", b'{"body": "first"}')})
+    downloader = make_downloader(tmp_path, service)
+    downloader.commit_token(downloader.sync())
+
+    service.put_file("a", "a.json", b'{"body": "edited"}')
+    downloader.get_document_content = lambda file_metadata: None
+    changes = downloader.sync()
+    downloader.commit_token(changes)
+
+    assert changes.token is None
+    del downloader.get_document_content
+    assert downloader.sync().updated == [str(tmp_path / "a-a.json")]
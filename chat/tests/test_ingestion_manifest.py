@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+import streaming_loader
+from ingestion_manifest import IngestionManifest
+from streaming_loader import StreamingTokenSplitter
+
+
+def ingest(manifest: IngestionManifest, paths):
+    plan = manifest.plan(paths)
+    manifest.commit(plan, {sha256: [f"{sha256}-0", f"{sha256}-1"] for sha256 in plan.to_index})
+    return plan
+
+
+def test_unchanged_files_are_not_indexed_again(tmp_path):
+    article = tmp_path / "article.json"
+    article.write_text('{"body": "An article."}')
+    manifest = IngestionManifest(str(tmp_path / "manifest.sqlite3"), chunking="chunks of 256")
+    ingest(manifest, [str(article)])
+    manifest.close()
+
+    manifest = IngestionManifest(str(tmp_path / "manifest.sqlite3"), chunking="chunks of 256")
+    assert not manifest.plan([str(article)])
+
+
+def test_files_are_split_again_when_the_chunking_changes(tmp_path):
+    article, copy = tmp_path / "article.json", tmp_path / "copy.json"
+    for path in (article, copy):
+        path.write_text('{"body": "An article."}')
+    paths = [str(article), str(copy)]
+    manifest = IngestionManifest(str(tmp_path / "manifest.sqlite3"), chunking="chunks of 256")
+    (old_hash,) = ingest(manifest, paths).to_index
+    manifest.close()
+
+    manifest = IngestionManifest(str(tmp_path / "manifest.sqlite3"), chunking="chunks of 512")
+    plan = ingest(manifest, paths)
+    (new_hash,) = plan.to_index
+    assert new_hash != old_hash
+    assert sorted(plan.stale_chunk_ids) == [f"{old_hash}-0", f"{old_hash}-1"]
+    manifest.close()
+
+    # Going back to the first chunking splits the files again too.
+    manifest = IngestionManifest(str(tmp_path / "manifest.sqlite3"), chunking="chunks of 256")
+    assert list(ingest(manifest, paths).to_index) == [old_hash]
+    assert not manifest.plan(paths)
+
+
+def test_the_splitter_settings_tell_apart_the_chunkings(monkeypatch):
+    # Offline every encoding falls back to counting words, so the encodings aren't really loaded here.
+    monkeypatch.setattr(streaming_loader, "load_encoding", lambda name: SimpleNamespace(name=name))
+    assert repr(StreamingTokenSplitter()) == repr(StreamingTokenSplitter(256, 32, "cl100k_base"))
+    assert repr(StreamingTokenSplitter(512, 32)) != repr(StreamingTokenSplitter())
+    assert repr(StreamingTokenSplitter(256, 64)) != repr(StreamingTokenSplitter())
+    assert repr(StreamingTokenSplitter(encoding_name="p50k_base")) != repr(StreamingTokenSplitter())
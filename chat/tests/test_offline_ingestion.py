@@ -0,0 +1,51 @@
+import json
+import pytest
+import requests
+import streaming_loader
+from offline import HashingEmbeddings
+from streaming_loader import StreamingTokenSplitter, WordEncoding
+from vectorizer_db_factory import VectorStoreDBCreator
+
+
+@pytest.fixture
+def no_tiktoken_download(monkeypatch):
+    """
+    tiktoken as on a machine with an empty cache and no network.
+    """
+    def get_encoding(name):
+        raise requests.exceptions.ConnectionError(f"can't download {name}")
+
+    monkeypatch.setattr(streaming_loader.tiktoken, "get_encoding", get_encoding)
+    streaming_loader.load_encoding.cache_clear()
+    yield
+    streaming_loader.load_encoding.cache_clear()
+
+
+def test_the_splitter_counts_words_without_the_encoding(no_tiktoken_download):
+    splitter = StreamingTokenSplitter(chunk_size=12, chunk_overlap=2)
+    chunks = list(splitter.split_text("One two three. Four five six. Seven eight nine ten eleven twelve thirteen."))
+
+    assert isinstance(splitter.encoding, WordEncoding)
+    assert "words" in repr(splitter)
+    assert chunks == ["One two three. Four five six.", "Seven eight nine ten eleven twelve thirteen."]
+    # A sentence longer than a chunk is split by words.
+    splitter = StreamingTokenSplitter(chunk_size=8, chunk_overlap=2)
+    assert list(splitter.split_text(" ".join(f"w{index}" for index in range(12)))) == [
+        "w0 w1 w2 w3 w4 w5 w6 w7", "w6 w7 w8 w9 w10 w11"
+    ]
+
+
+@pytest.mark.parametrize("vector_backend", ["chroma", "quantized"])
+def test_offline_ingestion(tmp_path, no_tiktoken_download, vector_backend):
+    if vector_backend == "chroma":
+        pytest.importorskip("chromadb")
+    corpora = tmp_path / "downloads"
+    corpora.mkdir()
+    (corpora / "northrop.json").write_text(json.dumps({"body": "Northrop Grumman builds aircraft. It is in Virginia."}))
+    (corpora / "apple.json").write_text(json.dumps({"body": "Apple sells phones and computers."}))
+
+    factory = VectorStoreDBCreator(corpora_folder=str(corpora), persistent_directory=str(tmp_path / "db"),
+                                   embedding_function=HashingEmbeddings, max_workers=1, vector_backend=vector_backend)
+    docs = factory.vectorstore.similarity_search("Where is Northrop Grumman based?", k=1)
+
+    assert docs[0].metadata["source"].endswith("northrop.json")
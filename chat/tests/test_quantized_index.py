@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import numpy as np
+import pytest
+from quantized_index import QuantizedVectorStore
+
+
+DIMENSION = 8
+
+
+def vectors(count: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(count, DIMENSION)).astype(np.float32)
+
+
+def upsert(store: QuantizedVectorStore, ids, embeddings: np.ndarray):
+    store.upsert(ids, ids, embeddings.tolist(), [{} for _ in ids])
+
+
+def entries(directory: str, prefix: str):
+    return sorted(entry for entry in os.listdir(directory) if entry.startswith(prefix))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = QuantizedVectorStore(None, str(tmp_path), rebuild_fraction=0.1)
+    upsert(store, [f"a{row}" for row in range(200)], vectors(200, 0))
+    store.persist()
+    yield store
+    store.close()
+
+
+def test_a_small_change_is_written_as_a_delta(store):
+    generations = entries(store.persist_directory, "gen-")
+    added = vectors(5, 1)
+    upsert(store, [f"b{row}" for row in range(5)], added)
+    store.delete(["a0"])
+    store.persist()
+
+    assert entries(store.persist_directory, "gen-") == generations
+    assert len(entries(store.persist_directory, "delta-")) == 1
+    # Another process sees the delta and skips the deleted chunk.
+    other = QuantizedVectorStore(None, store.persist_directory)
+    assert len(other.index) == 205
+    assert [doc.page_content for doc in other.similarity_search_by_vector(added[3].tolist(), 1)] == ["b3"]
+    assert "a0" not in [doc.page_content for doc in other.similarity_search_by_vector(vectors(200, 0)[0], 5)]
+    other.close()
+
+
+def test_the_index_is_rebuilt_once_enough_changed(store):
+    generations = entries(store.persist_directory, "gen-")
+    for batch in range(2):
+        upsert(store, [f"b{batch}-{row}" for row in range(8)], vectors(8, batch + 1))
+        store.persist()
+    assert len(entries(store.persist_directory, "delta-")) == 2
+
+    # 24 new chunks are more than a tenth of the index.
+    upsert(store, [f"b2-{row}" for row in range(8)], vectors(8, 3))
+    store.persist()
+    assert entries(store.persist_directory, "gen-") != generations
+    assert entries(store.persist_directory, "delta-") == []
+    assert store.index.pending_count == 0
+    assert len(store.index) == 224
+
+
+def test_persist_rebuilds_on_demand(store):
+    store.delete([f"a{row}" for row in range(10)])
+    store.persist()
+    assert len(store.index) == 200
+
+    store.persist(rebuild=True)
+    assert len(store.index) == 190
+    reopened = QuantizedVectorStore(None, store.persist_directory)
+    assert len(reopened.index) == 190
+    reopened.close()
+
+
+def test_search_looks_up_more_keys_than_sqlite_parameters(tmp_path):
+    store = QuantizedVectorStore(None, str(tmp_path), nprobe=1000, rerank=2000)
+    upsert(store, [str(row) for row in range(1500)], vectors(1500, 0))
+    store.persist()
+    # The limit of the SQLite builds older than 3.32.
+    store._connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+
+    assert len(store.similarity_search_by_vector(vectors(1, 1)[0].tolist(), 1000)) == 1000
+    store.close()
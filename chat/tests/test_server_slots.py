@@ -0,0 +1,36 @@
+import asyncio
+import pytest
+import server
+from server import QAServer
+
+
+def test_a_slot_acquired_as_the_wait_times_out_is_given_back(monkeypatch):
+    async def late_wait_for(awaitable, timeout):
+        # Python 3.8 may give up on the wait after the awaited acquire already got the slot.
+        await awaitable
+        raise asyncio.TimeoutError()
+
+    async def scenario():
+        qa_server._slots = asyncio.Semaphore(1)
+        with pytest.raises(asyncio.TimeoutError):
+            await qa_server._acquire_slot(asyncio.get_running_loop().time())
+        await asyncio.sleep(0)
+        return qa_server._slots.locked()
+
+    qa_server = QAServer(qa=None, max_concurrency=1)
+    monkeypatch.setattr(server.asyncio, "wait_for", late_wait_for)
+    assert not asyncio.run(scenario())
+
+
+def test_a_timed_out_wait_takes_no_slot():
+    async def scenario():
+        qa_server._slots = asyncio.Semaphore(1)
+        await qa_server._slots.acquire()
+        with pytest.raises(asyncio.TimeoutError):
+            await qa_server._acquire_slot(asyncio.get_running_loop().time() + 0.05)
+        qa_server._slots.release()
+        await asyncio.sleep(0)
+        return qa_server._slots.locked()
+
+    qa_server = QAServer(qa=None, max_concurrency=1)
+    assert not asyncio.run(scenario())
@@ -0,0 +1,48 @@
+import json
+from offline import HashingEmbeddings
+from vectorizer_db_factory import VectorStoreDBCreator
+
+
+class FakeCollection:
+    """
+    Stands in for a Chroma collection, keeping the metadata of every chunk.
+    """
+
+    def __init__(self, metadatas: dict):
+        self.metadatas = dict(metadatas)
+
+    def count(self) -> int:
+        return len(self.metadatas)
+
+    def get(self, include, limit, offset):
+        return {"metadatas": list(self.metadatas.values())[offset:offset + limit]}
+
+    def delete(self, ids=None, where=None):
+        for chunk_id, metadata in list(self.metadatas.items()):
+            if chunk_id in (ids or ()) or where and metadata.get("source") == where["source"]:
+                del self.metadatas[chunk_id]
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.metadatas.update(zip(ids, metadatas))
+
+
+class FakeChroma:
+    def __init__(self, collection: FakeCollection):
+        self._collection = collection
+
+
+def test_the_migration_removes_the_chunks_of_deleted_and_ingested_files(tmp_path):
+    corpora = tmp_path / "downloads"
+    corpora.mkdir()
+    kept, deleted = str(corpora / "kept.json"), str(corpora / "deleted.json")
+    (corpora / "kept.json").write_text(json.dumps({"body": "Apple sells phones and computers."}))
+    # Chunks written before the manifest existed, the file of the second one was deleted since.
+    db = FakeChroma(FakeCollection({"old-0": {"source": kept}, "old-1": {"source": deleted}}))
+
+    factory = VectorStoreDBCreator(corpora_folder=str(corpora), embedding_function=HashingEmbeddings, max_workers=1)
+    factory._unmanaged_chunks = True
+    factory._missing_sources = lambda db: VectorStoreDBCreator._missing_sources(db, page_size=1)
+    factory._load_docs(db)
+
+    assert {metadata["source"] for metadata in db._collection.metadatas.values()} == {kept}
+    assert not any(chunk_id.startswith("old-") for chunk_id in db._collection.metadatas)
@@ -1,12 +1,15 @@
 import logging
 import os
 from functools import cached_property
-from typing import List
+from typing import List, Optional, Union
 from langchain.vectorstores import Chroma
-from langchain.text_splitter import CharacterTextSplitter
 
-from langchain.document_loaders import JSONLoader
 from langchain.embeddings import OpenAIEmbeddings
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+from ingestion_manifest import IngestionManifest
+from ingestion_pipeline import IngestionPipeline
+from quantized_index import QuantizedVectorStore
+from streaming_loader import StreamingTokenSplitter
 
 
 # Configure the logging settings
@@ -19,10 +22,16 @@ class VectorStoreDBCreator:
     Creates a vectorized document given files in a folder or a list of files.
     Persists the data on disk if a persistent directory is provided.
     Uses an embedding function to vectorize the data. If not provided, it uses OpenAIEmbeddings by default.
+    The vectors are stored in Chroma by default, or in a QuantizedVectorStore with the "quantized" backend.
     """
 
+    MANIFEST_FILENAME = "ingestion_manifest.sqlite3"
+    VECTOR_BACKENDS = ("chroma", "quantized")
+
     def __init__(self, corpora_folder: str = None, corpora_files: List = [], persistent_directory: str = None,
-                 embedding_function=None):
+                 embedding_function=None, batch_size: int = 64, max_workers: Optional[int] = None,
+                 max_in_flight: int = 4, embedding_cache: Optional[EmbeddingCache] = None,
+                 vector_backend: str = "chroma", splitter: Optional[StreamingTokenSplitter] = None):
 
         """
         Initialize the VectorStoreDBCreator.
@@ -32,36 +41,191 @@ class VectorStoreDBCreator:
             corpora_files (List): A list of specific corpora files. Default is an empty list.
             persistent_directory (str): The directory path to persist the vectorized data. Default is None.
             embedding_function (optional): The embedding function to use for vectorization. Default is None, which uses OpenAIEmbeddings.
+            batch_size (int): Amount of chunks sent to the embedding function per request. Default is 64.
+            max_workers (Optional[int]): Amount of processes parsing the files. Default is the amount of CPUs.
+            max_in_flight (int): Maximum amount of concurrent embedding requests. Default is 4.
+            embedding_cache (Optional[EmbeddingCache]): A cache checked before calling the embedding function.
+            Default is None, which embeds every chunk.
+            vector_backend (str): Where the vectors are stored, "chroma" or "quantized" (an int8 IVF index
+            memory-mapped from the persistent directory). Default is "chroma".
+            splitter (Optional[StreamingTokenSplitter]): Splits the articles in chunks of tokens. Default is None,
+            which uses chunks of 256 tokens overlapping by 32.
         """
+        if vector_backend not in self.VECTOR_BACKENDS:
+            raise ValueError(f"Unknown vector backend {vector_backend!r}, use one of {self.VECTOR_BACKENDS}")
 
         self.corpora_files = corpora_files
         self.corpora_folder = corpora_folder
         self.persistent_directory = persistent_directory
         self._embedding_function = embedding_function() if embedding_function else OpenAIEmbeddings()
+        self.embedding_cache = embedding_cache
+        if embedding_cache is not None:
+            self._embedding_function = CachedEmbeddings(self._embedding_function, embedding_cache)
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        self.vector_backend = vector_backend
+        self.splitter = splitter or StreamingTokenSplitter()
         self._db = None
+        self._unmanaged_chunks = False
+        self.version = 0
+
+    @property
+    def embedding_function(self):
+        """
+        Get the embedding function used to vectorize the documents and the queries.
+
+        Returns:
+            Embeddings: The embedding function.
+        """
+        return self._embedding_function
+
+    @staticmethod
+    def _add_embeddings(db: Union[Chroma, QuantizedVectorStore], ids: List[str], texts: List[str],
+                        embeddings: List[List[float]], metadatas: List[dict]):
+        """
+        Store already embedded chunks in the database in a single bulk write.
+        Chunk ids are deterministic, so writing a chunk again after an interrupted ingestion replaces it.
+
+        Args:
+            db (Union[Chroma, QuantizedVectorStore]): The database instance.
+            ids (List[str]): The ids of the chunks.
+            texts (List[str]): The content of the chunks.
+            embeddings (List[List[float]]): The embeddings of the chunks.
+            metadatas (List[dict]): The metadata of the chunks.
+        """
+        if isinstance(db, QuantizedVectorStore):
+            db.upsert(ids, texts, embeddings, metadatas)
+        else:
+            db._collection.upsert(ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas)
 
-    def _load_docs(self, db: Chroma):
+    @staticmethod
+    def _delete_ids(db: Union[Chroma, QuantizedVectorStore], ids: List[str], batch_size: int = 5000):
         """
-        Load and vectorize documents using a JSONLoader and store them in a Chroma database.
+        Remove chunks from the database.
 
         Args:
-            db (Chroma): The Chroma database instance.
+            db (Union[Chroma, QuantizedVectorStore]): The database instance.
+            ids (List[str]): The ids of the chunks to remove.
+            batch_size (int): Amount of ids removed per request.
         """
-        processed_docs = set(e["source"] for e in db.get()["metadatas"])
-        text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-        loaders = [JSONLoader(file, ".body") for file in self.corpora_files if file not in processed_docs]
+        for start in range(0, len(ids), batch_size):
+            if isinstance(db, QuantizedVectorStore):
+                db.delete(ids[start:start + batch_size])
+            else:
+                db._collection.delete(ids=ids[start:start + batch_size])
 
+    @staticmethod
+    def _missing_sources(db: Chroma, page_size: int = 5000) -> set:
+        """
+        Find the stored sources whose file isn't on disk anymore.
+
+        Args:
+            db (Chroma): The database instance.
+            page_size (int): Amount of chunks read per request.
+
+        Returns:
+            set: The paths of the missing sources.
+        """
+        sources = set()
+        for offset in range(0, db._collection.count(), page_size):
+            page = db._collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            sources.update(metadata.get("source") for metadata in page["metadatas"] if metadata)
+        return {source for source in sources if source and not os.path.exists(source)}
+
+    def _corpora_paths(self) -> List[str]:
+        """
+        Returns:
+            List[str]: The corpora files and the files inside the corpora folder, skipping hidden ones such as
+            the download manifest and partial downloads.
+        """
+        files = list(self.corpora_files)
         if self.corpora_folder:
-            for filename in os.listdir(self.corpora_folder):
-                file = os.path.join(self.corpora_folder, filename)
-                if file not in processed_docs:
-                    loaders.append(JSONLoader(file, ".body"))
+            files += [
+                os.path.join(self.corpora_folder, filename) for filename in sorted(os.listdir(self.corpora_folder))
+                if not filename.startswith(".")
+            ]
+        return files
 
-        for loader in loaders:
-            logger.info("processing data...")
-            documents = loader.load()
-            docs = text_splitter.split_documents(documents)
-            db.add_documents(docs)
+    @cached_property
+    def manifest(self) -> IngestionManifest:
+        """
+        Get the ingestion manifest. It lives next to the persisted data, or in memory for a non persistent DB.
+        It records the settings of the splitter, so the articles are split again when they change.
+
+        Returns:
+            IngestionManifest: The manifest of the ingested files.
+        """
+        if not self.persistent_directory:
+            return IngestionManifest(":memory:", chunking=repr(self.splitter))
+        os.makedirs(self.persistent_directory, exist_ok=True)
+        return IngestionManifest(os.path.join(self.persistent_directory, self.MANIFEST_FILENAME),
+                                 chunking=repr(self.splitter))
+
+    def _load_docs(self, db: Union[Chroma, QuantizedVectorStore], files: Optional[List[str]] = None,
+                   removed: Optional[List[str]] = None):
+        """
+        Bring the database up to date with the source files. Only new or modified contents go through the
+        ingestion pipeline, and the chunks of modified or deleted files are removed.
+
+        Args:
+            db (Union[Chroma, QuantizedVectorStore]): The database instance.
+            files (Optional[List[str]]): The files to check. Default is None, which checks every corpora file.
+            removed (Optional[List[str]]): Files known to be deleted. Default is None, which removes every
+            ingested file missing from `files`.
+
+        Returns:
+            IngestionStats: The counters and throughput of the ingestion.
+        """
+        plan = self.manifest.plan(self._corpora_paths() if files is None else files, removed)
+        if plan.stale_chunk_ids:
+            logger.info("removing %d stale chunks...", len(plan.stale_chunk_ids))
+            self._delete_ids(db, plan.stale_chunk_ids)
+
+        if self._unmanaged_chunks:
+            # Chunks written before the manifest existed are only known by their source: the ones of the files
+            # ingested again and of the files deleted meanwhile are removed.
+            for path in set(plan.upserted) | self._missing_sources(db):
+                db._collection.delete(where={"source": path})
+
+        hashes = {path: sha256 for sha256, path in plan.to_index.items()}
+        chunk_ids = {}
+        logger.info("processing %d files...", len(hashes))
+        pipeline = IngestionPipeline(
+            self._embedding_function,
+            lambda *batch: self._add_embeddings(db, *batch),
+            batch_size=self.batch_size,
+            max_workers=self.max_workers,
+            max_in_flight=self.max_in_flight,
+            splitter=self.splitter,
+            id_factory=lambda file, index: f"{hashes[file]}-{index}",
+        )
+        stats = pipeline.run(list(hashes), on_file=lambda file, ids: chunk_ids.__setitem__(hashes[file], ids))
+        if self.persistent_directory or isinstance(db, QuantizedVectorStore):
+            # The new chunks of the quantized index are written as a delta, searched exhaustively, and the index is
+            # only rebuilt once enough of it changed.
+            db.persist()
+        self.manifest.commit(plan, chunk_ids)
+        self._unmanaged_chunks = False
+        if plan:
+            self.version += 1
+
+        if self.embedding_cache is not None:
+            logger.info("Embedding cache: %s", self.embedding_cache.stats)
+        return stats
+
+    def apply_changes(self, updated: List[str], removed: List[str]):
+        """
+        Upsert and delete exactly the given files, without scanning the rest of the corpora.
+
+        Args:
+            updated (List[str]): Paths of the added or modified files.
+            removed (List[str]): Paths of the deleted files.
+
+        Returns:
+            IngestionStats: The counters and throughput of the ingestion.
+        """
+        return self._load_docs(self.vectorstore, files=updated, removed=removed)
 
     @cached_property
     def vectorstore(self):
@@ -70,13 +234,16 @@ class VectorStoreDBCreator:
 
         If a persistent directory was set, it loads the vectorized data from the directory
         or creates an empty database if the directory does not exist.
-        It adds new articles if there is a corpora folder or corpora files.
+        It adds new or modified articles and removes deleted ones if there is a corpora folder or corpora files.
 
         Returns:
-            Chroma: The Chroma vector store.
+            Union[Chroma, QuantizedVectorStore]: The vector store.
         """
 
-        if self.persistent_directory:
+        if self.vector_backend == "quantized":
+            logger.info("Creating a quantized DB.")
+            self._db = QuantizedVectorStore(self._embedding_function, persist_directory=self.persistent_directory)
+        elif self.persistent_directory:
             logger.info("Creating a persistent DB.")
             self._db = Chroma(embedding_function=self._embedding_function, persist_directory=self.persistent_directory)
             self._db.persist()
@@ -84,6 +251,9 @@ class VectorStoreDBCreator:
             logger.info("Creating a non persistent DB.")
             self._db = Chroma(embedding_function=self._embedding_function)
 
+        self._unmanaged_chunks = (self.manifest.created and isinstance(self._db, Chroma)
+                                  and self._db._collection.count() > 0)
+
         if self.corpora_folder or self.corpora_files:
             logger.info("Add new data to the DB.")
             self._load_docs(self._db)
@@ -0,0 +1,220 @@
+import asyncio
+import csv
+import logging
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+from playwright.async_api import Browser, Page, async_playwright
+from browser_pool import BlockedError
+from extraction import Field, extract_from_async_page
+from rate_limiter import DomainRateLimiter
+from resource_filter import ResourceFilter
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class AsyncG2CompranyCrawl:
+    """
+    Concurrent version of G2CompranyCrawl built on Playwright's async API. Every worker owns a browser context and
+    a page, requests are paced by a per-domain token bucket, and results are sent back as soon as they are ready.
+
+    Args:
+        csv_file (str): The filename of the CSV file containing the URLs of the companies.
+        concurrency (int): Amount of browser contexts crawling at the same time.
+        rate (float): Requests per second allowed for every domain.
+        burst (int): Burst of requests allowed for every domain.
+        max_retries (int): Times a company is retried in a new context after being blocked.
+        resource_filter (Optional[ResourceFilter]): Request interception, None to load every resource.
+        schema (Optional[List[Field]]): The fields scraped from every company.
+
+    Usage Example:
+        crawler = AsyncG2CompranyCrawl('companies.csv', concurrency=4)
+        async for result in crawler.extract_data():
+            print(result)  # {'row': 3, 'url': 'https://...', 'data': {...}, 'error': None}
+    """
+
+    def __init__(self, csv_file: str, concurrency: int = 4, rate: float = 0.25, burst: int = 1,
+                 max_retries: int = 2, resource_filter: Optional[ResourceFilter] = None,
+                 schema: Optional[List[Field]] = None):
+        """
+        Initialize the AsyncG2CompranyCrawl.
+
+        Args:
+            csv_file (str): The filename of the CSV file containing the URLs of the companies.
+            concurrency (int): Amount of browser contexts crawling at the same time. Default is 4.
+            rate (float): Requests per second allowed for every domain. Default is one every 4 seconds.
+            burst (int): Burst of requests allowed for every domain. Default is 1.
+            max_retries (int): Times a company is retried in a new context after being blocked. Default is 2.
+            resource_filter (Optional[ResourceFilter]): Request interception, None to load every resource.
+            Default is None.
+            schema (Optional[List[Field]]): The fields scraped from every company. Default is G2_COMPANY_SCHEMA.
+        """
+        self.csv_file = csv_file
+        self.concurrency = concurrency
+        self.rate_limiter = DomainRateLimiter(rate, burst)
+        self.max_retries = max_retries
+        self.resource_filter = resource_filter
+        self.schema = schema
+
+    def read_csv(self):
+        """
+        Read the companies url from the csv.
+
+        Yields:
+            tuple: The row number and the URL of every company.
+        """
+        with open(self.csv_file) as file:
+            for row, (company_url,) in enumerate(csv.reader(file)):
+                yield row, company_url
+
+    async def _new_page(self, browser: Browser, playwright) -> Page:
+        """
+        Creates a new browser page tab with firefox context.
+        """
+        context = await browser.new_context(**playwright.devices['Desktop Firefox'])
+        if self.resource_filter:
+            await self.resource_filter.attach_async(context)
+        return await context.new_page()
+
+    async def _goto(self, page: Page, url: str):
+        """
+        Move the page to a certain direction. if a captcha is detected, it pass the validation.
+
+        Raises:
+            BlockedError: If the browser context is banned.
+        """
+        await self.rate_limiter.acquire(url)
+        await page.goto(url, wait_until="domcontentloaded")
+        locator = await page.locator(
+            'h2[id=challenge-running], div[itemprop=description], div.cf-error-title').inner_text()
+
+        if locator == "Checking if the site connection is secure":
+            logger.info("Captcha detected")
+            logger.info("clicking the captcha")
+            await page.frame_locator("iFrame").locator('input').click()
+        elif locator == "Access denied\nError code 1020":
+            raise BlockedError(url)
+
+        await page.locator('div[itemprop=description]').wait_for()
+        logger.info("Captcha passed")
+
+    async def get_company_data(self, page: Page) -> dict:
+        """
+        Scrapes the relevant data from a company page in a single round trip to the browser.
+
+        Args:
+            page (Page): The company page to scrape data from.
+
+        Returns:
+            dict: A dictionary containing the scraped data, by default the title, description, and logo URL.
+        """
+        return await extract_from_async_page(page, self.schema)
+
+    @staticmethod
+    async def _close(page: Page):
+        """
+        Close the context of a page, ignoring the errors of an already broken context.
+        """
+        if page is not None:
+            try:
+                await page.context.close()
+            except Exception:
+                logger.debug("The context was already closed.")
+
+    async def _worker(self, browser: Browser, playwright, companies: asyncio.Queue, results: asyncio.Queue):
+        """
+        Crawl companies from the queue until it is empty. Errors are reported as results and the context of the
+        worker is replaced, so a failing company or context never stops the other workers.
+        """
+        page = None
+        try:
+            while True:
+                row, company_url = await companies.get()
+                if company_url is None:
+                    break
+                logger.info("Crawling %s", company_url)
+                result = {"row": row, "url": company_url, "data": None, "error": None}
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        if page is None:
+                            page = await self._new_page(browser, playwright)
+                        await self._goto(page, company_url)
+                        result["data"] = await self.get_company_data(page)
+                        result["error"] = None
+                        break
+                    except BlockedError:
+                        logger.info("browser context denied, creating another")
+                        result["error"] = "blocked"
+                        await self._close(page)
+                        page = None
+                    except Exception as error:
+                        logger.exception("Failed to crawl %s", company_url)
+                        result["error"] = repr(error)
+                        await self._close(page)
+                        page = None
+                        break
+                await results.put(result)
+        finally:
+            await self._close(page)
+            await results.put(None)
+
+    async def _feed(self, companies: asyncio.Queue, rows):
+        """
+        Queue the companies and then a stop marker per worker. The markers are queued even if reading the rows
+        fails, so the workers finish the companies already queued and stop, and the error is raised afterwards.
+        """
+        error = None
+        try:
+            for row, company_url in rows:
+                await companies.put((row, company_url))
+        except Exception as caught:
+            error = caught
+        for _ in range(self.concurrency):
+            await companies.put((None, None))
+        if error is not None:
+            raise error
+
+    async def extract_data(self, rows: Optional[Iterable[Tuple[int, str]]] = None) -> AsyncIterator[dict]:
+        """
+        Crawl every company of the CSV file concurrently.
+
+        Args:
+            rows (Optional[Iterable[Tuple[int, str]]]): The row and the URL of the companies to crawl.
+            Default is every company of the CSV file.
+
+        Yields:
+            dict: The result of every company as soon as it is ready, so they may arrive out of order:
+                - row (int): The row of the company in the CSV file.
+                - url (str): The URL of the company.
+                - data (dict): The title, description and logo URL of the company, or None if it failed.
+                - error (str): The reason of the failure, or None.
+
+        Raises:
+            Exception: The error reading the rows (e.g. a malformed CSV file), after the results of the companies
+            read before it.
+        """
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch()
+            companies = asyncio.Queue(maxsize=2 * self.concurrency)
+            results = asyncio.Queue()
+            feeder = asyncio.create_task(self._feed(companies, self.read_csv() if rows is None else rows))
+            tasks = [feeder] + [
+                asyncio.create_task(self._worker(browser, playwright, companies, results))
+                for _ in range(self.concurrency)
+            ]
+            try:
+                running = self.concurrency
+                while running:
+                    result = await results.get()
+                    if result is None:
+                        running -= 1
+                    else:
+                        yield result
+                # The workers stopped, so the feeder queued every marker and has finished, raising its error if any.
+                await feeder
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await browser.close()
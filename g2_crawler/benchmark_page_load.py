@@ -0,0 +1,89 @@
+import csv
+import logging
+import os
+import statistics
+from playwright.sync_api import sync_playwright
+from resource_filter import PageLoadMetrics, ResourceFilter
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DESCRIPTION = 'div[itemprop=description]'
+
+
+def record(browser, playwright, urls: list, har_file: str):
+    """
+    Visit the URLs recording every response to a HAR file, so the benchmark replays the same pages every time.
+    """
+    context = browser.new_context(**playwright.devices['Desktop Firefox'], record_har_path=har_file)
+    page = context.new_page()
+    for url in urls:
+        logger.info("Recording %s", url)
+        page.goto(url)
+    context.close()
+
+
+def replay(browser, playwright, urls: list, har_file: str, resource_filter, wait_until: str) -> list:
+    """
+    Load the recorded pages, answering every request from the HAR file.
+
+    Returns:
+        list: The requests, blocked requests, bytes and load time of every page.
+    """
+    context = browser.new_context(**playwright.devices['Desktop Firefox'])
+    context.route_from_har(har_file, not_found="abort")
+    metrics = PageLoadMetrics()
+    if resource_filter:
+        # Routes added later are matched first, so the filter runs before the HAR replay.
+        resource_filter.attach(context, metrics)
+    page = context.new_page()
+    page.on("requestfinished", metrics.on_request_finished)
+    reports = []
+    for url in urls:
+        metrics.reset()
+        page.goto(url, wait_until=wait_until)
+        page.locator(DESCRIPTION).first.wait_for()
+        reports.append(metrics.report())
+    context.close()
+    return reports
+
+
+def summary(reports: list) -> dict:
+    return {
+        "bytes": statistics.mean(report["bytes"] for report in reports),
+        "requests": statistics.mean(report["requests"] for report in reports),
+        "blocked": statistics.mean(report["blocked"] for report in reports),
+        "load_ms_p50": statistics.median(report["load_ms"] for report in reports),
+        "load_ms_mean": statistics.mean(report["load_ms"] for report in reports),
+    }
+
+
+if __name__ == '__main__':
+    CSV_FILE = os.getenv("CSV_FILE", default="companies.csv")
+    HAR_FILE = os.getenv("HAR_FILE", default="output/g2_pages.har")
+    BENCHMARK_PAGES = int(os.getenv("BENCHMARK_PAGES", default="10"))
+
+    with open(CSV_FILE) as file:
+        urls = [company_url for company_url, in csv.reader(file)][:BENCHMARK_PAGES]
+
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch()
+        if not os.path.exists(HAR_FILE):
+            os.makedirs(os.path.dirname(HAR_FILE) or ".", exist_ok=True)
+            record(browser, playwright, urls, HAR_FILE)
+        full = summary(replay(browser, playwright, urls, HAR_FILE, None, "load"))
+        light = summary(replay(browser, playwright, urls, HAR_FILE, ResourceFilter(), "domcontentloaded"))
+        browser.close()
+
+    for name, result in (("full load", full), ("filtered", light)):
+        print(f"{name:>10}: " + ", ".join(f"{key} {value:.1f}" for key, value in result.items()))
+    print(f"bytes saved: {1 - light['bytes'] / full['bytes']:.1%}, "
+          f"load time saved: {1 - light['load_ms_mean'] / full['load_ms_mean']:.1%}")
+
+
+"""
+To Run (the first run records the pages to HAR_FILE, later runs replay them offline)
+BENCHMARK_PAGES=10 python benchmark_page_load.py
+"""
@@ -0,0 +1,202 @@
+import itertools
+import logging
+import time
+from collections import deque
+from typing import List, Optional
+from playwright.sync_api import Browser, BrowserContext, Page
+from resource_filter import PageLoadMetrics, ResourceFilter
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class BlockedError(Exception):
+    """
+    Raised when G2 denies the access to the browser context.
+    """
+
+
+class PooledContext:
+    """
+    A browser context of the pool with its page and its health metrics.
+
+    Attributes:
+        context (BrowserContext): The browser context.
+        page (Page): The page of the context.
+        device (str): The device profile of the context.
+        proxy (Optional[str]): The proxy server of the context.
+        requests (int): Amount of pages requested with the context.
+        blocks (int): Amount of requests that were denied.
+        captchas (int): Amount of captchas found.
+        errors (int): Amount of requests that failed for other reasons.
+        load_metrics (PageLoadMetrics): Requests, bytes and load time of the last page loaded.
+    """
+
+    def __init__(self, context: BrowserContext, page: Page, device: str, proxy: Optional[str]):
+        self.context = context
+        self.page = page
+        self.device = device
+        self.proxy = proxy
+        self.created_at = time.monotonic()
+        self.requests = 0
+        self.blocks = 0
+        self.captchas = 0
+        self.errors = 0
+        self.load_metrics = PageLoadMetrics()
+        page.on("requestfinished", self.load_metrics.on_request_finished)
+
+    @property
+    def block_rate(self) -> float:
+        return self.blocks / self.requests if self.requests else 0.0
+
+    def metrics(self) -> dict:
+        return {
+            "device": self.device, "proxy": self.proxy, "requests": self.requests, "blocks": self.blocks,
+            "captchas": self.captchas, "errors": self.errors, "block_rate": self.block_rate,
+            "age_s": time.monotonic() - self.created_at,
+        }
+
+
+class BrowserContextPool:
+    """
+    Pool of warm browser contexts sharing a single browser. The crawler works with the active context while the
+    others wait ready to replace it, so a blocked context is retired and swapped for a warm one without relaunching
+    the browser. Every new context takes the next device profile and proxy, so fingerprints rotate.
+
+    Args:
+        browser (Browser): The browser where contexts are created.
+        playwright: The Playwright instance, used to look up the device profiles.
+        size (int): Amount of contexts kept ready, including the active one.
+        devices (Optional[List[str]]): Names of the Playwright device profiles to rotate.
+        proxies (Optional[List[str]]): Proxy servers to rotate. Default is no proxy.
+        max_requests (Optional[int]): Requests after which a context is retired even if it wasn't blocked.
+        resource_filter (Optional[ResourceFilter]): Request interception installed in every context.
+    """
+
+    DEVICES = ['Desktop Firefox', 'Desktop Chrome', 'Desktop Edge']
+
+    def __init__(self, browser: Browser, playwright, size: int = 2, devices: Optional[List[str]] = None,
+                 proxies: Optional[List[str]] = None, max_requests: Optional[int] = None,
+                 resource_filter: Optional[ResourceFilter] = None):
+        """
+        Initialize the BrowserContextPool.
+
+        Args:
+            browser (Browser): The browser where contexts are created.
+            playwright: The Playwright instance, used to look up the device profiles.
+            size (int): Amount of contexts kept ready, including the active one. Default is 2.
+            devices (Optional[List[str]]): Names of the Playwright device profiles to rotate. Default is DEVICES.
+            proxies (Optional[List[str]]): Proxy servers to rotate. Default is no proxy.
+            max_requests (Optional[int]): Requests after which a context is retired even if it wasn't blocked.
+            Default is None, never.
+            resource_filter (Optional[ResourceFilter]): Request interception installed in every context. Default
+            is None, every request is allowed.
+        """
+        self.browser = browser
+        self.playwright = playwright
+        self.size = max(1, size)
+        self.max_requests = max_requests
+        self.resource_filter = resource_filter
+        self._devices = itertools.cycle(devices or self.DEVICES)
+        self._proxies = itertools.cycle(proxies or [None])
+        self._ready = deque()
+        self._active = None
+        self.created = 0
+        self.retired = []
+        self._fill()
+
+    def _new_context(self) -> PooledContext:
+        device, proxy = next(self._devices), next(self._proxies)
+        options = dict(self.playwright.devices[device])
+        if proxy:
+            options["proxy"] = {"server": proxy}
+        context = self.browser.new_context(**options)
+        self.created += 1
+        logger.info("Created browser context #%d (%s, proxy %s).", self.created, device, proxy)
+        pooled = PooledContext(context, context.new_page(), device, proxy)
+        if self.resource_filter:
+            self.resource_filter.attach(context, pooled.load_metrics)
+        return pooled
+
+    def _fill(self):
+        while len(self._ready) + (self._active is not None) < self.size:
+            self._ready.append(self._new_context())
+
+    @property
+    def active(self) -> PooledContext:
+        """
+        Get the context in use, taking a warm one if there isn't any.
+
+        Returns:
+            PooledContext: The active context.
+        """
+        if self._active is None:
+            if not self._ready:
+                self._fill()
+            self._active = self._ready.popleft()
+        return self._active
+
+    def record(self, pooled: PooledContext, blocked: bool = False, captcha: bool = False, error: bool = False):
+        """
+        Account a request made with a context, retiring the context if it was blocked, failed or is worn out.
+        """
+        pooled.requests += 1
+        pooled.blocks += blocked
+        pooled.captchas += captcha
+        pooled.errors += error
+        if blocked or error or (self.max_requests and pooled.requests >= self.max_requests):
+            self.retire(pooled)
+
+    def retire(self, pooled: PooledContext):
+        """
+        Close a context and replace it with a new warm one.
+        """
+        if pooled is self._active:
+            self._active = None
+        elif pooled in self._ready:
+            self._ready.remove(pooled)
+        self.retired.append(pooled.metrics())
+        try:
+            pooled.context.close()
+        except Exception:
+            logger.debug("The context was already closed.")
+        logger.info("Retired a %s context after %d requests and %d blocks.", pooled.device, pooled.requests,
+                    pooled.blocks)
+        self._fill()
+
+    def metrics(self) -> dict:
+        """
+        Returns:
+            dict: The totals of the pool, the block rate of every device profile and the metrics of the live
+            contexts.
+        """
+        live = ([self._active] if self._active else []) + list(self._ready)
+        contexts = self.retired + [pooled.metrics() for pooled in live]
+        requests = sum(context["requests"] for context in contexts)
+        blocks = sum(context["blocks"] for context in contexts)
+        by_device = {}
+        for context in contexts:
+            device = by_device.setdefault(context["device"], {"requests": 0, "blocks": 0})
+            device["requests"] += context["requests"]
+            device["blocks"] += context["blocks"]
+        for device in by_device.values():
+            device["block_rate"] = device["blocks"] / device["requests"] if device["requests"] else 0.0
+        return {
+            "contexts_created": self.created, "contexts_retired": len(self.retired), "requests": requests,
+            "blocks": blocks, "block_rate": blocks / requests if requests else 0.0, "by_device": by_device,
+            "live": [pooled.metrics() for pooled in live],
+        }
+
+    def close(self):
+        """
+        Close every live context.
+        """
+        for pooled in ([self._active] if self._active else []) + list(self._ready):
+            try:
+                pooled.context.close()
+            except Exception:
+                logger.debug("The context was already closed.")
+        self._active = None
+        self._ready.clear()
@@ -0,0 +1,175 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Iterable, List, Optional, Tuple
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class JsonlSink:
+    """
+    Append-only JSON lines file. Every record is flushed and fsynced before `write` returns, so a record written
+    before a crash is never lost. A line left half written by a crash is dropped when the file is opened again.
+
+    Args:
+        path (str): The path of the JSON lines file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the JsonlSink.
+
+        Args:
+            path (str): The path of the JSON lines file.
+        """
+        self.path = path
+        self._truncate_partial_line()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _truncate_partial_line(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            content = f.read()
+            if content and not content.endswith(b"\n"):
+                logger.warning("Dropping the incomplete last line of %s.", self.path)
+                f.truncate(content.rfind(b"\n") + 1)
+
+    def write(self, record: dict):
+        """
+        Append a record to the file and make it durable.
+
+        Args:
+            record (dict): A JSON serializable record.
+        """
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class CrawlCheckpoint:
+    """
+    SQLite checkpoint of a crawl. It records the URLs already crawled, the URLs that failed for good and, for the
+    ones that failed fewer than `max_attempts` times, when they may be retried. The delay before a retry doubles on
+    every failure: `backoff`, 2 * `backoff`, 4 * `backoff`...
+
+    Results must be written to the sink before calling `succeeded`, so a crash between both only crawls that URL
+    again instead of losing its result.
+
+    Args:
+        path (str): The path of the SQLite database.
+        max_attempts (int): Times a URL is crawled before giving up on it.
+        backoff (float): Seconds to wait before the first retry.
+    """
+
+    DONE = "done"
+    FAILED = "failed"
+    RETRY = "retry"
+
+    def __init__(self, path: str, max_attempts: int = 3, backoff: float = 30.0):
+        """
+        Initialize the CrawlCheckpoint.
+
+        Args:
+            path (str): The path of the SQLite database.
+            max_attempts (int): Times a URL is crawled before giving up on it. Default is 3.
+            backoff (float): Seconds to wait before the first retry. Default is 30.
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            "url TEXT PRIMARY KEY, status TEXT NOT NULL, attempts INTEGER NOT NULL, "
+            "retry_at REAL, error TEXT, updated_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+
+    def _states(self) -> dict:
+        return {
+            url: (status, retry_at)
+            for url, status, retry_at in self._connection.execute("SELECT url, status, retry_at FROM urls")
+        }
+
+    def due(self, companies: Iterable[Tuple[int, str]]) -> Tuple[List[Tuple[int, str]], Optional[float]]:
+        """
+        Split the companies that are left to crawl into the ones that can be crawled now and the ones waiting for a
+        retry.
+
+        Args:
+            companies (Iterable[Tuple[int, str]]): The row and the URL of every company.
+
+        Returns:
+            tuple: The companies to crawl now, and the time of the next retry, or None if no retry is waiting.
+        """
+        states = self._states()
+        now = time.time()
+        due, next_retry, seen = [], None, set()
+        for row, url in companies:
+            if url in seen:
+                continue
+            seen.add(url)
+            status, retry_at = states.get(url, (None, None))
+            if status in (self.DONE, self.FAILED):
+                continue
+            if status == self.RETRY and retry_at > now:
+                next_retry = retry_at if next_retry is None else min(next_retry, retry_at)
+                continue
+            due.append((row, url))
+        return due, next_retry
+
+    def succeeded(self, url: str):
+        """
+        Record a URL as crawled.
+        """
+        with self._connection:
+            self._connection.execute(
+                "INSERT INTO urls (url, status, attempts, updated_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(url) DO UPDATE SET status=excluded.status, attempts=attempts + 1, retry_at=NULL, "
+                "error=NULL, updated_at=excluded.updated_at",
+                (url, self.DONE, time.time())
+            )
+
+    def failed(self, url: str, error: str) -> bool:
+        """
+        Record a failed crawl of a URL, scheduling a retry unless it has run out of attempts.
+
+        Returns:
+            bool: Whether the URL will be retried.
+        """
+        row = self._connection.execute("SELECT attempts FROM urls WHERE url = ?", (url,)).fetchone()
+        attempts = (row[0] if row else 0) + 1
+        now = time.time()
+        if attempts >= self.max_attempts:
+            status, retry_at = self.FAILED, None
+            logger.warning("Giving up on %s after %d attempts: %s", url, attempts, error)
+        else:
+            status, retry_at = self.RETRY, now + self.backoff * 2 ** (attempts - 1)
+            logger.info("Retrying %s in %.0f seconds: %s", url, retry_at - now, error)
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO urls (url, status, attempts, retry_at, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, status, attempts, retry_at, error, now)
+            )
+        return status == self.RETRY
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: The amount of URLs in every status.
+        """
+        return dict(self._connection.execute("SELECT status, COUNT(*) FROM urls GROUP BY status").fetchall())
+
+    def close(self):
+        self._connection.close()
@@ -1,10 +1,14 @@
 import random
 
-from functools import cached_property
 import logging
 import csv
+from typing import List, Optional
 from playwright.sync_api import sync_playwright
-from time import sleep
+from time import sleep, time
+from browser_pool import BlockedError, BrowserContextPool
+from extraction import Field, extract_from_page
+from http_fetcher import HttpFetcher
+from resource_filter import ResourceFilter
 
 
 # Configure the logging settings
@@ -18,6 +22,15 @@ class G2CompranyCrawl:
 
     Args:
         csv_file (str): The filename of the CSV file containing the URLs of the companies.
+        pool_size (int): Amount of warm browser contexts, see BrowserContextPool.
+        devices (Optional[List[str]]): Playwright device profiles rotated by the contexts.
+        proxies (Optional[List[str]]): Proxy servers rotated by the contexts.
+        max_retries (int): Times a URL is retried in a new context after being blocked.
+        resource_filter (Optional[ResourceFilter]): Request interception, None to load every resource.
+        wait_until (str): The load state waited by `page.goto`, the selectors are awaited afterwards anyway.
+        schema (Optional[List[Field]]): The fields scraped from every company, default is G2_COMPANY_SCHEMA.
+        http_fetcher (Optional[HttpFetcher]): Fast path tried before the browser. The browser is only launched
+            once a page needs it.
 
     Methods:
         extract_data(): Main process that requests the URLs and extracts the data from each company.
@@ -30,12 +43,26 @@ class G2CompranyCrawl:
             print(data)
     """
 
-    def __init__(self, csv_file: str):
+    def __init__(self, csv_file: str, pool_size: int = 2, devices: Optional[List[str]] = None,
+                 proxies: Optional[List[str]] = None, max_retries: int = 3,
+                 resource_filter: Optional[ResourceFilter] = None, wait_until: str = "domcontentloaded",
+                 schema: Optional[List[Field]] = None, http_fetcher: Optional[HttpFetcher] = None):
         """
         G2crwod crawler, given a csv filename with the url of the companies it crawl some relevant data from there
         """
         self.csv_file = csv_file
-        self._init_playwright()
+        self.pool_size = pool_size
+        self.devices = devices
+        self.proxies = proxies
+        self.max_retries = max_retries
+        self.resource_filter = resource_filter
+        self.wait_until = wait_until
+        self.schema = schema
+        self.http_fetcher = http_fetcher
+        self.last_load = None
+        self.pool = None
+        if http_fetcher is None:
+            self._init_playwright()
 
     def _init_playwright(self):
         """
@@ -44,14 +71,20 @@ class G2CompranyCrawl:
         logger.info("creating a new browser")
         self.playwright = sync_playwright().start()
         self.browser = self.playwright.chromium.launch()
+        self.pool = BrowserContextPool(self.browser, self.playwright, self.pool_size, self.devices, self.proxies,
+                                       resource_filter=self.resource_filter)
 
     def _destroy_playwright(self):
         """
         Destrois the playwright resources
         """
+        if self.pool is None:
+            return
         logger.info("destroying the browser")
+        self.pool.close()
         self.browser.close()
         self.playwright.stop()
+        self.pool = None
 
     def __delete__(self):
         """
@@ -60,40 +93,49 @@ class G2CompranyCrawl:
         self._destroy_playwright()
         super().__delete__()
 
-    @cached_property
+    @property
     def _page_tab(self):
         """
-        Creates a new browser page tab with firefox context.
+        The page of the active browser context of the pool.
         """
-        firefox_context = self.playwright.devices['Desktop Firefox']
-        context = self.browser.new_context(
-            **firefox_context,
-        )
-        page = context.new_page()
-        return page
+        return self.pool.active.page
 
     def _goto(self, url: str):
         """
         Move the page to a certain direction. if a captcha is detected, it pass the validation.
-        if the browser session is banned, it creates a new one
-        """
-        self._page_tab.goto(url)
-        locator = self._page_tab.locator(
-            'h2[id=challenge-running], div[itemprop=description], div.cf-error-title').inner_text()
-
-        if locator == "Checking if the site connection is secure":
-            logger.info("Captcha detected")
-            logger.info("clicking the captcha")
-            self._page_tab.frame_locator("iFrame").locator('input').click()
-        elif locator == "Access denied\nError code 1020":
-            logger.info("browser denied, creating another")
-            self._destroy_playwright()
-            self._init_playwright()
-            del self.__dict__['_page_tab']
-            return self._goto(url)
+        if the browser context is banned, it is swapped for a warm one of the pool and the URL is retried.
 
-        self._page_tab.locator('div[itemprop=description]').inner_text()
-        logger.info("Captcha passed")
+        The requests, blocked requests, bytes and load time of the page are left in `last_load`.
+
+        Raises:
+            BlockedError: If the URL is still denied after `max_retries` retries.
+        """
+        if self.pool is None:
+            self._init_playwright()
+        for _ in range(self.max_retries + 1):
+            pooled = self.pool.active
+            pooled.load_metrics.reset()
+            pooled.page.goto(url, wait_until=self.wait_until)
+            locator = pooled.page.locator(
+                'h2[id=challenge-running], div[itemprop=description], div.cf-error-title').inner_text()
+
+            captcha = locator == "Checking if the site connection is secure"
+            if captcha:
+                logger.info("Captcha detected")
+                logger.info("clicking the captcha")
+                pooled.page.frame_locator("iFrame").locator('input').click()
+            elif locator == "Access denied\nError code 1020":
+                logger.info("browser context denied, swapping it for a warm one")
+                self.pool.record(pooled, blocked=True)
+                continue
+
+            pooled.page.locator('div[itemprop=description]').wait_for()
+            self.last_load = pooled.load_metrics.report()
+            logger.info("Loaded %s: %s", url, self.last_load)
+            self.pool.record(pooled, captcha=captcha)
+            logger.info("Captcha passed")
+            return
+        raise BlockedError(url)
 
     def extract_data(self):
         """
@@ -125,6 +167,51 @@ class G2CompranyCrawl:
             data = self.get_company_data(company_url)
             yield data
 
+    def crawl(self, companies):
+        """
+        Crawl the given companies, reporting failures as results instead of raising them, so a caller can
+        checkpoint every company and retry the failed ones later.
+
+        Args:
+            companies (Iterable[Tuple[int, str]]): The row in the CSV file and the URL of every company.
+
+        Yields:
+            dict: The result of every company:
+                - row (int): The row of the company in the CSV file.
+                - url (str): The URL of the company.
+                - data (dict): The title, description and logo URL of the company, or None if it failed.
+                - error (str): The reason of the failure, or None.
+                - load (dict): The requests, blocked requests, bytes and load time of the page, or None.
+                - source (str): "http" if the page was fetched without the browser, "browser" otherwise.
+        """
+        for index, (row, company_url) in enumerate(companies):
+            if index:
+                tts = random.randint(2, 6)
+                logger.info("Sleeping %d", tts)
+                sleep(tts)
+            logger.info("Crawling %s", company_url)
+            result = {"row": row, "url": company_url, "data": None, "error": None, "load": None, "source": "http"}
+            if self.http_fetcher:
+                result["data"] = self.http_fetcher.fetch(company_url)
+                if result["data"] is not None:
+                    yield result
+                    continue
+            result["source"] = "browser"
+            started = time()
+            try:
+                self._goto(company_url)
+                result["load"] = self.last_load
+                result["data"] = self.get_company_data(company_url)
+            except Exception as error:
+                logger.exception("Failed to crawl %s", company_url)
+                result["error"] = repr(error)
+                if self.pool and not isinstance(error, BlockedError):
+                    # The page may be left in a broken state, so the next company starts with a new context.
+                    self.pool.record(self.pool.active, error=True)
+            if self.http_fetcher:
+                self.http_fetcher.record_browser_time((time() - started) * 1000)
+            yield result
+
     def read_csv(self):
         """
         Read the companies url from the csv.
@@ -140,13 +227,14 @@ class G2CompranyCrawl:
 
     def get_company_data(self, page):
         """
-        Scrapes the relevant data from a company page.
+        Scrapes the relevant data from a company page. Every field of the schema is read in a single round trip to
+        the browser, so adding fields doesn't add round trips.
 
         Args:
             page: The company page to scrape data from.
 
         Returns:
-            dict: A dictionary containing the scraped data, including the title, description, and logo URL.
+            dict: A dictionary containing the scraped data, by default the title, description, and logo URL.
                 - title (str): The title of the company.
                 - description (str): The description of the company.
                 - logo_url (str): The URL of the company's logo.
@@ -159,16 +247,4 @@ class G2CompranyCrawl:
             data = self.get_company_data(page)
             print(data)  # {'title': 'Company ABC', 'description': '...', 'logo_url': 'https://...'}
         """
-        page = self._page_tab
-        title = page.query_selector("h1.l2.pb-half.inline-block")
-        title = title.inner_html() if title else None
-        description = page.query_selector('div[itemprop=description]')
-        description = description.inner_text() if description else None
-        logo = page.query_selector('a.product-head__logo__img.pjax img.detail-logo')
-        logo_url = logo.get_attribute("src") if logo else None
-
-        return {
-            "title": title,
-            "description": description,
-            "logo_url": logo_url
-        }
+        return extract_from_page(self._page_tab, self.schema)
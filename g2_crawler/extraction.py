@@ -0,0 +1,158 @@
+import re
+from typing import List, NamedTuple, Optional
+from selectolax.lexbor import LexborHTMLParser
+
+
+class Field(NamedTuple):
+    """
+    A field scraped from a page.
+
+    Attributes:
+        name (str): The key of the field in the scraped data.
+        selector (str): The CSS selector of the element.
+        extract (str): What is read from the element: "text", "html" or "attr:<name>".
+        many (bool): Whether every matching element is read into a list instead of the first one.
+    """
+    name: str
+    selector: str
+    extract: str = "text"
+    many: bool = False
+
+
+G2_COMPANY_SCHEMA = [
+    Field("title", "h1.l2.pb-half.inline-block", "html"),
+    Field("description", "div[itemprop=description]", "text"),
+    Field("logo_url", "a.product-head__logo__img.pjax img.detail-logo", "attr:src"),
+]
+
+# Elements laid out as blocks, whose text `innerText` puts on lines of their own.
+BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "dd", "details", "div", "dl", "dt", "fieldset", "figcaption",
+    "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p",
+    "pre", "section", "summary", "table", "tr", "ul",
+})
+# Elements whose content isn't rendered, so `innerText` skips it.
+HIDDEN_TAGS = frozenset({"head", "noscript", "script", "style", "template"})
+WHITESPACE = re.compile(r"\s+")
+
+# Reads every field of a schema in a single round trip to the browser.
+EXTRACT_SCRIPT = """
+fields => {
+    const read = (element, extract) => {
+        if (extract === "text") return element.innerText;
+        if (extract === "html") return element.innerHTML;
+        return element.getAttribute(extract.slice(5));
+    };
+    const data = {};
+    for (const [name, selector, extract, many] of fields) {
+        if (many) {
+            data[name] = Array.from(document.querySelectorAll(selector), element => read(element, extract));
+        } else {
+            const element = document.querySelector(selector);
+            data[name] = element ? read(element, extract) : null;
+        }
+    }
+    return data;
+}
+"""
+
+
+def extract_from_page(page, schema: Optional[List[Field]] = None) -> dict:
+    """
+    Scrape the fields of a schema from a page of Playwright's sync API with a single `page.evaluate`.
+
+    Args:
+        page (Page): The page to scrape.
+        schema (Optional[List[Field]]): The fields to scrape. Default is G2_COMPANY_SCHEMA.
+
+    Returns:
+        dict: The value of every field, None (or an empty list) for the ones that weren't found. The "text" fields
+        are `innerText` normalized with `normalize_text`.
+    """
+    schema = schema or G2_COMPANY_SCHEMA
+    return _normalize_texts(page.evaluate(EXTRACT_SCRIPT, [list(field) for field in schema]), schema)
+
+
+async def extract_from_async_page(page, schema: Optional[List[Field]] = None) -> dict:
+    """
+    Same as `extract_from_page` for a page of Playwright's async API.
+    """
+    schema = schema or G2_COMPANY_SCHEMA
+    return _normalize_texts(await page.evaluate(EXTRACT_SCRIPT, [list(field) for field in schema]), schema)
+
+
+def normalize_text(text: Optional[str]) -> Optional[str]:
+    """
+    Collapse the whitespace of every line of a text and drop the empty lines. Applied to the "text" fields read by
+    the browser and from the HTML, so both paths give the same value for the same page.
+    """
+    if text is None:
+        return None
+    lines = (" ".join(line.split()) for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def _normalize_texts(data: dict, schema: List[Field]) -> dict:
+    for field in schema:
+        if field.extract == "text" and data.get(field.name) is not None:
+            value = data[field.name]
+            data[field.name] = [normalize_text(item) for item in value] if field.many else normalize_text(value)
+    return data
+
+
+def _inner_text(node) -> str:
+    """
+    Approximate the browser's `innerText` of an element: whitespace in the source collapses to single spaces, and
+    line breaks come from block elements and <br>.
+    """
+    parts = []
+
+    def walk(parent):
+        for child in parent.iter(include_text=True):
+            if child.tag == "-text":
+                parts.append(WHITESPACE.sub(" ", child.text_content or ""))
+            elif child.tag == "br":
+                parts.append("\n")
+            elif child.tag in BLOCK_TAGS:
+                parts.append("\n")
+                walk(child)
+                parts.append("\n")
+            elif child.tag in ("td", "th"):
+                walk(child)
+                parts.append(" ")
+            elif child.tag not in HIDDEN_TAGS and not child.tag.startswith("-"):
+                walk(child)
+
+    walk(node)
+    return normalize_text("".join(parts))
+
+
+def _read(node, extract: str) -> Optional[str]:
+    if extract == "text":
+        return _inner_text(node)
+    if extract == "html":
+        return "".join(child.html for child in node.iter(include_text=True))
+    return node.attributes.get(extract[len("attr:"):])
+
+
+def extract_from_html(html: str, schema: Optional[List[Field]] = None) -> dict:
+    """
+    Scrape the fields of a schema from the HTML of a page, parsing it once. Used on `page.content()` snapshots and
+    on pages fetched without a browser.
+
+    Args:
+        html (str): The HTML of the page.
+        schema (Optional[List[Field]]): The fields to scrape. Default is G2_COMPANY_SCHEMA.
+
+    Returns:
+        dict: The value of every field, None (or an empty list) for the ones that weren't found.
+    """
+    tree = LexborHTMLParser(html)
+    data = {}
+    for field in schema or G2_COMPANY_SCHEMA:
+        if field.many:
+            data[field.name] = [_read(node, field.extract) for node in tree.css(field.selector)]
+        else:
+            node = tree.css_first(field.selector)
+            data[field.name] = _read(node, field.extract) if node is not None else None
+    return data
@@ -0,0 +1,110 @@
+import logging
+import time
+from typing import Iterable, List, Optional, Tuple
+import httpx
+from selectolax.lexbor import LexborHTMLParser
+from extraction import Field, extract_from_html
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class HttpFetcher:
+    """
+    Fast path of the G2 crawl: pages are fetched with a pooled HTTP/2 client and parsed directly, without a browser.
+    When the response is a challenge, an error page or lacks the required fields, `fetch` returns None and the
+    caller falls back to the browser. The outcome of every fetch is counted, so the share of pages served without
+    a browser and the time spent on each path can be reported.
+
+    Args:
+        schema (Optional[List[Field]]): The fields scraped from every company.
+        required (Iterable[str]): Fields that must be found for the page to be accepted.
+        timeout (float): Seconds to wait for a response.
+        max_connections (int): Size of the connection pool.
+    """
+
+    HEADERS = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/114.0",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+    }
+    CHALLENGE_SELECTORS = "h2#challenge-running, div.cf-error-title"
+
+    def __init__(self, schema: Optional[List[Field]] = None, required: Iterable[str] = ("description",),
+                 timeout: float = 15.0, max_connections: int = 10):
+        """
+        Initialize the HttpFetcher.
+
+        Args:
+            schema (Optional[List[Field]]): The fields scraped from every company. Default is G2_COMPANY_SCHEMA.
+            required (Iterable[str]): Fields that must be found for the page to be accepted. Default is the
+            description.
+            timeout (float): Seconds to wait for a response. Default is 15.
+            max_connections (int): Size of the connection pool. Default is 10.
+        """
+        self.schema = schema
+        self.required = tuple(required)
+        self.client = httpx.Client(
+            http2=True, headers=self.HEADERS, timeout=timeout, follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self.stats = {"http": 0, "fallback": 0, "fallback_reasons": {}, "http_ms": 0.0, "browser_ms": 0.0}
+
+    def _check(self, response: httpx.Response) -> Tuple[Optional[dict], Optional[str]]:
+        if response.status_code != 200:
+            return None, f"status {response.status_code}"
+        html = response.text
+        if LexborHTMLParser(html).css_first(self.CHALLENGE_SELECTORS) is not None:
+            return None, "challenge"
+        data = extract_from_html(html, self.schema)
+        if any(data.get(name) in (None, "") for name in self.required):
+            return None, "missing data"
+        return data, None
+
+    def fetch(self, url: str) -> Optional[dict]:
+        """
+        Fetch and scrape a company page without a browser.
+
+        Args:
+            url (str): The URL of the company.
+
+        Returns:
+            Optional[dict]: The scraped data, or None if the page must be loaded in the browser.
+        """
+        started = time.perf_counter()
+        try:
+            data, reason = self._check(self.client.get(url))
+        except httpx.HTTPError as error:
+            data, reason = None, type(error).__name__
+        self.stats["http_ms"] += (time.perf_counter() - started) * 1000
+        if data is None:
+            logger.info("Falling back to the browser for %s: %s", url, reason)
+            self.stats["fallback"] += 1
+            self.stats["fallback_reasons"][reason] = self.stats["fallback_reasons"].get(reason, 0) + 1
+        else:
+            self.stats["http"] += 1
+        return data
+
+    def record_browser_time(self, elapsed_ms: float):
+        """
+        Account the time the browser spent on a page that couldn't be fetched over HTTP.
+        """
+        self.stats["browser_ms"] += elapsed_ms
+
+    def report(self) -> dict:
+        """
+        Returns:
+            dict: The fetch counts, the share of pages served over HTTP and the average time of every path.
+        """
+        total = self.stats["http"] + self.stats["fallback"]
+        return {
+            **self.stats,
+            "http_share": self.stats["http"] / total if total else 0.0,
+            "avg_http_ms": self.stats["http_ms"] / total if total else 0.0,
+            "avg_browser_ms": self.stats["browser_ms"] / self.stats["fallback"] if self.stats["fallback"] else 0.0,
+        }
+
+    def close(self):
+        self.client.close()
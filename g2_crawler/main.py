@@ -1,10 +1,174 @@
+import asyncio
+import csv
+import logging
+import os
+import socket
+import time
+from functools import partial
+from typing import TYPE_CHECKING
+from async_crawler import AsyncG2CompranyCrawl
+from checkpoint import CrawlCheckpoint, JsonlSink
 from crawler_g2company import G2CompranyCrawl
+from http_fetcher import HttpFetcher
+from resource_filter import ResourceFilter
 
+if TYPE_CHECKING:
+    from work_queue import WorkQueue
+
+
+logger = logging.getLogger(__name__)
 
 CSV_FILE = 'companies.csv'
 
 
+def read_companies(csv_file: str):
+    """
+    Returns:
+        list: The row and the URL of every company of the CSV file.
+    """
+    with open(csv_file) as file:
+        return [(row, company_url) for row, (company_url,) in enumerate(csv.reader(file))]
+
+
+async def collect(crawler: AsyncG2CompranyCrawl, rows: list, on_result):
+    async for result in crawler.extract_data(rows):
+        on_result(result)
+
+
+def concurrent_crawl_round(crawler: AsyncG2CompranyCrawl, rows: list, on_result):
+    """
+    Crawl a round of companies with the concurrent crawler. Every round runs in its own event loop, while the
+    crawler and its rate limiter are shared by all the rounds, so the pacing of every domain carries over.
+    """
+    asyncio.run(collect(crawler, rows, on_result))
+
+
+def resumable_crawl(crawl_round, companies: list, checkpoint: CrawlCheckpoint, sink: JsonlSink):
+    """
+    Crawl the companies that the checkpoint doesn't have as finished, until every one of them succeeded or ran out
+    of attempts. Results are written to the sink as they arrive, so an interrupted run can be resumed.
+
+    Args:
+        crawl_round (Callable): Crawls a list of (row, url) and calls its second argument with every result.
+        companies (list): The row and the URL of every company.
+        checkpoint (CrawlCheckpoint): The checkpoint of the crawl.
+        sink (JsonlSink): Where results are written.
+    """
+    def on_result(result: dict):
+        if result["error"] is None:
+            sink.write(result)
+            checkpoint.succeeded(result["url"])
+        elif not checkpoint.failed(result["url"], result["error"]):
+            sink.write(result)
+        print(result)
+
+    while True:
+        due, next_retry = checkpoint.due(companies)
+        if due:
+            logger.info("%d companies to crawl, checkpoint: %s", len(due), checkpoint.stats())
+            crawl_round(due, on_result)
+        elif next_retry is not None:
+            wait = max(0.0, next_retry - time.time())
+            logger.info("Waiting %.0f seconds for the next retry.", wait)
+            time.sleep(wait)
+        else:
+            break
+    logger.info("Crawl finished, checkpoint: %s", checkpoint.stats())
+
+
+def queue_crawl(crawler: G2CompranyCrawl, work_queue: "WorkQueue", worker: str, visibility_timeout: float,
+                sink: JsonlSink):
+    """
+    Crawl the companies leased from a queue shared with other workers until it's drained. A company is
+    acknowledged once its result is written to the sink, and given back to the queue to be retried if it failed.
+    The `row` of every result is the id of its item in the queue. Leases are renewed while the companies wait in
+    the crawler, so `visibility_timeout` only bounds how long the companies of a crashed worker stay hidden.
+
+    Args:
+        crawler (G2CompranyCrawl): The crawler.
+        work_queue (WorkQueue): The queue of company URLs.
+        worker (str): Identifies this worker.
+        visibility_timeout (float): Seconds a company is hidden from the other workers while it's crawled.
+        sink (JsonlSink): Where results are written.
+    """
+    # Imported here, so the crawler runs without the shared work_queue package outside of worker mode.
+    from work_queue import LeaseKeeper, iter_leases
+
+    lease_keeper = LeaseKeeper(work_queue, visibility_timeout)
+
+    def leased_companies():
+        for lease in iter_leases(work_queue, worker, visibility_timeout):
+            lease_keeper.hold(lease)
+            yield lease.id, lease.payload
+
+    with lease_keeper:
+        for result in crawler.crawl(leased_companies()):
+            lease = lease_keeper.release(result["row"])
+            if result["error"] is None:
+                sink.write(result)
+                work_queue.ack(lease)
+            elif not work_queue.nack(lease, result["error"]):
+                sink.write(result)
+            print(result)
+
+
 if __name__ == '__main__':
-    crawler = G2CompranyCrawl(CSV_FILE)
-    for data in crawler.extract_data():
-        print(data)
+    CONCURRENCY = int(os.getenv("CONCURRENCY", default="1"))
+    RATE_LIMIT = float(os.getenv("RATE_LIMIT", default="0.25"))
+    OUTPUT_FOLDER = os.getenv("OUTPUT_FOLDER", default="output")
+    MAX_ATTEMPTS = int(os.getenv("MAX_ATTEMPTS", default="3"))
+    RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", default="30"))
+    POOL_SIZE = int(os.getenv("POOL_SIZE", default="2"))
+    PROXIES = [proxy for proxy in os.getenv("PROXIES", default="").split(",") if proxy]
+    HTTP_FIRST = os.getenv("HTTP_FIRST", default="1") == "1"
+    BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", default="1") == "1"
+    BLOCKED_TYPES = os.getenv("BLOCKED_RESOURCE_TYPES", default=",".join(ResourceFilter.BLOCKED_TYPES))
+    ALLOWED_DOMAINS = os.getenv("ALLOWED_DOMAINS", default=",".join(ResourceFilter.ALLOWED_DOMAINS))
+    resource_filter = ResourceFilter(
+        [kind for kind in BLOCKED_TYPES.split(",") if kind], [domain for domain in ALLOWED_DOMAINS.split(",") if domain]
+    ) if BLOCK_RESOURCES else None
+    WORK_QUEUE = os.getenv("WORK_QUEUE", default="")
+    QUEUE_NAME = os.getenv("QUEUE_NAME", default="g2")
+    VISIBILITY_TIMEOUT = float(os.getenv("VISIBILITY_TIMEOUT", default="300"))
+    WORKER_ID = os.getenv("WORKER_ID", default=f"{socket.gethostname()}-{os.getpid()}")
+
+    if WORK_QUEUE and CONCURRENCY > 1:
+        # Workers crawl their leased companies one at a time; to crawl faster, start more workers.
+        raise ValueError("CONCURRENCY can't be combined with WORK_QUEUE, start CONCURRENCY workers instead")
+
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    if WORK_QUEUE:
+        # Worker mode: the queue replaces the checkpoint, and every worker writes its own results file.
+        from work_queue import open_queue
+
+        work_queue = open_queue(WORK_QUEUE, QUEUE_NAME, max_attempts=MAX_ATTEMPTS, backoff=RETRY_BACKOFF)
+        sink = JsonlSink(os.path.join(OUTPUT_FOLDER, f"results-{WORKER_ID}.jsonl"))
+    else:
+        checkpoint = CrawlCheckpoint(os.path.join(OUTPUT_FOLDER, "checkpoint.sqlite3"), MAX_ATTEMPTS, RETRY_BACKOFF)
+        sink = JsonlSink(os.path.join(OUTPUT_FOLDER, "results.jsonl"))
+
+    if CONCURRENCY > 1:
+        crawler = AsyncG2CompranyCrawl(CSV_FILE, concurrency=CONCURRENCY, rate=RATE_LIMIT,
+                                       resource_filter=resource_filter)
+        crawl_round = partial(concurrent_crawl_round, crawler)
+    else:
+        crawler = G2CompranyCrawl(CSV_FILE, pool_size=POOL_SIZE, proxies=PROXIES, resource_filter=resource_filter,
+                                  http_fetcher=HttpFetcher() if HTTP_FIRST else None)
+
+        def crawl_round(rows, on_result):
+            for result in crawler.crawl(rows):
+                on_result(result)
+
+    try:
+        if WORK_QUEUE:
+            queue_crawl(crawler, work_queue, WORKER_ID, VISIBILITY_TIMEOUT, sink)
+        else:
+            resumable_crawl(crawl_round, read_companies(CSV_FILE), checkpoint, sink)
+    finally:
+        if isinstance(crawler, G2CompranyCrawl) and crawler.http_fetcher:
+            logger.info("HTTP fast path: %s", crawler.http_fetcher.report())
+            crawler.http_fetcher.close()
+        if isinstance(crawler, G2CompranyCrawl) and crawler.pool:
+            logger.info("Browser contexts: %s", crawler.pool.metrics())
+        sink.close()
+        (work_queue if WORK_QUEUE else checkpoint).close()
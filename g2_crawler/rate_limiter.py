@@ -0,0 +1,90 @@
+import asyncio
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """
+    Asynchronous token bucket. Tokens are refilled at `rate` per second up to `capacity`, and every request takes
+    one, so bursts of up to `capacity` requests are allowed while the average rate stays at `rate`.
+    The bucket can be shared by successive event loops (one `asyncio.run` per crawl round): its lock belongs to the
+    loop it was last used in and is replaced when a different loop acquires it.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (int): Maximum amount of tokens in the bucket.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        """
+        Initialize the TokenBucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (int): Maximum amount of tokens in the bucket. Default is 1.
+        """
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = None
+        self._loop = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _loop_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    async def acquire(self):
+        """
+        Wait until a token is available and take it. Waiters are served in arrival order.
+        """
+        async with self._loop_lock():
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class DomainRateLimiter:
+    """
+    A token bucket per domain, so every site is crawled at its own pace.
+
+    Args:
+        rate (float): Requests per second allowed for every domain.
+        capacity (int): Burst of requests allowed for every domain.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        """
+        Initialize the DomainRateLimiter.
+
+        Args:
+            rate (float): Requests per second allowed for every domain.
+            capacity (int): Burst of requests allowed for every domain. Default is 1.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets = {}
+
+    async def acquire(self, url: str):
+        """
+        Wait until a request to the domain of the URL is allowed.
+
+        Args:
+            url (str): The URL about to be requested.
+        """
+        domain = urlparse(url).netloc
+        if domain not in self._buckets:
+            self._buckets[domain] = TokenBucket(self.rate, self.capacity)
+        await self._buckets[domain].acquire()
@@ -0,0 +1,123 @@
+import logging
+import time
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+from playwright.sync_api import Error, Request, Route
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == domain or host.endswith(f".{domain}") for domain in domains)
+
+
+class PageLoadMetrics:
+    """
+    Requests, blocked requests, bytes and load time of the last page loaded in a browser context.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.blocked = 0
+        self.bytes = 0
+
+    def on_request_finished(self, request: Request):
+        self.requests += 1
+        try:
+            sizes = request.sizes()
+            self.bytes += sizes["responseHeadersSize"] + max(sizes["responseBodySize"], 0)
+        except Error:
+            logger.debug("No sizes for %s", request.url)
+
+    def report(self) -> dict:
+        """
+        Returns:
+            dict: The requests, blocked requests, bytes transferred and load time in milliseconds.
+        """
+        return {
+            "requests": self.requests, "blocked": self.blocked, "bytes": self.bytes,
+            "load_ms": (time.perf_counter() - self.started) * 1000,
+        }
+
+
+class ResourceFilter:
+    """
+    Request interception for the G2 pages. Only three selectors are read from a product page, so images, fonts,
+    stylesheets, media and every third-party request (analytics, ads, widgets) are aborted. Requests to the
+    challenge domains are never blocked, so the captcha keeps working.
+
+    Args:
+        blocked_types (Optional[Iterable[str]]): Playwright resource types to abort.
+        allowed_domains (Optional[Iterable[str]]): First-party domains, requests to any other domain are aborted.
+        challenge_domains (Optional[Iterable[str]]): Domains whose requests are always allowed.
+    """
+
+    BLOCKED_TYPES = ("image", "media", "font", "stylesheet")
+    ALLOWED_DOMAINS = ("g2.com",)
+    CHALLENGE_DOMAINS = ("cloudflare.com",)
+
+    def __init__(self, blocked_types: Optional[Iterable[str]] = None, allowed_domains: Optional[Iterable[str]] = None,
+                 challenge_domains: Optional[Iterable[str]] = None):
+        """
+        Initialize the ResourceFilter.
+
+        Args:
+            blocked_types (Optional[Iterable[str]]): Playwright resource types to abort. Default is BLOCKED_TYPES.
+            allowed_domains (Optional[Iterable[str]]): First-party domains, requests to any other domain are
+            aborted. Default is ALLOWED_DOMAINS.
+            challenge_domains (Optional[Iterable[str]]): Domains whose requests are always allowed. Default is
+            CHALLENGE_DOMAINS.
+        """
+        self.blocked_types = set(self.BLOCKED_TYPES if blocked_types is None else blocked_types)
+        self.allowed_domains = tuple(self.ALLOWED_DOMAINS if allowed_domains is None else allowed_domains)
+        self.challenge_domains = tuple(self.CHALLENGE_DOMAINS if challenge_domains is None else challenge_domains)
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        """
+        Decide whether a request is aborted.
+
+        Args:
+            url (str): The URL of the request.
+            resource_type (str): The Playwright resource type of the request.
+
+        Returns:
+            bool: Whether the request must be aborted.
+        """
+        host = urlparse(url).hostname or ""
+        if _matches(host, self.challenge_domains) or urlparse(url).scheme in ("data", "blob"):
+            return False
+        if not _matches(host, self.allowed_domains):
+            return True
+        return resource_type in self.blocked_types
+
+    def attach(self, context, metrics: PageLoadMetrics):
+        """
+        Intercept the requests of a browser context, counting the aborted ones in the metrics.
+        """
+        def handle(route: Route):
+            if self.should_block(route.request.url, route.request.resource_type):
+                metrics.blocked += 1
+                route.abort()
+            else:
+                route.fallback()
+
+        context.route("**/*", handle)
+
+    def attach_async(self, context):
+        """
+        Intercept the requests of a browser context of Playwright's async API.
+        """
+        async def handle(route):
+            if self.should_block(route.request.url, route.request.resource_type):
+                await route.abort()
+            else:
+                await route.fallback()
+
+        return context.route("**/*", handle)
@@ -0,0 +1,56 @@
+import importlib.util
+import os
+import sys
+import pytest
+
+# The crawler modules import each other by their flat names, as when they are run from this folder, and the
+# shared work_queue package from the root of the repository.
+CRAWLER_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [CRAWLER_DIRECTORY, os.path.dirname(CRAWLER_DIRECTORY)]
+
+
+def pytest_pycollect_makemodule(module_path, parent):
+    """
+    Import the modules of this crawler, and not the ones with the same names of the other projects of the
+    repository, e.g. rate_limiter, when the tests of several projects run together.
+    """
+    sys.path.remove(CRAWLER_DIRECTORY)
+    sys.path.insert(0, CRAWLER_DIRECTORY)
+    for file_name in os.listdir(CRAWLER_DIRECTORY):
+        module = sys.modules.get(os.path.splitext(file_name)[0])
+        if module is not None and os.path.dirname(getattr(module, "__file__", None) or "") != CRAWLER_DIRECTORY:
+            del sys.modules[module.__name__]
+
+
+@pytest.fixture(scope="session")
+def g2_main():
+    """
+    The main module of the crawler, loaded from its path, since the other projects of the repository have a main
+    module too.
+    """
+    spec = importlib.util.spec_from_file_location("g2_main", os.path.join(CRAWLER_DIRECTORY, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def browser():
+    """
+    A headless Chromium, the tests using it are skipped where Playwright's browsers aren't installed.
+    """
+    sync_api = pytest.importorskip("playwright.sync_api")
+    with sync_api.sync_playwright() as playwright:
+        try:
+            browser = playwright.chromium.launch()
+        except sync_api.Error as error:
+            pytest.skip(f"Chromium is not available: {error.message.splitlines()[0]}")
+        yield browser
+        browser.close()
+
+
+@pytest.fixture
+def page(browser):
+    page = browser.new_page()
+    yield page
+    page.close()
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+import async_crawler
+from async_crawler import AsyncG2CompranyCrawl
+
+
+class FakeBrowser:
+    async def close(self):
+        pass
+
+
+class FakePlaywright:
+    """
+    Stands in for async_playwright(), the pages of the crawler are faked too.
+    """
+
+    def __init__(self):
+        self.chromium = self
+
+    async def launch(self):
+        return FakeBrowser()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+def make_crawler(monkeypatch) -> AsyncG2CompranyCrawl:
+    monkeypatch.setattr(async_crawler, "async_playwright", FakePlaywright)
+    crawler = AsyncG2CompranyCrawl(None, concurrency=2, rate=1000)
+
+    async def new_page(browser, playwright):
+        return None
+
+    async def goto(page, url):
+        await crawler.rate_limiter.acquire(url)
+
+    async def get_company_data(page):
+        return {"title": "company"}
+
+    crawler._new_page, crawler._goto, crawler.get_company_data = new_page, goto, get_company_data
+    return crawler
+
+
+async def collect(crawler, rows) -> list:
+    return [result async for result in crawler.extract_data(rows)]
+
+
+def test_every_company_is_crawled(monkeypatch):
+    crawler = make_crawler(monkeypatch)
+    rows = [(row, f"https://www.g2.com/products/{row}") for row in range(5)]
+
+    results = asyncio.run(asyncio.wait_for(collect(crawler, rows), timeout=5))
+
+    assert sorted(result["row"] for result in results) == list(range(5))
+    assert all(result["data"] == {"title": "company"} for result in results)
+
+
+def test_an_error_reading_the_rows_is_raised_instead_of_hanging(monkeypatch):
+    crawler = make_crawler(monkeypatch)
+    results = []
+
+    def rows():
+        yield 0, "https://www.g2.com/products/a"
+        yield 1, "https://www.g2.com/products/b"
+        raise ValueError("malformed row")
+
+    async def crawl():
+        async for result in crawler.extract_data(rows()):
+            results.append(result)
+
+    with pytest.raises(ValueError, match="malformed row"):
+        asyncio.run(asyncio.wait_for(crawl(), timeout=5))
+    assert sorted(result["row"] for result in results) == [0, 1]
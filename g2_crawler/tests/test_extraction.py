@@ -0,0 +1,171 @@
+import asyncio
+import os
+import httpx
+import pytest
+from extraction import (G2_COMPANY_SCHEMA, Field, extract_from_async_page, extract_from_html, extract_from_page,
+                        normalize_text)
+from http_fetcher import HttpFetcher
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SLACK_DESCRIPTION = (
+    "Slack is where work flows. It's where the people you need, the information you share, and the tools you use "
+    "come together to get things done. Learn more about Slack."
+)
+# The innerText of the description of product_paragraphs.html, as the browser lays it out.
+NORTHWIND_INNER_TEXT = (
+    "Northwind CRM keeps every customer conversation in one place.\n\n"
+    "Sales teams use it to track deals, forecast revenue and automate follow-ups.\n\n"
+    "Pipeline views\nEmail sync\n\nAvailable on web\nand mobile."
+)
+
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class RecordingPage:
+    """
+    Stands in for a Playwright page, recording the scripts evaluated on it.
+    """
+
+    def __init__(self, result: dict):
+        self.result = result
+        self.calls = []
+
+    def evaluate(self, script: str, argument):
+        self.calls.append((script, argument))
+        return self.result
+
+
+class AsyncRecordingPage(RecordingPage):
+
+    async def evaluate(self, script: str, argument):
+        return super().evaluate(script, argument)
+
+
+def test_extract_from_html_reads_the_company_schema():
+    data = extract_from_html(read_fixture("product.html"))
+
+    assert data["title"] == "Slack"
+    assert data["description"] == SLACK_DESCRIPTION
+    assert data["logo_url"] == "https://images.g2crowd.com/uploads/product/image/large_detail/slack.png"
+
+
+def test_block_elements_are_read_on_their_own_lines():
+    data = extract_from_html(read_fixture("product_paragraphs.html"))
+
+    assert data["description"] == (
+        "Northwind CRM keeps every customer conversation in one place.\n"
+        "Sales teams use it to track deals, forecast revenue and automate follow-ups.\n"
+        "Pipeline views\nEmail sync\nAvailable on web\nand mobile."
+    )
+
+
+def test_html_and_browser_paths_agree_on_the_description():
+    html = read_fixture("product_paragraphs.html")
+    page = RecordingPage({"title": "Northwind CRM", "description": NORTHWIND_INNER_TEXT,
+                          "logo_url": "https://images.g2crowd.com/uploads/product/image/large_detail/northwind.png"})
+
+    assert extract_from_page(page) == extract_from_html(html)
+
+
+def test_normalize_text():
+    assert normalize_text("  Line   one. \n\n\t Line two \n") == "Line one.\nLine two"
+    assert normalize_text(None) is None
+
+
+def test_missing_fields_are_none_and_html_fields_keep_their_markup():
+    data = extract_from_html(read_fixture("product_without_logo.html"))
+
+    assert data == {
+        "title": 'Acme <span class="c-midnight-80">Analytics</span>',
+        "description": "Dashboards and reports for small teams.",
+        "logo_url": None,
+    }
+
+
+@pytest.mark.parametrize("fixture", ["challenge.html", "access_denied.html"])
+def test_blocked_pages_have_no_fields(fixture):
+    assert extract_from_html(read_fixture(fixture)) == {"title": None, "description": None, "logo_url": None}
+
+
+def test_custom_schema_reads_attributes_and_lists():
+    schema = [
+        Field("stylesheets", "link[rel=stylesheet]", "attr:href", many=True),
+        Field("heading", "h2.l4"),
+        Field("logo_alt", "img.detail-logo", "attr:alt"),
+        Field("reviews", "div.review", many=True),
+    ]
+
+    assert extract_from_html(read_fixture("product.html"), schema) == {
+        "stylesheets": ["https://assets.g2crowd.com/assets/application.css"],
+        "heading": "What is Slack?",
+        "logo_alt": "Slack",
+        "reviews": [],
+    }
+
+
+def test_the_whole_schema_is_read_in_one_evaluate():
+    page = RecordingPage({"title": "Slack"})
+
+    assert extract_from_page(page) == {"title": "Slack"}
+    assert len(page.calls) == 1
+    assert page.calls[0][1] == [[field.name, field.selector, field.extract, field.many] for field in G2_COMPANY_SCHEMA]
+
+
+def test_async_pages_are_read_in_one_evaluate():
+    page = AsyncRecordingPage({"heading": "What is Slack?"})
+
+    assert asyncio.run(extract_from_async_page(page, [Field("heading", "h2.l4")])) == {"heading": "What is Slack?"}
+    assert [argument for _, argument in page.calls] == [[["heading", "h2.l4", "text", False]]]
+
+
+def test_extract_script_reads_the_schema_in_the_browser(page):
+    page.set_content(read_fixture("product.html"))
+    data = extract_from_page(page)
+
+    assert data["title"] == "Slack"
+    assert data["description"] == SLACK_DESCRIPTION
+    assert data["logo_url"] == "https://images.g2crowd.com/uploads/product/image/large_detail/slack.png"
+
+
+@pytest.mark.parametrize("fixture", ["product.html", "product_paragraphs.html", "product_without_logo.html"])
+def test_browser_and_html_parity(page, fixture):
+    html = read_fixture(fixture)
+    page.set_content(html)
+
+    assert extract_from_page(page) == extract_from_html(html)
+
+
+@pytest.mark.parametrize("fixture, status, reason", [
+    ("product.html", 200, None),
+    ("product.html", 503, "status 503"),
+    ("challenge.html", 200, "challenge"),
+    ("access_denied.html", 403, "status 403"),
+    ("access_denied.html", 200, "challenge"),
+])
+def test_http_fetcher_falls_back_on_blocked_pages(fixture, status, reason):
+    fetcher = HttpFetcher()
+    fetcher.client = httpx.Client(transport=httpx.MockTransport(
+        lambda request: httpx.Response(status, text=read_fixture(fixture))
+    ))
+
+    data = fetcher.fetch("https://www.g2.com/products/slack/reviews")
+
+    if reason is None:
+        assert data["title"] == "Slack"
+        assert fetcher.report()["http_share"] == 1.0
+    else:
+        assert data is None
+        assert fetcher.stats["fallback_reasons"] == {reason: 1}
+
+
+def test_http_fetcher_requires_the_description():
+    fetcher = HttpFetcher()
+    html = read_fixture("product_without_logo.html").replace('itemprop="description"', 'class="summary"')
+    fetcher.client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=html)))
+
+    assert fetcher.fetch("https://www.g2.com/products/acme-analytics/reviews") is None
+    assert fetcher.stats["fallback_reasons"] == {"missing data": 1}
@@ -0,0 +1,57 @@
+import json
+import time
+from checkpoint import JsonlSink
+from work_queue import SQLiteWorkQueue
+
+
+class FakeCrawler:
+    """
+    Stands in for G2CompranyCrawl, taking `delay` seconds per company and calling `during_crawl` with its URL.
+    The URLs in `failing` fail every time.
+    """
+
+    def __init__(self, delay: float = 0.0, failing=(), during_crawl=None):
+        self.delay = delay
+        self.failing = set(failing)
+        self.during_crawl = during_crawl
+
+    def crawl(self, companies):
+        for row, url in companies:
+            time.sleep(self.delay)
+            if self.during_crawl:
+                self.during_crawl(url)
+            error = "TimeoutError()" if url in self.failing else None
+            yield {"row": row, "url": url, "data": None if error else {"title": url}, "error": error}
+
+
+def test_results_are_written_and_failed_companies_given_back(tmp_path, g2_main):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"), "g2", max_attempts=1)
+    urls = [f"https://www.g2.com/products/{index}" for index in range(3)]
+    queue.enqueue(urls)
+    sink = JsonlSink(str(tmp_path / "results.jsonl"))
+
+    g2_main.queue_crawl(FakeCrawler(failing={urls[2]}), queue, "worker-1", 30, sink)
+    sink.close()
+
+    with open(tmp_path / "results.jsonl") as f:
+        results = [json.loads(line) for line in f]
+    assert [(result["url"], result["error"]) for result in results] == \
+        [(urls[0], None), (urls[1], None), (urls[2], "TimeoutError()")]
+    assert queue.stats() == {SQLiteWorkQueue.DONE: 2, SQLiteWorkQueue.DEAD: 1}
+
+
+def test_leases_are_renewed_while_a_company_is_crawled(tmp_path, g2_main):
+    path = str(tmp_path / "queue.sqlite3")
+    queue = SQLiteWorkQueue(path, "g2")
+    queue.enqueue(["https://www.g2.com/products/slow"])
+    other_worker = SQLiteWorkQueue(path, "g2")
+    stolen = []
+    sink = JsonlSink(str(tmp_path / "results.jsonl"))
+
+    # The company takes longer than the visibility timeout, only the renewals keep it from the other worker.
+    crawler = FakeCrawler(delay=0.5, during_crawl=lambda url: stolen.append(other_worker.lease("worker-2", 30)))
+    g2_main.queue_crawl(crawler, queue, "worker-1", 0.3, sink)
+    sink.close()
+
+    assert stolen == [None]
+    assert queue.stats() == {SQLiteWorkQueue.DONE: 1}
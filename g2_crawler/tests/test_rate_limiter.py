@@ -0,0 +1,37 @@
+import asyncio
+import time
+from rate_limiter import DomainRateLimiter, TokenBucket
+
+
+def test_bucket_allows_a_burst_then_paces_requests():
+    bucket = TokenBucket(rate=20, capacity=2)
+
+    async def take(count):
+        started = time.monotonic()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # Two tokens are available right away, the other two are refilled at 20 per second.
+    assert 0.08 <= asyncio.run(take(4)) < 0.5
+
+
+def test_limiter_is_reusable_across_event_loops():
+    limiter = DomainRateLimiter(rate=100, capacity=1)
+
+    async def crawl():
+        await asyncio.gather(*(limiter.acquire(f"https://www.g2.com/products/{page}") for page in range(3)))
+
+    asyncio.run(crawl())
+    asyncio.run(crawl())
+
+
+def test_limiter_paces_every_domain_on_its_own():
+    limiter = DomainRateLimiter(rate=1, capacity=1)
+
+    async def crawl():
+        started = time.monotonic()
+        await asyncio.gather(limiter.acquire("https://www.g2.com/a"), limiter.acquire("https://example.com/a"))
+        return time.monotonic() - started
+
+    assert asyncio.run(crawl()) < 0.5
@@ -0,0 +1,69 @@
+import asyncio
+import json
+from async_crawler import AsyncG2CompranyCrawl
+from checkpoint import CrawlCheckpoint, JsonlSink
+
+
+COMPANIES = [(0, "https://www.g2.com/products/a"), (1, "https://www.g2.com/products/b"),
+             (2, "https://www.g2.com/products/c")]
+
+
+def make_crawler(failures: dict) -> AsyncG2CompranyCrawl:
+    """
+    A concurrent crawler whose pages are faked, while its rate limiter is the real one. The URLs in `failures`
+    fail as many times as their count.
+    """
+    crawler = AsyncG2CompranyCrawl(None, concurrency=3, rate=200)
+
+    async def crawl(row, url):
+        await crawler.rate_limiter.acquire(url)
+        if failures.get(url):
+            failures[url] -= 1
+            return {"row": row, "url": url, "data": None, "error": "TimeoutError()"}
+        return {"row": row, "url": url, "data": {"title": url.rsplit("/", 1)[1]}, "error": None}
+
+    async def extract_data(rows):
+        for result in await asyncio.gather(*(crawl(row, url) for row, url in rows)):
+            yield result
+
+    crawler.extract_data = extract_data
+    return crawler
+
+
+def read_results(path) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_failed_companies_are_retried_in_a_new_round(tmp_path, g2_main):
+    crawler = make_crawler({COMPANIES[1][1]: 1, COMPANIES[2][1]: 1})
+    checkpoint = CrawlCheckpoint(str(tmp_path / "checkpoint.sqlite3"), max_attempts=3, backoff=0)
+    sink = JsonlSink(str(tmp_path / "results.jsonl"))
+    rounds = []
+
+    def crawl_round(rows, on_result):
+        rounds.append([url for _, url in rows])
+        g2_main.concurrent_crawl_round(crawler, rows, on_result)
+
+    g2_main.resumable_crawl(crawl_round, COMPANIES, checkpoint, sink)
+    sink.close()
+
+    # Both retries wait on the same domain bucket, in the event loop of the second round.
+    assert rounds == [[url for _, url in COMPANIES], [COMPANIES[1][1], COMPANIES[2][1]]]
+    results = read_results(tmp_path / "results.jsonl")
+    assert sorted(result["row"] for result in results) == [0, 1, 2]
+    assert all(result["error"] is None for result in results)
+    assert checkpoint.stats() == {CrawlCheckpoint.DONE: 3}
+
+
+def test_companies_out_of_attempts_are_written_with_their_error(tmp_path, g2_main):
+    crawler = make_crawler({COMPANIES[2][1]: 5})
+    checkpoint = CrawlCheckpoint(str(tmp_path / "checkpoint.sqlite3"), max_attempts=2, backoff=0)
+    sink = JsonlSink(str(tmp_path / "results.jsonl"))
+
+    g2_main.resumable_crawl(lambda rows, on_result: g2_main.concurrent_crawl_round(crawler, rows, on_result),
+                            COMPANIES, checkpoint, sink)
+    sink.close()
+
+    failed = [result for result in read_results(tmp_path / "results.jsonl") if result["error"]]
+    assert [(result["row"], result["error"]) for result in failed] == [(2, "TimeoutError()")]
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, List, Optional, TypeVar
+from playwright.async_api import Page, async_playwright
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BrowserSession:
+    """
+    A long-lived Chromium with one authenticated context, shared by every lookup. The browser runs on an asyncio
+    loop in a background thread and owns a small pool of pages, so lookups submitted from any thread run
+    concurrently, up to one per page, without paying the browser startup nor injecting the cookies again.
+
+    Args:
+        cookies (List[dict]): The cookies of the logged-in user, in the Playwright format.
+        pages (int): Amount of pages, the maximum of concurrent lookups.
+        headless (bool): Whether the browser is headless.
+
+    Usage Example:
+        with BrowserSession(cookies, pages=4) as browser:
+            title = browser.run(lambda page: read_title(page, url))
+    """
+
+    def __init__(self, cookies: List[dict], pages: int = 2, headless: bool = True):
+        """
+        Initialize the BrowserSession. The browser is launched by `start`.
+
+        Args:
+            cookies (List[dict]): The cookies of the logged-in user, in the Playwright format.
+            pages (int): Amount of pages, the maximum of concurrent lookups. Default is 2.
+            headless (bool): Whether the browser is headless. Default is True.
+        """
+        self.cookies = cookies
+        self.pages = max(1, pages)
+        self.headless = headless
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def start(self) -> "BrowserSession":
+        """
+        Launch the browser and open the pages, unless they are already open.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="browser-session", daemon=True)
+            self._thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+            except Exception:
+                self._shutdown()
+                raise
+        return self
+
+    async def _start(self):
+        logger.info("Launching the browser with %d pages.", self.pages)
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        self._context = await self._browser.new_context()
+        await self._context.add_cookies(self.cookies)
+        self._pool = asyncio.Queue()
+        for _ in range(self.pages):
+            self._pool.put_nowait(await self._context.new_page())
+
+    def set_cookies(self, cookies: List[dict]):
+        """
+        Replace the cookies of the context, e.g. to go on with another account, without restarting the browser.
+        Lookups already running finish with the old cookies.
+
+        Args:
+            cookies (List[dict]): The new cookies, in the Playwright format.
+        """
+        with self._lock:
+            self.cookies = cookies
+            if self._thread is not None:
+                asyncio.run_coroutine_threadsafe(self._set_cookies(cookies), self._loop).result()
+
+    async def _set_cookies(self, cookies: List[dict]):
+        await self._context.clear_cookies()
+        await self._context.add_cookies(cookies)
+
+    async def _with_page(self, function: Callable[[Page], Awaitable[T]]) -> T:
+        page = await self._pool.get()
+        try:
+            return await function(page)
+        except Exception:
+            # The page may be left in a broken state, so it is replaced.
+            try:
+                await page.close()
+            except Exception:
+                logger.debug("The page was already closed.")
+            page = await self._context.new_page()
+            raise
+        finally:
+            self._pool.put_nowait(page)
+
+    def submit(self, function: Callable[[Page], Awaitable[T]]) -> Future:
+        """
+        Run a lookup on the first free page.
+
+        Args:
+            function (Callable[[Page], Awaitable[T]]): Coroutine function receiving the page.
+
+        Returns:
+            Future: The future of the result of the function.
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._with_page(function), self._loop)
+
+    def run(self, function: Callable[[Page], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """
+        Run a lookup on the first free page and wait for its result.
+        """
+        return self.submit(function).result(timeout)
+
+    async def _stop(self):
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+    def close(self):
+        """
+        Close the browser and stop its thread.
+        """
+        with self._lock:
+            if self._thread is not None:
+                self._shutdown()
+
+    def _shutdown(self):
+        try:
+            asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result()
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._thread = self._loop = self._browser = self._playwright = self._context = self._pool = None
+        logger.info("Browser closed.")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
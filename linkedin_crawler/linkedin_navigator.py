@@ -2,10 +2,15 @@ import re
 import logging
 import json
 import requests
+import threading
+from collections import Counter
+from concurrent.futures import Future
 from bs4 import BeautifulSoup
-from functools import cached_property
+from browser_session import BrowserSession
 from login_helper import LogedSessionCreator
-from playwright.sync_api import sync_playwright
+from lookup_cache import canonical_company_url
+from rate_limiter import ThrottledError
+from session_pool import SessionExpiredError, SessionPool
 from urllib.parse import urlparse
 
 
@@ -19,12 +24,21 @@ class LinkedInNavigator:
     """
     This function uses the search bar of LinkedIn to search for companies. It uses a logged-in user to retrieve
     companies that match the provided name.
+
+    Employee counts are read from the JSON embedded in the search results or in the company page, fetched with the
+    logged-in session. Only when it isn't there, they are read with a single browser, launched on the first lookup
+    and shared by every lookup through a pool of `browser_pages` pages, so `close` it (or use the navigator as a
+    context manager) when done.
+
+    Requests are spread across the accounts of a SessionPool, each one with its own rate budget. The browser uses
+    the cookies of one account at a time, and goes on with another one when it's throttled or logged out.
     """
 
     SEARCH_URL = "https://www.linkedin.com/search/results/COMPANIES/"
     _EMPLOYEES_SELECTOR = ".t-normal.t-black--light.link-without-visited-state.link-without-hover-state"
 
-    def __init__(self, username=None, password=None, cookies=None):
+    def __init__(self, username=None, password=None, cookies=None, browser_pages=2, rate_limiter=None,
+                 max_retries=3, cache=None, session_pool=None):
         """
         Initialize the LinkedInNavigator object.
 
@@ -32,23 +46,54 @@ class LinkedInNavigator:
             username (str): Valid LinkedIn username.
             password (str): Username's password.
             cookies (dict): A dict of valid logged-in user CookiesJar.
+            browser_pages (int): Amount of employee counts that can be looked up concurrently.
+            rate_limiter (AdaptiveRateLimiter): Limiter of the account of the username or the cookies. Default is one
+            request per second.
+            max_retries (int): Times a throttled request is retried after the limiter cooldown.
+            cache (LookupCache): On-disk cache of searches and company lookups. Default is no cache.
+            session_pool (SessionPool): The accounts used to crawl, instead of the username or the cookies.
 
         Note:
-            These arguments are optional, but either cookies or a pair of username and password must be provided.
+            These arguments are optional, but either a session pool, cookies or a pair of username and password must
+            be provided.
         """
-        if (not cookies) and not (username and password):
+        if session_pool is None and (not cookies) and not (username and password):
             raise ValueError("Cookie or user and password are needed")
         self.username = username
         self.password = password
         self.cookies = cookies
+        self.browser_pages = browser_pages
+        if session_pool is None:
+            session_pool = SessionPool([{"username": username, "password": password, "cookies": cookies}])
+            if rate_limiter:
+                session_pool.sessions[0].limiter = rate_limiter
+        self.session_pool = session_pool
+        self.max_retries = max_retries
+        self.cache = cache
+        self._lookups = {}
+        self._known_facts = {}
+        self._lock = threading.RLock()
+        self._browser_session = None
+        self._browser_account = None
+        # The session whose cookies the browser has.
+        self._browser_cookies = None
+        self.stats = Counter()
 
-    @cached_property
+    @property
     def _loged_session(self):
         """
-        A cached property that logs in the user.
+        The session of the first account of the pool that could log in. It's thread safe, so every account logs in
+        once.
         """
+        return self.session_pool.primary().session
 
-        return LogedSessionCreator.log_in(self.username, self.password, self.cookies)
+    @property
+    def request_rate(self):
+        """
+        Returns:
+            float: The requests per second currently allowed across every account.
+        """
+        return sum(pooled.limiter.rate for pooled in self.session_pool.sessions if not pooled.disabled)
 
     def _is_company_data(self, raw_data, path=None):
         """
@@ -80,6 +125,133 @@ class LinkedInNavigator:
                 urls.add(included_data['navigationUrl'])
         return list(urls)
 
+    @staticmethod
+    def _is_throttled(session, response):
+        """
+        Check whether LinkedIn throttled a request, answering 429 or redirecting it to a checkpoint.
+        """
+        return response.status_code == 429 or not LogedSessionCreator.user_successfully_loged(session, response)
+
+    @staticmethod
+    def _is_logged_out(url):
+        """
+        Check whether LinkedIn logged the session out, redirecting the request to the authwall.
+        """
+        return "/authwall" in url
+
+    def _get(self, url, **kwargs):
+        """
+        Make a request with the account of the pool that can make it soonest. A throttled request cools its account
+        down and is retried, likely with another account. A request of a logged-out session logs its account in
+        again and is retried.
+
+        Returns:
+            requests.Response: The response.
+
+        Raises:
+            ThrottledError: If the request is still throttled after `max_retries` retries.
+        """
+        for _ in range(self.max_retries + 1):
+            pooled = self.session_pool.acquire()
+            session = pooled.session
+            response = session.get(url, **kwargs)
+            if self._is_logged_out(response.url):
+                self.stats["expired"] += 1
+                self.session_pool.expired(pooled, session)
+                continue
+            if not self._is_throttled(session, response):
+                self.session_pool.succeeded(pooled)
+                return response
+            self.stats["throttled"] += 1
+            self.session_pool.throttled(pooled)
+        raise ThrottledError(url)
+
+    @staticmethod
+    def _code_blobs(content):
+        """
+        Parse the JSON blobs that LinkedIn embeds in `<code>` elements of its pages.
+
+        Yields:
+            tuple: The raw text and the parsed JSON of every blob.
+        """
+        soup = BeautifulSoup(content, 'html.parser')
+        for c in soup.find_all("code"):
+            raw = c.get_text()
+            try:
+                yield raw, json.loads(raw)
+            except ValueError:
+                continue
+
+    @staticmethod
+    def _universal_name(company_url):
+        """
+        Returns:
+            str: The universal name of a company URL, e.g. "acme" for https://www.linkedin.com/company/acme/.
+        """
+        match = re.search(r"/company/([^/?#]+)", company_url)
+        return match.group(1).lower() if match else None
+
+    @staticmethod
+    def _walk(data):
+        if isinstance(data, dict):
+            yield data
+            for value in data.values():
+                yield from LinkedInNavigator._walk(value)
+        elif isinstance(data, list):
+            for value in data:
+                yield from LinkedInNavigator._walk(value)
+
+    def _find_company_facts(self, blobs, universal_name):
+        """
+        Look for the company entity of a universal name in parsed JSON blobs.
+
+        Args:
+            blobs (list): The parsed JSON blobs.
+            universal_name (str): The universal name of the company.
+
+        Returns:
+            dict: The name, URL, staff count and staff count range of the company, or None if it isn't there.
+        """
+        facts = {}
+        for entity in (entity for blob in blobs for entity in self._walk(blob)):
+            if str(entity.get("universalName", "")).lower() != universal_name:
+                continue
+            staff_count = entity.get("staffCount", entity.get("employeeCount"))
+            staff_count_range = entity.get("staffCountRange") or entity.get("employeeCountRange")
+            facts.setdefault("name", entity.get("name"))
+            facts.setdefault("url", entity.get("url"))
+            if staff_count is not None:
+                facts["staff_count"] = staff_count
+            if isinstance(staff_count_range, dict):
+                facts["staff_count_range"] = [staff_count_range.get("start"), staff_count_range.get("end")]
+        return facts if "staff_count" in facts or "staff_count_range" in facts else None
+
+    def get_company_facts(self, company_url):
+        """
+        Get the facts of a company from the JSON of the search results, or from the JSON embedded in its page,
+        fetched with a single request of the logged-in session.
+
+        Args:
+            company_url (str): The URL of the company's LinkedIn page.
+
+        Returns:
+            dict: The name, URL, staff count and staff count range of the company, or None if not found.
+        """
+        if canonical_company_url(company_url) in self._known_facts:
+            self.stats["search_json"] += 1
+            return self._known_facts[canonical_company_url(company_url)]
+        universal_name = self._universal_name(company_url)
+        if not universal_name:
+            return None
+        response = self._get(company_url)
+        if not response.ok:
+            logger.info("Couldn't fetch %s: %s", company_url, response.status_code)
+            return None
+        facts = self._find_company_facts([blob for _, blob in self._code_blobs(response.content)], universal_name)
+        if facts:
+            self.stats["page_json"] += 1
+        return facts
+
     def search(self, company_name):
         """
         Search for a company name in the search bar.
@@ -89,14 +261,32 @@ class LinkedInNavigator:
 
         Returns:
             list: List of company URLs that match the company name.
+
+        Raises:
+            requests.HTTPError: If LinkedIn answered with an error, which isn't cached.
         """
+        if self.cache:
+            cached = self.cache.get_search(company_name)
+            if cached is not None:
+                self.stats["search_cache"] += 1
+                return cached
 
-        response = self._loged_session.get(self.SEARCH_URL, params={"keywords": company_name})
-        soup = BeautifulSoup(response.content, 'html.parser')
+        response = self._get(self.SEARCH_URL, params={"keywords": company_name})
+        response.raise_for_status()
         companies_urls = []
-        for c in soup.find_all("code"):
-            if self._is_company_data(c.get_text()):
-                companies_urls += self._extract_company_url(json.loads(c.get_text()))
+        blobs = []
+        for raw, blob in self._code_blobs(response.content):
+            blobs.append(blob)
+            if self._is_company_data(raw):
+                companies_urls += self._extract_company_url(blob)
+        # The search results may already include the company entities, which saves a request per company.
+        for company_url in companies_urls:
+            universal_name = self._universal_name(company_url)
+            facts = self._find_company_facts(blobs, universal_name) if universal_name else None
+            if facts:
+                self._known_facts[canonical_company_url(company_url)] = facts
+        if self.cache:
+            self.cache.put_search(company_name, companies_urls)
         return companies_urls
 
     @staticmethod
@@ -122,7 +312,10 @@ class LinkedInNavigator:
 
     def get_employees_number(self, company_url: str):
         """
-        Scrape the number of employees from a LinkedIn company URL.
+        Get the number of employees from a LinkedIn company URL. It is thread safe, and up to `browser_pages`
+        lookups run at the same time in the browser.
+        The cache is checked first, and every company is looked up once per run: different URLs of the same
+        company, even requested at the same time by several threads, share one lookup.
 
         Args:
             company_url (str): The URL of the company's LinkedIn page.
@@ -130,15 +323,124 @@ class LinkedInNavigator:
         Returns:
             str: The number of employees as a string, or None if not found.
         """
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context()
-            cookies = requests.utils.dict_from_cookiejar(self._loged_session.cookies)
-            context.add_cookies(self._adapt_cookiejar_to_playwright_cookies(cookies))
-            page = context.new_page()
-            page.goto(company_url)
-            handle = page.query_selector(self._EMPLOYEES_SELECTOR)
-            result = re.sub('[^0-9]', '', handle.inner_html()) if handle else None
+        key = canonical_company_url(company_url)
+        with self._lock:
+            lookup = self._lookups.get(key)
+            owner = lookup is None
+            if owner:
+                lookup = self._lookups[key] = Future()
+        if not owner:
+            self.stats["deduplicated"] += 1
+            return lookup.result()
 
+        try:
+            facts = self.cache.get_company(key) if self.cache else None
+            if facts is None:
+                facts = self._lookup_company(company_url)
+                if self.cache:
+                    self.cache.put_company(key, facts)
+            else:
+                self.stats["company_cache"] += 1
+        except Exception as error:
+            with self._lock:
+                # A failed lookup isn't remembered, so it can be retried.
+                del self._lookups[key]
+            lookup.set_exception(error)
+            raise
+        lookup.set_result(facts["employees_number"])
+        return facts["employees_number"]
+
+    def _lookup_company(self, company_url: str):
+        """
+        Look up the facts of a company, from the JSON of the search results or of the company page, and the number
+        of employees from the rendered page if it isn't there.
+
+        Returns:
+            dict: The number of employees as a string, or None, and the facts of the company found in the JSON.
+        """
+        facts = self.get_company_facts(company_url) or {}
+        if facts.get("staff_count") is not None:
+            logger.info("There are %s employees", facts["staff_count"])
+            return {"employees_number": str(facts["staff_count"]), **facts}
+
+        self.stats["browser"] += 1
+
+        async def read_employees(page):
+            await page.goto(company_url)
+            if self._is_logged_out(page.url):
+                raise SessionExpiredError(company_url)
+            if 'checkpoint/challenge' in page.url:
+                raise ThrottledError(company_url)
+            handle = await page.query_selector(self._EMPLOYEES_SELECTOR)
+            return re.sub('[^0-9]', '', await handle.inner_html()) if handle else None
+
+        browser = self._browser
+        for attempt in range(self.max_retries + 1):
+            with self._lock:
+                account, session = self._browser_account, self._browser_cookies
+            account.limiter.acquire()
+            try:
+                result = browser.run(read_employees)
+                break
+            except (ThrottledError, SessionExpiredError) as error:
+                if isinstance(error, SessionExpiredError):
+                    self.stats["expired"] += 1
+                    self.session_pool.expired(account, session)
+                else:
+                    self.stats["throttled"] += 1
+                    self.session_pool.throttled(account)
+                self._switch_browser_account(account, session)
+                if attempt == self.max_retries:
+                    raise ThrottledError(company_url) from error
+        self.session_pool.succeeded(account)
         logger.info("There are %s employees", result)
-        return result
+        return {"employees_number": result, **facts}
+
+    @property
+    def _browser(self):
+        """
+        A cached property with the browser session, authenticated with the cookies of the first account of the pool
+        until that one is throttled or logged out.
+        """
+        if self._browser_session is None:
+            with self._lock:
+                if self._browser_session is None:
+                    self._browser_session = BrowserSession([], pages=self.browser_pages)
+                    self._set_browser_account(self.session_pool.primary())
+        return self._browser_session
+
+    def _set_browser_account(self, account):
+        cookies = requests.utils.dict_from_cookiejar(account.session.cookies)
+        self._browser_session.set_cookies(self._adapt_cookiejar_to_playwright_cookies(cookies))
+        self._browser_account, self._browser_cookies = account, account.session
+
+    def _switch_browser_account(self, failed, session):
+        """
+        Go on with the browser lookups with the cookies of the account that can make a request soonest, after the
+        session of the current one was throttled or logged out. The account may be the same one, logged in again.
+        """
+        with self._lock:
+            if self._browser_cookies is not session:
+                # Another lookup already switched.
+                return
+            account = self.session_pool.soonest()
+            if account.session is session:
+                # Every other account is cooling down for longer.
+                return
+            logger.info("The browser goes on with the account %s.", account.username)
+            self._set_browser_account(account)
+
+    def close(self):
+        """
+        Close the browser, if it was launched.
+        """
+        with self._lock:
+            if self._browser_session is not None:
+                self._browser_session.close()
+                self._browser_session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
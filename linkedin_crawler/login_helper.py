@@ -17,6 +17,8 @@ def debug_page(response):
 class LogedSessionCreator:
     LOGIN_URL = "https://www.linkedin.com/"
     FAILED_LOGIN_URL = 'https://www.linkedin.com/uas/login-submit'
+    FEED_URL = "https://www.linkedin.com/feed/"
+    AUTH_COOKIE = "li_at"
 
     """
     Helper class for creating logged-in sessions.
@@ -57,6 +59,28 @@ class LogedSessionCreator:
         """
         return not (response.url == LogedSessionCreator.FAILED_LOGIN_URL or 'checkpoint/challenge' in response.url)
 
+    @staticmethod
+    def session_is_valid(session: requests.Session):
+        """
+        Check whether a restored session is still logged in: its authentication cookie must not be expired, and
+        the feed must load without being redirected to the login or a checkpoint.
+
+        Args:
+            session (requests.Session): The session to check.
+
+        Returns:
+            bool: True if the session is logged in, False otherwise.
+        """
+        cookie = next((cookie for cookie in session.cookies if cookie.name == LogedSessionCreator.AUTH_COOKIE), None)
+        if cookie is None or cookie.is_expired():
+            return False
+        try:
+            response = session.get(LogedSessionCreator.FEED_URL, allow_redirects=False, timeout=15, headers={
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36'})
+        except requests.RequestException:
+            return False
+        return response.status_code == 200
+
     @staticmethod
     def log_in(username=None, password=None, cookies=None):
         """
@@ -0,0 +1,123 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import List, Optional
+from urllib.parse import urlparse
+
+
+def normalize_company_name(name: str) -> str:
+    """
+    Normalize a company name for the search cache, so "Acme, Inc." and " acme inc " share an entry.
+
+    Returns:
+        str: The lowercased name without accents, punctuation nor repeated whitespace.
+    """
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^\w\s]", " ", name.casefold()).split())
+
+
+def canonical_company_url(url: str) -> str:
+    """
+    Canonicalize a LinkedIn company URL, so the variants of the same company share an entry.
+
+    Returns:
+        str: The URL as https://www.linkedin.com/company/<universal name>/, or the URL without query nor
+        fragment if it isn't a company URL.
+    """
+    parsed = urlparse(url)
+    match = re.match(r"/company/([^/]+)", parsed.path)
+    if match:
+        return f"https://www.linkedin.com/company/{match.group(1).lower()}/"
+    return f"https://www.linkedin.com{parsed.path}"
+
+
+class LookupCache:
+    """
+    SQLite cache of LinkedIn searches, keyed by normalized company name, and of company facts, keyed by canonical
+    company URL. Entries older than `ttl` seconds are ignored, so re-runs on overlapping company lists only hit
+    LinkedIn for new or expired companies. Negative entries, searches that found nothing and companies whose
+    employees number wasn't found, are only valid for `negative_ttl` seconds, so a transient failure is retried
+    soon instead of being answered from the cache until the entry expires. It can be shared by several threads.
+
+    Args:
+        path (str): The path of the SQLite database.
+        ttl (float): Seconds an entry is valid.
+        negative_ttl (float): Seconds a negative entry is valid.
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, negative_ttl: float = 3600):
+        """
+        Initialize the LookupCache.
+
+        Args:
+            path (str): The path of the SQLite database.
+            ttl (float): Seconds an entry is valid. Default is a week.
+            negative_ttl (float): Seconds a negative entry is valid. Default is an hour.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = min(negative_ttl, ttl)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS searches (name TEXT PRIMARY KEY, urls TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS companies (url TEXT PRIMARY KEY, facts TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def _is_negative(value) -> bool:
+        return not value or (isinstance(value, dict) and value.get("employees_number") is None)
+
+    def _get(self, table: str, key_column: str, value_column: str, key: str):
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {value_column}, created_at FROM {table} WHERE {key_column} = ? AND created_at >= ?",
+                (key, time.time() - self.ttl)
+            ).fetchone()
+            value = json.loads(row[0]) if row is not None else None
+            if row is None or (self._is_negative(value) and row[1] < time.time() - self.negative_ttl):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return value
+
+    def _put(self, table: str, key: str, value):
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?)", (key, json.dumps(value), time.time())
+            )
+
+    def get_search(self, company_name: str) -> Optional[List[str]]:
+        """
+        Returns:
+            Optional[List[str]]: The company URLs found searching the name, or None if it isn't cached.
+        """
+        return self._get("searches", "name", "urls", normalize_company_name(company_name))
+
+    def put_search(self, company_name: str, urls: List[str]):
+        self._put("searches", normalize_company_name(company_name), urls)
+
+    def get_company(self, company_url: str) -> Optional[dict]:
+        """
+        Returns:
+            Optional[dict]: The facts of the company, or None if they aren't cached.
+        """
+        return self._get("companies", "url", "facts", canonical_company_url(company_url))
+
+    def put_company(self, company_url: str, facts: dict):
+        self._put("companies", canonical_company_url(company_url), facts)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self._connection.close()
@@ -1,32 +1,85 @@
 import csv
+import json
 import logging
 import os
+import socket
 
 from linkedin_navigator import LinkedInNavigator
+from lookup_cache import LookupCache
+from pipeline import CrawlPipeline
+from session_pool import SessionPool, SessionStore
 
 # Configure the logging settings
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
- 
+
 if __name__ == '__main__':
-    
+
     RESULT_DIRECTORY = os.getenv("RESULT_DIRECTORY", default="results")
     result_file = os.path.join(RESULT_DIRECTORY, "urls.csv")
     username = os.getenv("USERNAME", default="")
     password = os.getenv("PASSWORD", default="")
+    ACCOUNTS_FILE = os.getenv("ACCOUNTS_FILE", default="")
+    SESSION_DIRECTORY = os.getenv("SESSION_DIRECTORY", default=os.path.join(RESULT_DIRECTORY, "sessions"))
+    BROWSER_PAGES = int(os.getenv("BROWSER_PAGES", default="2"))
+    SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", default="1"))
+    LOOKUP_CONCURRENCY = int(os.getenv("LOOKUP_CONCURRENCY", default=str(BROWSER_PAGES)))
+    RATE_LIMIT = float(os.getenv("RATE_LIMIT", default="1"))
+    THROTTLE_COOLDOWN = float(os.getenv("THROTTLE_COOLDOWN", default="600"))
+    CACHE_FILE = os.getenv("CACHE_FILE", default=os.path.join(RESULT_DIRECTORY, "lookup_cache.sqlite3"))
+    CACHE_TTL_HOURS = float(os.getenv("CACHE_TTL_HOURS", default="168"))
+    CACHE_NEGATIVE_TTL_HOURS = float(os.getenv("CACHE_NEGATIVE_TTL_HOURS", default="1"))
+    WORK_QUEUE = os.getenv("WORK_QUEUE", default="")
+    QUEUE_NAME = os.getenv("QUEUE_NAME", default="linkedin")
+    VISIBILITY_TIMEOUT = float(os.getenv("VISIBILITY_TIMEOUT", default="1800"))
+    MAX_ATTEMPTS = int(os.getenv("MAX_ATTEMPTS", default="3"))
+    RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", default="60"))
+    WORKER_ID = os.getenv("WORKER_ID", default=f"{socket.gethostname()}-{os.getpid()}")
+
+    if ACCOUNTS_FILE:
+        # A JSON list of {"username": ..., "password": ...}
+        with open(ACCOUNTS_FILE) as f:
+            accounts = json.load(f)
+    else:
+        accounts = [{"username": username, "password": password}]
+
+    session_pool = SessionPool(accounts, SessionStore(SESSION_DIRECTORY), rate=RATE_LIMIT, cooldown=THROTTLE_COOLDOWN)
+    cache = LookupCache(CACHE_FILE, ttl=CACHE_TTL_HOURS * 3600, negative_ttl=CACHE_NEGATIVE_TTL_HOURS * 3600)
+    with LinkedInNavigator(browser_pages=BROWSER_PAGES, cache=cache, session_pool=session_pool) as snb:
+        pipeline = CrawlPipeline(snb, SEARCH_CONCURRENCY, LOOKUP_CONCURRENCY)
+        if WORK_QUEUE:
+            # Worker mode: the companies are leased from a queue shared with other workers, every worker writes
+            # its own CSV file. The shared work_queue package is imported from the root of the repository.
+            from work_queue import LeaseKeeper, iter_leases, open_queue
+
+            work_queue = open_queue(WORK_QUEUE, QUEUE_NAME, max_attempts=MAX_ATTEMPTS, backoff=RETRY_BACKOFF)
+            # The leases are renewed while the companies wait in the pipeline queues.
+            lease_keeper = LeaseKeeper(work_queue, VISIBILITY_TIMEOUT)
+
+            def leased_companies():
+                for lease in iter_leases(work_queue, WORKER_ID, VISIBILITY_TIMEOUT):
+                    lease_keeper.hold(lease)
+                    yield lease.id, lease.payload
+
+            def on_company_done(lease_id, error):
+                lease = lease_keeper.release(lease_id)
+                if error is None:
+                    work_queue.ack(lease)
+                else:
+                    work_queue.nack(lease, error)
+
+            try:
+                with lease_keeper:
+                    pipeline.run(
+                        leased_companies(), os.path.join(RESULT_DIRECTORY, f"urls-{WORKER_ID}.csv"), on_company_done
+                    )
+            finally:
+                work_queue.close()
+        else:
+            with open('companies.csv', mode='r') as file:
+                pipeline.run((company for company, in csv.reader(file)), result_file)
 
-    snb = LinkedInNavigator(username, password)
-    
-    with open('companies.csv', mode='r') as file, open(result_file, 'w') as result_csv:
-        writer = csv.writer(result_csv)
-        csv_file = csv.reader(file)
-        writer.writerow(["Company", "link", "employees number"])
-
-        for company, in csv_file:
-            logger.info("processing %s company", company)
-            results = snb.search(company)
-            for link in results:
-                logger.info("processing company link: %s", link)
-                employees_number = snb.get_employees_number(link)
-                writer.writerow([company, link, employees_number])
+        logger.info("Employee counts by source: %s, cache: %s", dict(snb.stats), cache.stats())
+        logger.info("Accounts: %s", session_pool.stats())
+    cache.close()
@@ -0,0 +1,233 @@
+import csv
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Hashable, Iterable, Optional, Tuple, Union
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class PipelineError(RuntimeError):
+    """
+    A stage of the pipeline died, so the crawl was stopped.
+    """
+
+
+class _Aborted(Exception):
+    """
+    Raised in the stages blocked on a queue once another stage died.
+    """
+
+
+class _CompanyProgress:
+    """
+    The rows of a company that are still to be written.
+    """
+
+    def __init__(self, key, name: str, pending: int):
+        self.key = key
+        self.name = name
+        self.pending = pending
+
+
+class CrawlPipeline:
+    """
+    Pipelined crawl of a list of companies. Searches and employee-count lookups run as separate stages, each one
+    with its own pool of threads, connected by bounded queues, so lookups of a company overlap with the searches of
+    the next ones. A single writer thread appends every row to the CSV file as soon as it is ready and reports the
+    progress.
+
+    Args:
+        navigator (LinkedInNavigator): The navigator used by both stages, it paces every request.
+        search_workers (int): Amount of concurrent searches.
+        lookup_workers (int): Amount of concurrent employee-count lookups.
+        progress_interval (float): Seconds between progress reports.
+
+    Usage Example:
+        with LinkedInNavigator(username, password) as navigator:
+            CrawlPipeline(navigator).run(["Acme", "Globex"], "results/urls.csv")
+    """
+
+    HEADER = ["Company", "link", "employees number"]
+    # Seconds a stage waits on a queue before checking whether another stage died.
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, navigator, search_workers: int = 1, lookup_workers: int = 2, progress_interval: float = 10.0):
+        """
+        Initialize the CrawlPipeline.
+
+        Args:
+            navigator (LinkedInNavigator): The navigator used by both stages, it paces every request.
+            search_workers (int): Amount of concurrent searches. Default is 1.
+            lookup_workers (int): Amount of concurrent employee-count lookups. Default is 2.
+            progress_interval (float): Seconds between progress reports. Default is 10.
+        """
+        self.navigator = navigator
+        self.search_workers = max(1, search_workers)
+        self.lookup_workers = max(1, lookup_workers)
+        self.progress_interval = progress_interval
+        self.stats = {"searched": 0, "links": 0, "rows": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+        self._on_company_done = None
+        self._failure = None
+        self._aborted = threading.Event()
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def _company_done(self, key, error: Optional[str] = None):
+        if self._on_company_done is None:
+            return
+        try:
+            self._on_company_done(key, error)
+        except Exception:
+            # The crawl goes on, the company is just not reported (a leased one is retried once its lease expires).
+            logger.exception("on_company_done failed for %s", key)
+
+    def _put(self, stage: queue.Queue, item):
+        while not self._aborted.is_set():
+            try:
+                return stage.put(item, timeout=self.POLL_INTERVAL)
+            except queue.Full:
+                pass
+        raise _Aborted()
+
+    def _get(self, stage: queue.Queue):
+        while not self._aborted.is_set():
+            try:
+                return stage.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                pass
+        raise _Aborted()
+
+    def _search(self, companies: queue.Queue, links: queue.Queue):
+        while (item := self._get(companies)) is not _DONE:
+            key, company = item if isinstance(item, tuple) else (item, item)
+            logger.info("processing %s company", company)
+            try:
+                results = self.navigator.search(company)
+            except Exception as error:
+                logger.exception("Search of %s failed", company)
+                self._count("errors")
+                self._company_done(key, repr(error))
+                continue
+            self._count("searched")
+            self._count("links", len(results))
+            if not results:
+                self._company_done(key)
+            progress = _CompanyProgress(key, company, len(results))
+            for link in results:
+                self._put(links, (progress, link))
+
+    def _lookup(self, links: queue.Queue, rows: queue.Queue):
+        while (item := self._get(links)) is not _DONE:
+            progress, link = item
+            logger.info("processing company link: %s", link)
+            try:
+                employees_number = self.navigator.get_employees_number(link)
+            except Exception:
+                logger.exception("Lookup of %s failed", link)
+                self._count("errors")
+                employees_number = None
+            self._put(rows, (progress, [progress.name, link, employees_number]))
+
+    def _write(self, result_file: str, rows: queue.Queue):
+        started = last_report = time.monotonic()
+        with open(result_file, 'w') as result_csv:
+            writer = csv.writer(result_csv)
+            writer.writerow(self.HEADER)
+            while (item := self._get(rows)) is not _DONE:
+                progress, row = item
+                writer.writerow(row)
+                result_csv.flush()
+                self._count("rows")
+                progress.pending -= 1
+                if not progress.pending:
+                    self._company_done(progress.key)
+                if time.monotonic() - last_report >= self.progress_interval:
+                    last_report = time.monotonic()
+                    self._report(last_report - started)
+        self._report(time.monotonic() - started)
+
+    def _report(self, elapsed: float):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        logger.info(
+            "Progress: %d companies searched, %d/%d links looked up, %d errors, %.2f rows/s, request rate %.2f/s",
+            stats["searched"], stats["rows"], stats["links"], stats["errors"], stats["rows"] / max(elapsed, 1e-9),
+            self.navigator.request_rate
+        )
+
+    def _guard(self, target, *args):
+        """
+        Run a stage, stopping the whole pipeline if it dies, so no other stage waits for it forever.
+        """
+        try:
+            target(*args)
+        except _Aborted:
+            pass
+        except BaseException as error:
+            logger.exception("The %s stage died, stopping the crawl", target.__name__.strip("_"))
+            self._failure = self._failure or error
+            self._aborted.set()
+
+    def _start(self, count: int, target, *args):
+        threads = [threading.Thread(target=self._guard, args=(target, *args), daemon=True) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def run(self, company_names: Iterable[Union[str, Tuple[Hashable, str]]], result_file: str,
+            on_company_done: Optional[Callable[[Hashable, Optional[str]], None]] = None) -> dict:
+        """
+        Crawl the companies, writing a row per company link to a CSV file.
+
+        Args:
+            company_names (Iterable[Union[str, Tuple[Hashable, str]]]): The names of the companies, or
+                (key, name) pairs to identify every company in `on_company_done` by its key.
+            result_file (str): The path of the resulting CSV file.
+            on_company_done (Optional[Callable[[Hashable, Optional[str]], None]]): Called from the worker threads
+                with the key (by default the name) of every company once all its rows are written, and the error if
+                its search failed. Failed lookups are written with no employees number and don't count as errors of
+                the company.
+
+        Returns:
+            dict: The amount of companies searched, links found, rows written and errors.
+
+        Raises:
+            PipelineError: If a stage died, after the other stages were stopped.
+        """
+        companies = queue.Queue(maxsize=2 * self.search_workers)
+        links = queue.Queue(maxsize=4 * self.lookup_workers)
+        rows = queue.Queue()
+        self._on_company_done = on_company_done
+        self._failure = None
+        self._aborted.clear()
+
+        searchers = self._start(self.search_workers, self._search, companies, links)
+        lookups = self._start(self.lookup_workers, self._lookup, links, rows)
+        writer = self._start(1, self._write, result_file, rows)
+
+        try:
+            for company in company_names:
+                self._put(companies, company)
+            # Once a stage is done, the next one is told there is nothing else to wait for.
+            for stage, threads in ((companies, searchers), (links, lookups), (rows, writer)):
+                for _ in threads:
+                    self._put(stage, _DONE)
+                for thread in threads:
+                    thread.join()
+        except _Aborted:
+            pass
+        if self._aborted.is_set():
+            for thread in searchers + lookups + writer:
+                thread.join()
+            raise PipelineError("The crawl pipeline stopped") from self._failure
+        return self.stats
@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class ThrottledError(Exception):
+    """
+    Raised when LinkedIn keeps throttling a request after every retry.
+    """
+
+
+class AdaptiveRateLimiter:
+    """
+    Thread-safe rate limiter shared by every request to LinkedIn. Requests are spaced to `rate` per second. When
+    LinkedIn throttles (a 429 or a redirect to a checkpoint), the rate is halved and every request waits `cooldown`
+    seconds; then every successful request raises the rate a little, until it's back at the configured rate.
+
+    Args:
+        rate (float): Maximum requests per second.
+        min_rate (float): The rate is never lowered below this.
+        cooldown (float): Seconds every request waits after a throttle.
+        recovery (float): Fraction of the maximum rate recovered after every successful request.
+    """
+
+    def __init__(self, rate: float = 1.0, min_rate: float = 0.05, cooldown: float = 60.0, recovery: float = 0.05):
+        """
+        Initialize the AdaptiveRateLimiter.
+
+        Args:
+            rate (float): Maximum requests per second. Default is 1.
+            min_rate (float): The rate is never lowered below this. Default is one request every 20 seconds.
+            cooldown (float): Seconds every request waits after a throttle. Default is 60.
+            recovery (float): Fraction of the maximum rate recovered after every successful request. Default is 5%.
+        """
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.cooldown = cooldown
+        self.recovery = recovery
+        self.throttles = 0
+        self._next_request = time.monotonic()
+        self._lock = threading.Lock()
+
+    def next_turn(self) -> float:
+        """
+        Returns:
+            float: The monotonic time of the next free turn.
+        """
+        with self._lock:
+            return max(time.monotonic(), self._next_request)
+
+    def reserve(self) -> float:
+        """
+        Take the next free turn.
+
+        Returns:
+            float: Seconds to wait for the turn.
+        """
+        with self._lock:
+            now = time.monotonic()
+            turn = max(now, self._next_request)
+            self._next_request = turn + 1 / self.rate
+        return turn - now
+
+    def acquire(self):
+        """
+        Wait for the turn of a request.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def throttled(self):
+        """
+        Slow down after LinkedIn throttled a request.
+        """
+        with self._lock:
+            self.throttles += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._next_request = max(self._next_request, time.monotonic() + self.cooldown)
+        logger.warning("LinkedIn is throttling, slowing down to %.2f requests per second.", self.rate)
+
+    def succeeded(self):
+        """
+        Speed up again after a successful request.
+        """
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery)
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import List, Optional
+import requests
+from login_helper import LogedSessionCreator
+from rate_limiter import AdaptiveRateLimiter
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class SessionExpiredError(Exception):
+    """
+    Raised when LinkedIn logged a session out mid-run, redirecting its requests to the authwall.
+    """
+
+
+class SessionStore:
+    """
+    Stores the cookies of the logged-in sessions on disk, one file per account readable only by its owner, so the
+    next runs restore them instead of logging in again.
+
+    Args:
+        directory (str): The folder of the session files.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Initialize the SessionStore.
+
+        Args:
+            directory (str): The folder of the session files.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, username: str) -> str:
+        return os.path.join(self.directory, f"{hashlib.sha256(username.encode()).hexdigest()[:16]}.json")
+
+    def save(self, username: str, session: requests.Session):
+        """
+        Write the cookies of a session.
+        """
+        cookies = [
+            {"name": cookie.name, "value": cookie.value, "domain": cookie.domain, "path": cookie.path,
+             "expires": cookie.expires, "secure": cookie.secure}
+            for cookie in session.cookies
+        ]
+        path = self._path(username)
+        temporary_path = f"{path}.tmp"
+        with open(os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            json.dump({"saved_at": time.time(), "cookies": cookies}, f)
+        os.replace(temporary_path, path)
+
+    def load(self, username: str) -> Optional[requests.Session]:
+        """
+        Returns:
+            Optional[requests.Session]: A session with the stored cookies, or None if there are none.
+        """
+        if not os.path.exists(self._path(username)):
+            return None
+        with open(self._path(username)) as f:
+            stored = json.load(f)
+        session = requests.Session()
+        for cookie in stored["cookies"]:
+            session.cookies.set(
+                cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"],
+                expires=cookie["expires"], secure=cookie["secure"]
+            )
+        return session
+
+    def delete(self, username: str):
+        if os.path.exists(self._path(username)):
+            os.remove(self._path(username))
+
+
+class PooledSession:
+    """
+    A logged-in session of an account, with its own rate budget.
+
+    Attributes:
+        username (str): The account.
+        limiter (AdaptiveRateLimiter): Paces the requests of the account and cools it down after a challenge.
+        requests (int): Amount of requests made with the session.
+        challenges (int): Amount of times the session was throttled or challenged.
+    """
+
+    def __init__(self, username: Optional[str], password: Optional[str], cookies: Optional[dict],
+                 limiter: AdaptiveRateLimiter):
+        self.username = username
+        self.password = password
+        self.cookies = cookies
+        self.limiter = limiter
+        self.session = None
+        self.disabled = False
+        self.requests = 0
+        self.challenges = 0
+
+
+class SessionPool:
+    """
+    Pool of logged-in sessions of several LinkedIn accounts. Requests are spread across the accounts, always taking
+    the one that can make a request soonest, and an account that gets throttled or challenged is cooled down while
+    the others keep crawling.
+
+    Sessions are restored from the store and checked with a single request; the login form is only used when the
+    stored session is missing or expired, and the new session is stored.
+
+    Args:
+        accounts (List[dict]): The "username" and "password", or the "cookies", of every account.
+        store (Optional[SessionStore]): Where sessions are persisted. Default is no persistence.
+        rate (float): Requests per second allowed for every account.
+        cooldown (float): Seconds an account rests after being throttled or challenged.
+    """
+
+    def __init__(self, accounts: List[dict], store: Optional[SessionStore] = None, rate: float = 1.0,
+                 cooldown: float = 600.0):
+        """
+        Initialize the SessionPool.
+
+        Args:
+            accounts (List[dict]): The "username" and "password", or the "cookies", of every account.
+            store (Optional[SessionStore]): Where sessions are persisted. Default is no persistence.
+            rate (float): Requests per second allowed for every account. Default is 1.
+            cooldown (float): Seconds an account rests after being throttled or challenged. Default is 10 minutes.
+        """
+        if not accounts:
+            raise ValueError("At least one account is needed")
+        self.store = store
+        self.sessions = [
+            PooledSession(account.get("username"), account.get("password"), account.get("cookies"),
+                          AdaptiveRateLimiter(rate=rate, cooldown=cooldown))
+            for account in accounts
+        ]
+        self._lock = threading.Lock()
+        self._login_lock = threading.Lock()
+
+    def _log_in(self, pooled: PooledSession) -> requests.Session:
+        """
+        Restore the stored session of an account if it's still valid, otherwise log in and store the new session.
+        """
+        if self.store and pooled.username and not pooled.cookies:
+            session = self.store.load(pooled.username)
+            if session is not None and LogedSessionCreator.session_is_valid(session):
+                logger.info("Restored the session of %s.", pooled.username)
+                return session
+            if session is not None:
+                logger.info("The stored session of %s expired.", pooled.username)
+        session = LogedSessionCreator.log_in(pooled.username, pooled.password, pooled.cookies)
+        if self.store and pooled.username:
+            self.store.save(pooled.username, session)
+        return session
+
+    def _ensure_session(self, pooled: PooledSession) -> bool:
+        if pooled.session is None and not pooled.disabled:
+            with self._login_lock:
+                if pooled.session is None and not pooled.disabled:
+                    try:
+                        pooled.session = self._log_in(pooled)
+                    except ValueError:
+                        logger.exception("Couldn't log in %s, the account won't be used.", pooled.username)
+                        pooled.disabled = True
+        return pooled.session is not None
+
+    def expired(self, pooled: PooledSession, session: requests.Session):
+        """
+        Log an account in again after LinkedIn logged its session out. The stored session is deleted, so the login
+        form is used. Accounts given by their cookies can't log in again, so they are disabled.
+
+        Args:
+            pooled (PooledSession): The account.
+            session (requests.Session): The session that was logged out, nothing is done if the account already
+                has a newer one.
+        """
+        with self._login_lock:
+            if pooled.session is not session:
+                return
+            logger.warning("The session of %s expired.", pooled.username)
+            pooled.session = None
+            if self.store and pooled.username:
+                self.store.delete(pooled.username)
+            if pooled.cookies:
+                logger.warning("The account %s was given by its cookies, it won't be used.", pooled.username)
+                pooled.disabled = True
+        self._ensure_session(pooled)
+
+    def _available(self) -> List[PooledSession]:
+        available = [pooled for pooled in self.sessions if self._ensure_session(pooled)]
+        if not available:
+            raise ValueError("None of the accounts could log in")
+        return available
+
+    def primary(self) -> PooledSession:
+        """
+        Returns:
+            PooledSession: The first account that could log in.
+
+        Raises:
+            ValueError: If no account could log in.
+        """
+        for pooled in self.sessions:
+            if self._ensure_session(pooled):
+                return pooled
+        raise ValueError("None of the accounts could log in")
+
+    def acquire(self) -> PooledSession:
+        """
+        Take the account that can make a request soonest and wait for its turn.
+
+        Returns:
+            PooledSession: The account that makes the request.
+
+        Raises:
+            ValueError: If no account could log in.
+        """
+        available = self._available()
+        with self._lock:
+            pooled = min(available, key=lambda candidate: candidate.limiter.next_turn())
+            pooled.requests += 1
+            wait = pooled.limiter.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return pooled
+
+    def soonest(self) -> PooledSession:
+        """
+        Returns:
+            PooledSession: The account that can make a request soonest, without taking its turn.
+
+        Raises:
+            ValueError: If no account could log in.
+        """
+        return min(self._available(), key=lambda candidate: candidate.limiter.next_turn())
+
+    def throttled(self, pooled: PooledSession):
+        """
+        Cool an account down after LinkedIn throttled or challenged it.
+        """
+        pooled.challenges += 1
+        logger.warning("Cooling down the account %s.", pooled.username)
+        pooled.limiter.throttled()
+
+    def succeeded(self, pooled: PooledSession):
+        pooled.limiter.succeeded()
+
+    def stats(self) -> list:
+        return [
+            {"username": pooled.username, "requests": pooled.requests, "challenges": pooled.challenges,
+             "rate": pooled.limiter.rate, "disabled": pooled.disabled}
+            for pooled in self.sessions
+        ]
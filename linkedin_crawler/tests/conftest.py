@@ -0,0 +1,21 @@
+import os
+import sys
+
+CRAWLER_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The tests import the crawler as the linkedin_crawler package, from the repository root, and its modules import
+# each other by their flat names, as when they are run from this folder.
+sys.path[:0] = [CRAWLER_DIRECTORY, os.path.dirname(CRAWLER_DIRECTORY)]
+
+
+def pytest_pycollect_makemodule(module_path, parent):
+    """
+    Import the modules of this crawler, and not the ones with the same names of the other projects of the
+    repository, e.g. rate_limiter, when the tests of several projects run together.
+    """
+    sys.path.remove(CRAWLER_DIRECTORY)
+    sys.path.insert(0, CRAWLER_DIRECTORY)
+    for file_name in os.listdir(CRAWLER_DIRECTORY):
+        module = sys.modules.get(os.path.splitext(file_name)[0])
+        if module is not None and os.path.dirname(getattr(module, "__file__", None) or "") != CRAWLER_DIRECTORY:
+            del sys.modules[module.__name__]
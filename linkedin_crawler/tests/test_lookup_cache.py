@@ -0,0 +1,43 @@
+import time
+from linkedin_crawler.lookup_cache import LookupCache, canonical_company_url, normalize_company_name
+
+
+def test_names_and_urls_share_entries():
+    assert normalize_company_name(" Acme, Inc. ") == normalize_company_name("acme inc") == "acme inc"
+    assert canonical_company_url("https://linkedin.com/company/Acme/about/?trk=x") == \
+        "https://www.linkedin.com/company/acme/"
+
+
+def test_cached_entries_are_read_back(tmp_path):
+    cache = LookupCache(str(tmp_path / "cache.sqlite3"))
+    cache.put_search("Acme, Inc.", ["https://www.linkedin.com/company/acme/"])
+    cache.put_company("https://www.linkedin.com/company/Acme/about/", {"employees_number": "120"})
+
+    assert cache.get_search("acme inc") == ["https://www.linkedin.com/company/acme/"]
+    assert cache.get_company("https://www.linkedin.com/company/acme/") == {"employees_number": "120"}
+    assert cache.get_search("Globex") is None
+    assert cache.stats() == {"hits": 2, "misses": 1}
+
+
+def test_negative_entries_expire_before_the_others(tmp_path):
+    cache = LookupCache(str(tmp_path / "cache.sqlite3"), ttl=60, negative_ttl=0.05)
+    cache.put_search("Acme", ["https://www.linkedin.com/company/acme/"])
+    cache.put_search("Globex", [])
+    cache.put_company("https://www.linkedin.com/company/acme/", {"employees_number": "120"})
+    cache.put_company("https://www.linkedin.com/company/globex/", {"employees_number": None})
+
+    assert cache.get_search("Globex") == []
+    assert cache.get_company("https://www.linkedin.com/company/globex/") == {"employees_number": None}
+    time.sleep(0.1)
+    assert cache.get_search("Globex") is None
+    assert cache.get_company("https://www.linkedin.com/company/globex/") is None
+    assert cache.get_search("Acme") == ["https://www.linkedin.com/company/acme/"]
+    assert cache.get_company("https://www.linkedin.com/company/acme/") == {"employees_number": "120"}
+
+
+def test_entries_expire_after_the_ttl(tmp_path):
+    cache = LookupCache(str(tmp_path / "cache.sqlite3"), ttl=0.05)
+    cache.put_search("Acme", ["https://www.linkedin.com/company/acme/"])
+    time.sleep(0.1)
+
+    assert cache.get_search("Acme") is None
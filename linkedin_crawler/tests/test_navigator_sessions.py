@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import requests
+import pytest
+import linkedin_navigator
+import session_pool
+from session_pool import SessionPool, SessionStore
+
+COMPANY_URL = "https://www.linkedin.com/company/acme/"
+AUTHWALL_URL = "https://www.linkedin.com/authwall?sessionRedirect=x"
+CHECKPOINT_URL = "https://www.linkedin.com/checkpoint/challenge/x"
+COMPANY_PAGE = b'<code>{"universalName": "acme", "name": "Acme", "staffCount": 120}</code>'
+
+
+class FakeResponse:
+    def __init__(self, url, content=b""):
+        self.url = url
+        self.status_code = 200
+        self.ok = True
+        self.content = content
+
+
+class FakeLinkedIn:
+    """
+    Logs an account in with a new cookie every time, and logs out the cookies in `logged_out`.
+    """
+
+    def __init__(self):
+        self.logins = []
+        self.logged_out = set()
+
+    def log_in(self, username=None, password=None, cookies=None):
+        self.logins.append(username)
+        session = FakeSession(self)
+        session.cookies.set("li_at", f"{username}-{len(self.logins)}", domain=".linkedin.com")
+        return session
+
+
+class FakeSession(requests.Session):
+    def __init__(self, linkedin):
+        super().__init__()
+        self.linkedin = linkedin
+
+    def get(self, url, **kwargs):
+        if self.cookies.get("li_at") in self.linkedin.logged_out:
+            return FakeResponse(AUTHWALL_URL)
+        return FakeResponse(url, COMPANY_PAGE)
+
+
+def run_with_timeout(function, timeout: float = 10):
+    """
+    Run a lookup in a thread, failing the test instead of waiting for the cooldown of an account.
+    """
+    outcome = {}
+    thread = threading.Thread(target=lambda: outcome.update(result=function()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "the lookup waited for the cooldown of an account"
+    return outcome["result"]
+
+
+@pytest.fixture
+def linkedin(monkeypatch):
+    linkedin = FakeLinkedIn()
+    monkeypatch.setattr(session_pool.LogedSessionCreator, "log_in", staticmethod(linkedin.log_in))
+    monkeypatch.setattr(session_pool.LogedSessionCreator, "session_is_valid",
+                        staticmethod(lambda session: session.cookies.get("li_at") not in linkedin.logged_out))
+    return linkedin
+
+
+def test_a_logged_out_session_is_logged_in_again(tmp_path, linkedin):
+    store = SessionStore(str(tmp_path))
+    pool = SessionPool([{"username": "a", "password": "secret"}], store=store, rate=100, cooldown=600)
+    navigator = linkedin_navigator.LinkedInNavigator(session_pool=pool)
+    navigator._get(COMPANY_URL)
+    linkedin.logged_out.add("a-1")
+
+    response = run_with_timeout(lambda: navigator._get(COMPANY_URL))
+
+    assert response.url == COMPANY_URL
+    assert linkedin.logins == ["a", "a"]
+    assert store.load("a").cookies.get("li_at") == "a-2"
+    assert navigator.stats["expired"] == 1 and navigator.stats["throttled"] == 0
+    assert pool.sessions[0].challenges == 0
+
+
+class FakePage:
+    def __init__(self, browser):
+        self.browser = browser
+        self.url = None
+
+    async def goto(self, url):
+        self.url = CHECKPOINT_URL if self.browser.cookies[0]["value"] in self.browser.challenged else url
+
+    async def query_selector(self, selector):
+        return FakeHandle()
+
+
+class FakeHandle:
+    async def inner_html(self):
+        return "1,234 employees"
+
+
+class FakeBrowserSession:
+    """
+    Challenges the pages of the cookies in `challenged`.
+    """
+
+    challenged = set()
+
+    def __init__(self, cookies, pages):
+        self.cookies = cookies
+
+    def set_cookies(self, cookies):
+        self.cookies = cookies
+
+    def run(self, function):
+        return asyncio.run(function(FakePage(self)))
+
+    def close(self):
+        pass
+
+
+def test_the_browser_goes_on_with_another_account_after_a_challenge(linkedin, monkeypatch):
+    monkeypatch.setattr(linkedin_navigator, "BrowserSession", FakeBrowserSession)
+    monkeypatch.setattr(FakeBrowserSession, "challenged", {"a-1"})
+    monkeypatch.setattr(linkedin_navigator.LinkedInNavigator, "get_company_facts", lambda self, url: None)
+    pool = SessionPool([{"username": "a", "password": "secret"}, {"username": "b", "password": "secret"}],
+                       rate=100, cooldown=600)
+    navigator = linkedin_navigator.LinkedInNavigator(session_pool=pool)
+    facts = run_with_timeout(lambda: navigator._lookup_company(COMPANY_URL))
+
+    assert facts["employees_number"] == "1234"
+    assert navigator._browser_account is pool.sessions[1]
+    assert navigator._browser_session.cookies[0]["value"] == "b-2"
+    assert pool.sessions[0].challenges == 1
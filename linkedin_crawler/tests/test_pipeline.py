@@ -0,0 +1,92 @@
+import csv
+import threading
+import pytest
+from linkedin_crawler.pipeline import CrawlPipeline, PipelineError
+
+
+class FakeNavigator:
+    """
+    Finds two links per company, and 50 employees behind every link.
+    """
+
+    request_rate = 0.0
+
+    def __init__(self, failing_searches=()):
+        self.failing_searches = set(failing_searches)
+
+    def search(self, company: str) -> list:
+        if company in self.failing_searches:
+            raise TimeoutError(company)
+        return [f"https://www.linkedin.com/company/{company.lower()}-{index}/" for index in range(2)]
+
+    def get_employees_number(self, link: str) -> int:
+        return 50
+
+
+class FastCrawlPipeline(CrawlPipeline):
+    POLL_INTERVAL = 0.05
+
+
+COMPANIES = [f"Company{index}" for index in range(20)]
+
+
+def run_with_timeout(pipeline: CrawlPipeline, *args, timeout: float = 10, **kwargs):
+    """
+    Run the pipeline in a thread, failing the test instead of hanging if it doesn't finish.
+    """
+    outcome = {}
+
+    def target():
+        try:
+            outcome["stats"] = pipeline.run(*args, **kwargs)
+        except Exception as error:
+            outcome["error"] = error
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "the pipeline is blocked"
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["stats"]
+
+
+def test_every_company_is_written_and_reported(tmp_path):
+    done = []
+    stats = run_with_timeout(FastCrawlPipeline(FakeNavigator({"Company3"})), COMPANIES, str(tmp_path / "urls.csv"),
+                             on_company_done=lambda company, error: done.append((company, error)))
+
+    with open(tmp_path / "urls.csv") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == CrawlPipeline.HEADER
+    assert len(rows) == 1 + 2 * (len(COMPANIES) - 1)
+    assert stats == {"searched": 19, "links": 38, "rows": 38, "errors": 1}
+    assert sorted(company for company, _ in done) == sorted(COMPANIES)
+    assert dict(done)["Company3"] == "TimeoutError('Company3')"
+
+
+def test_companies_are_reported_by_their_key(tmp_path):
+    done = []
+    run_with_timeout(FastCrawlPipeline(FakeNavigator({"Globex"})), [(7, "Acme"), (8, "Acme"), (9, "Globex")],
+                     str(tmp_path / "urls.csv"), on_company_done=lambda key, error: done.append((key, error)))
+
+    assert sorted(done) == [(7, None), (8, None), (9, "TimeoutError('Globex')")]
+
+
+def test_a_failing_callback_does_not_stop_the_crawl(tmp_path):
+    def on_company_done(company, error):
+        raise RuntimeError("the queue is unreachable")
+
+    stats = run_with_timeout(FastCrawlPipeline(FakeNavigator({"Company1"}), search_workers=1), COMPANIES,
+                             str(tmp_path / "urls.csv"), on_company_done=on_company_done)
+
+    assert stats["rows"] == 38
+
+
+def test_a_dead_stage_stops_the_crawl_instead_of_blocking(tmp_path):
+    # The writer can't open its file, so nothing drains the rows and the companies stop being consumed.
+    with pytest.raises(PipelineError) as error:
+        run_with_timeout(FastCrawlPipeline(FakeNavigator(), search_workers=1), COMPANIES,
+                         str(tmp_path / "missing" / "urls.csv"))
+
+    assert isinstance(error.value.__cause__, FileNotFoundError)
@@ -0,0 +1,31 @@
+from .base import Lease, LeaseKeeper, WorkQueue, iter_leases
+from .sqlite_queue import SQLiteWorkQueue
+
+BACKENDS = {"sqlite": SQLiteWorkQueue}
+
+
+def open_queue(url: str, name: str = "default", **kwargs) -> WorkQueue:
+    """
+    Open a queue given its URL, "<backend>://<location>", e.g. "sqlite://output/queue.sqlite3". A URL without
+    backend is taken as the path of a SQLite database. Other backends are plugged in by adding them to BACKENDS.
+
+    Args:
+        url (str): The URL of the queue.
+        name (str): The name of the queue. Default is "default".
+        **kwargs: Backend options, such as max_attempts and backoff.
+
+    Returns:
+        WorkQueue: The queue.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    backend, separator, location = url.partition("://")
+    if not separator:
+        backend, location = "sqlite", url
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown work queue backend {backend!r}, the available ones are {sorted(BACKENDS)}")
+    return BACKENDS[backend](location, name=name, **kwargs)
+
+
+__all__ = ["BACKENDS", "Lease", "LeaseKeeper", "SQLiteWorkQueue", "WorkQueue", "iter_leases", "open_queue"]
@@ -0,0 +1,52 @@
+import argparse
+import csv
+import logging
+import os
+from . import open_queue
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def read_column(csv_file: str, column: int, skip_header: bool):
+    """
+    Yields:
+        str: The non-empty values of a column of the CSV file.
+    """
+    with open(csv_file, newline="") as file:
+        rows = csv.reader(file)
+        if skip_header:
+            next(rows, None)
+        for row in rows:
+            if len(row) > column and row[column].strip():
+                yield row[column].strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m work_queue", description="Manage the crawlers' work queues.")
+    parser.add_argument("--url", default=os.getenv("WORK_QUEUE", "queue.sqlite3"),
+                        help="The URL of the queue, WORK_QUEUE by default.")
+    parser.add_argument("--queue", default=os.getenv("QUEUE_NAME", "default"),
+                        help="The name of the queue, QUEUE_NAME by default.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    enqueue = commands.add_parser("enqueue", help="Load a column of a CSV file into the queue.")
+    enqueue.add_argument("csv_file")
+    enqueue.add_argument("--column", type=int, default=0, help="The column to load. Default is the first one.")
+    enqueue.add_argument("--skip-header", action="store_true", help="Ignore the first row.")
+    commands.add_parser("stats", help="Show the amount of items in every status.")
+    args = parser.parse_args()
+
+    queue = open_queue(args.url, args.queue)
+    try:
+        if args.command == "enqueue":
+            added = queue.enqueue(read_column(args.csv_file, args.column, args.skip_header))
+            logger.info("Enqueued %d new items into %s", added, args.queue)
+        print(queue.stats())
+    finally:
+        queue.close()
+
+
+if __name__ == '__main__':
+    main()
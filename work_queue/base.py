@@ -0,0 +1,209 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class Lease(NamedTuple):
+    """
+    An item taken from the queue by a worker. Nobody else gets the item until the lease expires or is given back.
+
+    Attributes:
+        id (int): The id of the item.
+        payload (str): The work to do, e.g. a company URL or name.
+        attempts (int): Times the item was leased, this one included.
+        token (str): Identifies this lease, so a worker whose lease expired can't acknowledge the next one.
+    """
+    id: int
+    payload: str
+    attempts: int
+    token: str
+
+
+class WorkQueue(ABC):
+    """
+    Queue of work items shared by several worker processes. A worker leases an item for `visibility_timeout`
+    seconds and acknowledges it when it's done; if the worker crashes, the lease expires and the item is handed to
+    another worker. Items are delivered at least once, so the work must tolerate being done twice.
+
+    Backends implement the methods below, see SQLiteWorkQueue.
+    """
+
+    @abstractmethod
+    def enqueue(self, payloads: Iterable[str]) -> int:
+        """
+        Add items to the queue, ignoring the ones already in it.
+
+        Args:
+            payloads (Iterable[str]): The work items.
+
+        Returns:
+            int: Amount of items added.
+        """
+
+    @abstractmethod
+    def lease(self, worker: str, visibility_timeout: float) -> Optional[Lease]:
+        """
+        Take the next available item.
+
+        Args:
+            worker (str): Identifies the worker, for the stats and the logs.
+            visibility_timeout (float): Seconds the item is hidden from the other workers.
+
+        Returns:
+            Optional[Lease]: The item, or None if none is available right now.
+        """
+
+    @abstractmethod
+    def extend(self, lease: Lease, visibility_timeout: float) -> bool:
+        """
+        Keep a leased item hidden from the other workers for `visibility_timeout` more seconds.
+
+        Returns:
+            bool: False if the lease had already expired and the item was handed to another worker.
+        """
+
+    @abstractmethod
+    def ack(self, lease: Lease) -> bool:
+        """
+        Mark a leased item as done.
+
+        Returns:
+            bool: False if the lease had already expired and the item was handed to another worker.
+        """
+
+    @abstractmethod
+    def nack(self, lease: Lease, error: str) -> bool:
+        """
+        Give a leased item back after a failure, to be retried later unless it has run out of attempts.
+
+        Returns:
+            bool: Whether the item will be retried.
+        """
+
+    @abstractmethod
+    def remaining(self) -> int:
+        """
+        Returns:
+            int: Amount of items that aren't done nor dead, leased ones included.
+        """
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: The amount of items in every status.
+        """
+
+    def close(self):
+        pass
+
+
+class LeaseKeeper:
+    """
+    Renews the leases held by a worker every third of `visibility_timeout`, so the items waiting in the worker's own
+    buffers, or taking longer than the timeout, aren't handed to another worker. The timeout then only bounds how
+    long the items of a crashed worker stay hidden.
+
+    Args:
+        queue (WorkQueue): The queue the leases were taken from.
+        visibility_timeout (float): Seconds every renewal hides the items for.
+
+    Usage Example:
+        with LeaseKeeper(queue, 300) as keeper:
+            for lease in iter_leases(queue, "worker-1", 300):
+                keeper.hold(lease)
+                ...
+                queue.ack(keeper.release(lease.id))
+    """
+
+    def __init__(self, queue: WorkQueue, visibility_timeout: float):
+        """
+        Initialize the LeaseKeeper.
+
+        Args:
+            queue (WorkQueue): The queue the leases were taken from.
+            visibility_timeout (float): Seconds every renewal hides the items for.
+        """
+        self.queue = queue
+        self.visibility_timeout = visibility_timeout
+        self._leases = {}
+        self._lost = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def hold(self, lease: Lease):
+        """
+        Renew a lease until it's released.
+        """
+        with self._lock:
+            self._leases[lease.id] = lease
+
+    def release(self, lease_id: int) -> Lease:
+        """
+        Stop renewing a lease, before it's acknowledged or given back.
+
+        Returns:
+            Lease: The lease.
+        """
+        with self._lock:
+            self._lost.discard(lease_id)
+            return self._leases.pop(lease_id)
+
+    def _renew(self):
+        while not self._stop.wait(self.visibility_timeout / 3):
+            with self._lock:
+                leases = [lease for lease in self._leases.values() if lease.id not in self._lost]
+            for lease in leases:
+                try:
+                    renewed = self.queue.extend(lease, self.visibility_timeout)
+                except Exception:
+                    logger.exception("Couldn't renew the lease of %s.", lease.payload)
+                    continue
+                with self._lock:
+                    if not renewed and lease.id in self._leases:
+                        logger.warning("The lease of %s expired before it was renewed.", lease.payload)
+                        self._lost.add(lease.id)
+
+    def __enter__(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._renew, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def iter_leases(queue: WorkQueue, worker: str, visibility_timeout: float,
+                poll_interval: float = 5.0) -> Iterator[Lease]:
+    """
+    Lease items until the queue is drained. While the items left are leased by other workers or waiting for a
+    retry, it keeps polling, since an expired lease or a retry may hand them to this worker.
+
+    Args:
+        queue (WorkQueue): The queue.
+        worker (str): Identifies the worker.
+        visibility_timeout (float): Seconds every item is hidden from the other workers.
+        poll_interval (float): Seconds between polls when no item is available. Default is 5.
+
+    Yields:
+        Lease: The leased items, the caller must ack or nack every one of them.
+    """
+    while True:
+        lease = queue.lease(worker, visibility_timeout)
+        if lease is not None:
+            yield lease
+            continue
+        if not queue.remaining():
+            logger.info("The queue is drained, stats: %s", queue.stats())
+            return
+        time.sleep(poll_interval)
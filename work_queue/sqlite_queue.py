@@ -0,0 +1,159 @@
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Iterable, Optional
+from .base import Lease, WorkQueue
+
+
+# Configure the logging settings
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    WorkQueue stored in a SQLite database, for worker processes of one host or containers sharing a volume. Leases
+    are taken inside an immediate transaction, so two workers never get the same item. Several named queues can
+    share the database.
+
+    A failed item is retried after `backoff`, 2 * `backoff`, 4 * `backoff`... seconds. An item that was leased
+    `max_attempts` times, either failing or letting its lease expire, is marked as dead.
+
+    Args:
+        path (str): The path of the SQLite database.
+        name (str): The name of the queue.
+        max_attempts (int): Times an item is leased before giving up on it.
+        backoff (float): Seconds to wait before the first retry.
+    """
+
+    READY = "ready"
+    LEASED = "leased"
+    DONE = "done"
+    DEAD = "dead"
+
+    def __init__(self, path: str, name: str = "default", max_attempts: int = 3, backoff: float = 30.0):
+        """
+        Initialize the SQLiteWorkQueue.
+
+        Args:
+            path (str): The path of the SQLite database.
+            name (str): The name of the queue. Default is "default".
+            max_attempts (int): Times an item is leased before giving up on it. Default is 3.
+            backoff (float): Seconds to wait before the first retry. Default is 30.
+        """
+        self.path = path
+        self.name = name
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        # Transactions are opened explicitly, so a lease can lock the database before reading.
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, queue TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL, leased_until REAL, token TEXT, "
+            "worker TEXT, error TEXT, updated_at REAL NOT NULL, UNIQUE (queue, payload))"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS items_available ON items (queue, status, available_at)"
+        )
+
+    def enqueue(self, payloads: Iterable[str]) -> int:
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._connection.executemany(
+                    "INSERT OR IGNORE INTO items (queue, payload, status, available_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    ((self.name, payload, self.READY, now, now) for payload in payloads)
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return cursor.rowcount
+
+    def lease(self, worker: str, visibility_timeout: float) -> Optional[Lease]:
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                # The workers of expired leases that ran out of attempts are assumed to have crashed on the item.
+                self._connection.execute(
+                    "UPDATE items SET status = ?, error = 'lease expired', token = NULL, updated_at = ? "
+                    "WHERE queue = ? AND status = ? AND leased_until <= ? AND attempts >= ?",
+                    (self.DEAD, now, self.name, self.LEASED, now, self.max_attempts)
+                )
+                row = self._connection.execute(
+                    "SELECT id, payload, attempts FROM items WHERE queue = ? AND ("
+                    "(status = ? AND available_at <= ?) OR (status = ? AND leased_until <= ?)) "
+                    "ORDER BY available_at, id LIMIT 1",
+                    (self.name, self.READY, now, self.LEASED, now)
+                ).fetchone()
+                lease = None
+                if row is not None:
+                    item_id, payload, attempts = row
+                    lease = Lease(item_id, payload, attempts + 1, uuid.uuid4().hex)
+                    self._connection.execute(
+                        "UPDATE items SET status = ?, attempts = ?, leased_until = ?, token = ?, worker = ?, "
+                        "updated_at = ? WHERE id = ?",
+                        (self.LEASED, lease.attempts, now + visibility_timeout, lease.token, worker, now, item_id)
+                    )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return lease
+
+    def _update_lease(self, lease: Lease, status: str, available_at: Optional[float], error: Optional[str]) -> bool:
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE items SET status = ?, available_at = COALESCE(?, available_at), leased_until = NULL, "
+                "token = NULL, error = ?, updated_at = ? WHERE id = ? AND token = ?",
+                (status, available_at, error, time.time(), lease.id, lease.token)
+            )
+        if not cursor.rowcount:
+            logger.warning("The lease of %s expired before it was finished.", lease.payload)
+        return cursor.rowcount > 0
+
+    def extend(self, lease: Lease, visibility_timeout: float) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE items SET leased_until = ?, updated_at = ? WHERE id = ? AND token = ? AND status = ?",
+                (now + visibility_timeout, now, lease.id, lease.token, self.LEASED)
+            )
+        return cursor.rowcount > 0
+
+    def ack(self, lease: Lease) -> bool:
+        return self._update_lease(lease, self.DONE, None, None)
+
+    def nack(self, lease: Lease, error: str) -> bool:
+        if lease.attempts >= self.max_attempts:
+            logger.warning("Giving up on %s after %d attempts: %s", lease.payload, lease.attempts, error)
+            self._update_lease(lease, self.DEAD, None, error)
+            return False
+        delay = self.backoff * 2 ** (lease.attempts - 1)
+        logger.info("Retrying %s in %.0f seconds: %s", lease.payload, delay, error)
+        # Even if the lease expired, the item is retried by whoever has it now.
+        self._update_lease(lease, self.READY, time.time() + delay, error)
+        return True
+
+    def remaining(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM items WHERE queue = ? AND status IN (?, ?)", (self.name, self.READY, self.LEASED)
+            ).fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._connection.execute(
+                "SELECT status, COUNT(*) FROM items WHERE queue = ? GROUP BY status", (self.name,)
+            ).fetchall())
+
+    def close(self):
+        self._connection.close()
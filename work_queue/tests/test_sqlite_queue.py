@@ -0,0 +1,138 @@
+import time
+import pytest
+from work_queue import LeaseKeeper, SQLiteWorkQueue, iter_leases, open_queue
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "queue.sqlite3")
+
+
+def test_items_are_enqueued_once_and_leased_in_order(path):
+    queue = SQLiteWorkQueue(path)
+
+    assert queue.enqueue(["a", "b", "a"]) == 2
+    assert queue.enqueue(["b", "c"]) == 1
+    leases = [queue.lease("worker-1", 30) for _ in range(4)]
+    assert [lease.payload for lease in leases[:3]] == ["a", "b", "c"]
+    assert leases[3] is None
+    assert all(lease.attempts == 1 for lease in leases[:3])
+    assert queue.stats() == {SQLiteWorkQueue.LEASED: 3}
+
+
+def test_named_queues_share_the_database(path):
+    SQLiteWorkQueue(path, "g2").enqueue(["a"])
+    linkedin = SQLiteWorkQueue(path, "linkedin")
+
+    assert linkedin.lease("worker-1", 30) is None
+    assert linkedin.remaining() == 0
+
+
+def test_an_expired_lease_is_handed_to_another_worker(path):
+    queue = SQLiteWorkQueue(path)
+    queue.enqueue(["a"])
+    first = queue.lease("worker-1", 0.05)
+
+    assert queue.lease("worker-2", 30) is None
+    time.sleep(0.1)
+    second = queue.lease("worker-2", 30)
+    assert (second.id, second.payload, second.attempts) == (first.id, "a", 2)
+    assert second.token != first.token
+
+
+def test_a_stale_lease_can_not_acknowledge_nor_extend_the_item(path):
+    queue = SQLiteWorkQueue(path)
+    queue.enqueue(["a"])
+    stale = queue.lease("worker-1", 0.05)
+    time.sleep(0.1)
+    current = queue.lease("worker-2", 30)
+
+    assert queue.extend(stale, 30) is False
+    assert queue.ack(stale) is False
+    assert queue.stats() == {SQLiteWorkQueue.LEASED: 1}
+    assert queue.ack(current) is True
+    assert queue.stats() == {SQLiteWorkQueue.DONE: 1}
+    assert queue.remaining() == 0
+
+
+def test_an_extended_lease_is_not_handed_to_another_worker(path):
+    queue = SQLiteWorkQueue(path)
+    queue.enqueue(["a"])
+    lease = queue.lease("worker-1", 0.05)
+
+    assert queue.extend(lease, 30) is True
+    time.sleep(0.1)
+    assert queue.lease("worker-2", 30) is None
+    assert queue.ack(lease) is True
+
+
+def test_nacked_items_are_retried_with_exponential_backoff(path):
+    queue = SQLiteWorkQueue(path, max_attempts=3, backoff=0.1)
+    queue.enqueue(["a"])
+
+    assert queue.nack(queue.lease("worker-1", 30), "TimeoutError()") is True
+    assert queue.lease("worker-1", 30) is None
+    time.sleep(0.15)
+    second = queue.lease("worker-1", 30)
+    assert second.attempts == 2
+    assert queue.nack(second, "TimeoutError()") is True
+    # The second retry waits twice the backoff.
+    time.sleep(0.15)
+    assert queue.lease("worker-1", 30) is None
+    time.sleep(0.1)
+    assert queue.lease("worker-1", 30).attempts == 3
+
+
+def test_items_out_of_attempts_are_dead(path):
+    queue = SQLiteWorkQueue(path, max_attempts=2, backoff=0)
+    queue.enqueue(["a"])
+
+    assert queue.nack(queue.lease("worker-1", 30), "first") is True
+    assert queue.nack(queue.lease("worker-1", 30), "second") is False
+    assert queue.lease("worker-1", 30) is None
+    assert queue.stats() == {SQLiteWorkQueue.DEAD: 1}
+    assert queue.remaining() == 0
+
+
+def test_items_whose_last_lease_expired_are_dead(path):
+    queue = SQLiteWorkQueue(path, max_attempts=1)
+    queue.enqueue(["a"])
+    queue.lease("worker-1", 0.05)
+    time.sleep(0.1)
+
+    assert queue.lease("worker-2", 30) is None
+    assert queue.stats() == {SQLiteWorkQueue.DEAD: 1}
+
+
+def test_iter_leases_stops_once_the_queue_is_drained(path):
+    queue = SQLiteWorkQueue(path)
+    queue.enqueue(["a", "b"])
+
+    payloads = []
+    for lease in iter_leases(queue, "worker-1", 30, poll_interval=0.01):
+        payloads.append(lease.payload)
+        queue.ack(lease)
+    assert payloads == ["a", "b"]
+
+
+def test_lease_keeper_renews_the_held_leases(path):
+    queue = SQLiteWorkQueue(path)
+    queue.enqueue(["a", "b"])
+    held, released = queue.lease("worker-1", 0.2), queue.lease("worker-1", 0.2)
+
+    with LeaseKeeper(queue, 0.2) as keeper:
+        keeper.hold(held)
+        keeper.hold(released)
+        assert keeper.release(released.id) == released
+        time.sleep(0.4)
+        stolen = queue.lease("worker-2", 30)
+
+    assert stolen.payload == "b"
+    assert queue.ack(keeper.release(held.id)) is True
+
+
+def test_open_queue_parses_the_url(path):
+    assert isinstance(open_queue(f"sqlite://{path}", "g2"), SQLiteWorkQueue)
+    assert open_queue(path, "g2", max_attempts=5).max_attempts == 5
+    with pytest.raises(ValueError):
+        open_queue("redis://localhost:6379")